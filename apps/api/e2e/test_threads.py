@@ -0,0 +1,92 @@
+import json
+
+from httpx import AsyncClient
+
+from api.thread.thread_models import Thread
+from e2e.conftest import AuthenticatedClient, auth_headers_for_user
+
+THREADS_ENDPOINT = "/v5/threads/"
+
+
+def parse_stream_lines(body: str) -> list[dict]:
+    return [json.loads(line) for line in body.splitlines() if line]
+
+
+async def test_streams_a_new_thread_as_anonymous_user(
+    client: AsyncClient,
+    anon_user: AuthenticatedClient,
+):
+    response = await client.post(
+        THREADS_ENDPOINT,
+        headers=auth_headers_for_user(anon_user),
+        json={"content": "I'm a magical labrador named Murphy, who are you?", "model": "test-model-no-tools"},
+    )
+    response.raise_for_status()
+
+    lines = parse_stream_lines(response.text)
+    assert lines[0]["type"] == "start"
+    assert lines[-1]["type"] == "end"
+    assert any(line.get("type") == "modelResponse" for line in lines)
+
+    final_thread = Thread.model_validate(lines[-2])
+    assert final_thread.id == lines[0]["message"]
+
+    *_, user_message, reply = final_thread.messages
+    assert user_message.content == "I'm a magical labrador named Murphy, who are you?"
+    assert user_message.final is True
+    assert user_message.private is True, "anonymous users' messages should always be private"
+    assert user_message.expiration_time is not None
+    assert user_message.children == [reply.id]
+
+    assert reply.role == "assistant"
+    assert reply.final is True
+    assert reply.content != ""
+
+
+async def test_continues_an_existing_thread(
+    client: AsyncClient,
+    anon_user: AuthenticatedClient,
+):
+    first_response = await client.post(
+        THREADS_ENDPOINT,
+        headers=auth_headers_for_user(anon_user),
+        json={"content": "First message", "model": "test-model-no-tools", "temperature": 0.2},
+    )
+    first_response.raise_for_status()
+    first_thread = Thread.model_validate(parse_stream_lines(first_response.text)[-2])
+    first_reply = first_thread.messages[-1]
+
+    response = await client.post(
+        THREADS_ENDPOINT,
+        headers=auth_headers_for_user(anon_user),
+        json={"content": "Second message", "model": "test-model-no-tools", "parent": first_reply.id},
+    )
+    response.raise_for_status()
+
+    thread = Thread.model_validate(parse_stream_lines(response.text)[-2])
+    assert [message.id for message in thread.messages[: len(first_thread.messages)]] == [
+        message.id for message in first_thread.messages
+    ]
+    assert thread.messages[-2].content == "Second message"
+    assert thread.messages[-2].parent == first_reply.id
+    assert thread.messages[-2].root == first_thread.id
+    assert thread.messages[-2].opts.temperature == 0.2, "inference options should carry over from the parent"
+
+
+async def test_rejects_unknown_model(
+    client: AsyncClient,
+    anon_user: AuthenticatedClient,
+):
+    response = await client.post(
+        THREADS_ENDPOINT,
+        headers=auth_headers_for_user(anon_user),
+        json={"content": "Hello", "model": "not-a-real-model"},
+    )
+
+    assert response.status_code == 400
+
+
+async def test_requires_auth(client: AsyncClient):
+    response = await client.post(THREADS_ENDPOINT, json={"content": "Hello", "model": "test-model-no-tools"})
+
+    assert response.status_code == 401
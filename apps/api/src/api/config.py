@@ -1,7 +1,7 @@
 import os
 from enum import StrEnum
 
-from pydantic import Field
+from pydantic import Field, SecretStr
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -38,6 +38,12 @@ class Settings(BaseSettings):
     DATABASE_MAX_OVERFLOW_CONNECTIONS: int = 5
     AUTH_DOMAIN: str = Field(init=False)
     AUTH_AUDIENCE: str = Field(init=False)
+    GOOGLE_CLOUD_API_KEY: SecretStr | None = None
+    GOOGLE_MODERATE_TEXT_CONFIDENCE_THRESHOLD: float = 0.8
+    GOOGLE_MODERATE_TEXT_SEVERITY_THRESHOLD: float = 0.7
+    CIRRASCALE_BASE_URL: str | None = None
+    CIRRASCALE_API_KEY: SecretStr | None = None
+    MODAL_OPENAI_API_KEY: SecretStr | None = None
 
     model_config = SettingsConfigDict(
         extra="ignore",
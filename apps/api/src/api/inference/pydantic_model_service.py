@@ -0,0 +1,82 @@
+from pydantic_ai.messages import (
+    ModelMessage,
+    ModelRequest,
+    ModelResponse,
+    ModelResponsePart,
+    SystemPromptPart,
+    TextPart,
+    ThinkingPart,
+    UserPromptPart,
+)
+from pydantic_ai.models import Model
+from pydantic_ai.models.openai import OpenAIChatModel, OpenAIChatModelSettings
+from pydantic_ai.models.test import TestModel
+from pydantic_ai.providers.openai import OpenAIProvider
+
+from api.config import settings
+from api.thread.thread_models import Role
+from db.models.inference_opts import InferenceOpts
+from db.models.message import Message
+from db.models.model_config import ModelConfig, ModelHost
+
+# Models hosted on vLLM always have this name
+VLLM_MODEL_NAME = "llm"
+
+
+class UnsupportedModelHostError(Exception):
+    pass
+
+
+def get_pydantic_model(model_config: ModelConfig) -> Model:
+    match model_config.host:
+        case ModelHost.TestBackend:
+            return TestModel()
+        case ModelHost.Cirrascale:
+            return OpenAIChatModel(
+                model_name=model_config.model_id_on_host,
+                provider=OpenAIProvider(
+                    base_url=settings.CIRRASCALE_BASE_URL,
+                    api_key=settings.CIRRASCALE_API_KEY.get_secret_value() if settings.CIRRASCALE_API_KEY else None,
+                ),
+            )
+        case ModelHost.ModalOpenAI:
+            return OpenAIChatModel(
+                model_name=VLLM_MODEL_NAME,
+                provider=OpenAIProvider(
+                    # For Modal OpenAI APIs the "model_id" is the URL
+                    base_url=model_config.model_id_on_host,
+                    api_key=settings.MODAL_OPENAI_API_KEY.get_secret_value() if settings.MODAL_OPENAI_API_KEY else None,
+                ),
+            )
+        case _:
+            msg = f"Model host {model_config.host} isn't supported on v5 yet"
+            raise UnsupportedModelHostError(msg)
+
+
+def map_model_settings(opts: InferenceOpts, model_config: ModelConfig) -> OpenAIChatModelSettings:
+    return OpenAIChatModelSettings(
+        max_tokens=opts.max_tokens or model_config.max_tokens_default,
+        # 0 is a valid temperature and top_p, so only a missing value falls back to the default
+        temperature=opts.temperature if opts.temperature is not None else model_config.temperature_default,
+        top_p=opts.top_p if opts.top_p is not None else model_config.top_p_default,
+        stop_sequences=opts.stop or [],
+        openai_reasoning_effort="low" if model_config.can_think else None,
+    )
+
+
+def map_messages(messages: list[Message]) -> list[ModelMessage]:
+    model_messages: list[ModelMessage] = []
+    for message in messages:
+        if message.role == Role.System:
+            model_messages.append(ModelRequest([SystemPromptPart(message.content)]))
+        elif message.role == Role.User:
+            model_messages.append(ModelRequest([UserPromptPart(message.content)]))
+        elif message.role == Role.Assistant:
+            parts: list[ModelResponsePart] = []
+            if message.thinking is not None:
+                parts.append(ThinkingPart(content=message.thinking))
+            parts.append(TextPart(content=message.content))
+
+            model_messages.append(ModelResponse(parts=parts))
+
+    return model_messages
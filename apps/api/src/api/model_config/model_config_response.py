@@ -35,6 +35,7 @@ class BaseModelConfigResponse(APIInterface):
     default_system_prompt: str | None = Field(default=None)
     can_call_tools: bool
     can_think: bool
+    speculative_inference: bool
 
     infini_gram_index: AvailableInfiniGramIndexId | None = Field(default=None)
 
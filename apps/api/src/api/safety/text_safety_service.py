@@ -0,0 +1,83 @@
+from functools import lru_cache
+from time import time_ns
+from typing import Annotated
+
+from fastapi import Depends
+from google.api_core.client_options import ClientOptions
+from google.cloud.language_v2 import Document, LanguageServiceAsyncClient, ModerateTextRequest
+
+from api.config import settings
+from api.logging.fastapi_logger import FastAPIStructLogger
+
+logger = FastAPIStructLogger()
+
+UNSAFE_VIOLATION_CATEGORIES = frozenset([
+    "Toxic",
+    "Derogatory",
+    "Violent",
+    "Sexual",
+    "Insult",
+    "Profanity",
+    "Death, Harm & Tragedy",
+    "Firearms & Weapons",
+    "Public Safety",
+    "War & Conflict",
+    "Dangerous Content",
+])
+
+
+@lru_cache
+def get_language_client() -> LanguageServiceAsyncClient | None:
+    if settings.GOOGLE_CLOUD_API_KEY is None:
+        return None
+
+    return LanguageServiceAsyncClient(
+        client_options=ClientOptions(api_key=settings.GOOGLE_CLOUD_API_KEY.get_secret_value())
+    )
+
+
+class TextSafetyService:
+    def __init__(self, language_client: Annotated[LanguageServiceAsyncClient | None, Depends(get_language_client)]):
+        self.language_client = language_client
+
+    async def is_safe(self, content: str) -> bool | None:
+        """
+        Checks the text with Google's moderate text API
+
+        Returns None if the check couldn't run, matching the Flask API's behavior of letting the message through
+        """
+        if self.language_client is None:
+            logger.warning("safety-check.skipped", reason="GOOGLE_CLOUD_API_KEY is not set")
+            return None
+
+        request = ModerateTextRequest(
+            document=Document(content=content, type=Document.Type.PLAIN_TEXT),
+            model_version=ModerateTextRequest.ModelVersion.MODEL_VERSION_2,
+        )
+
+        start_ns = time_ns()
+        try:
+            result = await self.language_client.moderate_text(request)
+        except Exception as e:
+            logger.exception("safety-check.error", error=repr(e))
+            return None
+
+        violations = [
+            category.name
+            for category in result.moderation_categories
+            if category.name in UNSAFE_VIOLATION_CATEGORIES
+            and category.confidence >= settings.GOOGLE_MODERATE_TEXT_CONFIDENCE_THRESHOLD
+            and category.severity >= settings.GOOGLE_MODERATE_TEXT_SEVERITY_THRESHOLD
+        ]
+
+        logger.info(
+            "safety-check.results",
+            checker="GoogleModerateText",
+            duration_ms=(time_ns() - start_ns) / 1_000_000,
+            violations=violations,
+        )
+
+        return len(violations) == 0
+
+
+TextSafetyServiceDependency = Annotated[TextSafetyService, Depends()]
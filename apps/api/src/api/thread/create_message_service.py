@@ -0,0 +1,307 @@
+import asyncio
+from collections.abc import AsyncIterator
+from datetime import UTC, datetime, timedelta
+from typing import Annotated
+
+from fastapi import Depends, HTTPException, status
+from pydantic import Field
+from pydantic_ai.direct import model_request_stream
+from pydantic_ai.messages import (
+    PartDeltaEvent,
+    PartStartEvent,
+    TextPart,
+    TextPartDelta,
+    ThinkingPart,
+    ThinkingPartDelta,
+)
+from pydantic_ai.models import Model, ModelRequestParameters
+from sqlalchemy.orm.attributes import set_committed_value
+
+import core.object_id as obj
+from api.inference.pydantic_model_service import (
+    UnsupportedModelHostError,
+    get_pydantic_model,
+    map_messages,
+    map_model_settings,
+)
+from api.logging.fastapi_logger import FastAPIStructLogger
+from api.model_config.admin.model_config_admin_read_service import ModelConfigAdminReadServiceDependency
+from api.safety.text_safety_service import TextSafetyServiceDependency
+from api.thread.message_repository import MessageRepositoryDependency
+from api.thread.thread_models import (
+    FlatMessage,
+    ModelResponseChunk,
+    Role,
+    StreamEndChunk,
+    StreamErrorChunk,
+    StreamStartChunk,
+    ThinkingChunk,
+    Thread,
+)
+from core.api_interface import APIInterface
+from core.auth.token import Token
+from core.text_snippet import text_snippet
+from db.models.inference_opts import InferenceOpts
+from db.models.message import Message
+from db.models.model_config import ModelConfig, PromptType
+
+logger = FastAPIStructLogger()
+
+INAPPROPRIATE_TEXT_ERROR = "inappropriate_prompt_text"
+# The /v4 API reads a message's error_severity as error, warning or info
+ERROR_SEVERITY = "error"
+# Matches FinishReason.Cancelled in the Flask API
+CANCELLED_FINISH_REASON = "cancelled"
+
+
+class CreateMessageRequest(APIInterface):
+    parent: str | None = Field(default=None)
+    content: str = Field(min_length=1)
+    model: str
+    private: bool | None = Field(default=None)
+
+    max_tokens: int | None = Field(default=None)
+    temperature: float | None = Field(default=None)
+    top_p: float | None = Field(default=None)
+    stop: list[str] | None = Field(default=None)
+
+
+def merge_inference_options(model: ModelConfig, parent: Message | None, request: CreateMessageRequest) -> InferenceOpts:
+    """Options from the request take priority over the parent message's, which take priority over the model's"""
+    parent_inference_options = InferenceOpts.from_message(parent)
+    request_inference_options = InferenceOpts(
+        max_tokens=request.max_tokens, temperature=request.temperature, top_p=request.top_p, stop=request.stop
+    )
+
+    merged_inference_options = (
+        InferenceOpts.from_model_config_defaults(model).model_dump()
+        | (parent_inference_options.model_dump(exclude_none=True) if parent_inference_options is not None else {})
+        | request_inference_options.model_dump(exclude_none=True)
+    )
+
+    return InferenceOpts.model_validate(merged_inference_options)
+
+
+def format_chunk(chunk: APIInterface) -> str:
+    return chunk.model_dump_json() + "\n"
+
+
+def format_thread(message_chain: list[Message]) -> str:
+    # Children aren't loaded on these messages. Fill them in from the chain so mapping doesn't trigger a lazy load
+    for message, child in zip(message_chain, [*message_chain[1:], None], strict=True):
+        set_committed_value(message, "children", [child] if child is not None else [])
+
+    thread = Thread(id=message_chain[0].id, messages=[FlatMessage.model_validate(message) for message in message_chain])
+    return format_chunk(thread)
+
+
+class CreateMessageService:
+    """
+    Creates a user message and streams the model's reply, entirely on asyncio.
+
+    This is the v5 counterpart to the Flask create_message_service. It currently handles text-only user messages;
+    files, tool calling and captcha checks are still only supported through /v4/threads.
+    """
+
+    def __init__(
+        self,
+        message_repository: MessageRepositoryDependency,
+        model_config_read_service: ModelConfigAdminReadServiceDependency,
+        text_safety_service: TextSafetyServiceDependency,
+    ):
+        self.message_repository = message_repository
+        self.model_config_read_service = model_config_read_service
+        self.text_safety_service = text_safety_service
+
+    async def _get_model(self, model_id: str) -> ModelConfig:
+        model = await self.model_config_read_service.get_one(model_id)
+
+        if model is None or model.prompt_type == PromptType.FILES_ONLY:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid model {model_id}")
+
+        return model
+
+    async def _get_parent_chain(self, parent_id: str | None) -> list[Message]:
+        if parent_id is None:
+            return []
+
+        parent = await self.message_repository.get_by_id(parent_id)
+        if parent is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Message {parent_id} not found")
+
+        return await self.message_repository.get_chain(parent)
+
+    async def create(self, request: CreateMessageRequest, token: Token) -> AsyncIterator[str]:
+        """
+        Validates the request and saves the new messages, then returns the stream of the model's reply.
+
+        Everything that can fail with a client error happens here, before the response starts streaming.
+        """
+        model = await self._get_model(request.model)
+
+        try:
+            pydantic_model = get_pydantic_model(model)
+        except UnsupportedModelHostError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)) from e
+
+        is_content_safe, message_chain = await asyncio.gather(
+            self.text_safety_service.is_safe(request.content),
+            self._get_parent_chain(request.parent),
+        )
+
+        if is_content_safe is False:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=INAPPROPRIATE_TEXT_ERROR)
+
+        parent = message_chain[-1] if message_chain else None
+        root = message_chain[0] if message_chain else None
+
+        private = (
+            # Anonymous users aren't allowed to share messages
+            True
+            if token.is_anonymous_user
+            else request.private
+            if request.private is not None
+            else root.private
+            if root is not None
+            else False
+        )
+
+        opts = merge_inference_options(model, parent, request)
+
+        # We currently want anonymous users' messages to expire after 1 day
+        expiration_time = datetime.now(UTC) + timedelta(days=1) if token.is_anonymous_user else None
+
+        new_messages: list[Message] = []
+
+        def new_message(role: Role, content: str) -> Message:
+            message_id = obj.NewID("msg")
+            previous = new_messages[-1] if new_messages else parent
+            message = Message(
+                id=message_id,
+                content=content,
+                snippet=text_snippet(content),
+                creator=token.client,
+                role=role,
+                opts=opts.model_dump(),
+                model_id=model.id,
+                model_host=model.host,
+                model_type=model.model_type if role == Role.Assistant else None,
+                root=previous.root if previous is not None else message_id,
+                parent=previous.id if previous is not None else None,
+                final=False,
+                private=private,
+                harmful=False if role == Role.System else None,
+                expiration_time=expiration_time,
+            )
+            new_messages.append(message)
+            return message
+
+        if parent is None and model.default_system_prompt is not None:
+            new_message(Role.System, model.default_system_prompt)
+
+        user_message = new_message(Role.User, request.content)
+        reply = new_message(Role.Assistant, "")
+
+        await self.message_repository.add(*new_messages)
+        await self.message_repository.commit()
+
+        return self._stream_reply(
+            model=model,
+            pydantic_model=pydantic_model,
+            opts=opts,
+            message_chain=[*message_chain, *new_messages],
+            user_message=user_message,
+            reply=reply,
+        )
+
+    async def _stream_reply(
+        self,
+        *,
+        model: ModelConfig,
+        pydantic_model: Model,
+        opts: InferenceOpts,
+        message_chain: list[Message],
+        user_message: Message,
+        reply: Message,
+    ) -> AsyncIterator[str]:
+        root_id = message_chain[0].id
+
+        try:
+            yield format_chunk(StreamStartChunk(message=root_id))
+            yield format_thread(message_chain)
+
+            try:
+                async with model_request_stream(
+                    model=pydantic_model,
+                    messages=map_messages(message_chain[:-1]),
+                    model_settings=map_model_settings(opts, model),
+                    model_request_parameters=ModelRequestParameters(allow_text_output=True),
+                ) as stream:
+                    async for event in stream:
+                        chunk = map_event(event, reply)
+                        if chunk is not None:
+                            yield format_chunk(chunk)
+
+                response = stream.get()
+            except Exception as e:
+                logger.exception("inference.stream-error", message_id=reply.id, model=model.id, host=model.host)
+                error = f"Unknown Error {e}"
+                yield format_chunk(StreamErrorChunk(message=reply.id, error=error, reason="Unknown error"))
+
+                # The error is kept on the reply so the thread isn't left with an unfinished message
+                reply.error_description = error
+                reply.error_severity = ERROR_SEVERITY
+                await self._finalize(message_chain, reply)
+                return
+
+            reply.content = response.text or ""
+            reply.snippet = text_snippet(reply.content)
+            reply.thinking = response.thinking or None
+            await self._finalize(message_chain, reply)
+
+            logger.info("create_message.v5", message_id=user_message.id, reply_id=reply.id, model=model.id)
+
+            yield format_thread(message_chain)
+            yield format_chunk(StreamEndChunk(message=root_id))
+        except (asyncio.CancelledError, GeneratorExit):
+            # The client has gone away mid-stream. Starlette cancels the stream when that happens
+            if reply.final is False:
+                await self._save_cancelled(message_chain, reply)
+            raise
+
+    async def _save_cancelled(self, message_chain: list[Message], reply: Message) -> None:
+        """
+        Finalizes the messages of a stream that was stopped part way through, so the thread can be continued. The
+        commit is shielded so it isn't cancelled along with the stream, and errors are logged since there's no one left
+        to send them to.
+        """
+        reply.finish_reason = CANCELLED_FINISH_REASON
+        try:
+            await asyncio.shield(self._finalize(message_chain, reply))
+        except Exception:
+            logger.exception("inference.cancel-error", message_id=reply.id)
+
+    async def _finalize(self, message_chain: list[Message], reply: Message) -> None:
+        reply.final = True
+        for message in message_chain:
+            if message.role in {Role.System, Role.User} and message.final is False:
+                message.final = True
+
+        await self.message_repository.commit()
+
+
+def map_event(event, reply: Message) -> ModelResponseChunk | ThinkingChunk | None:
+    match event:
+        case PartStartEvent(part=TextPart(content=content)):
+            return ModelResponseChunk(message=reply.id, content=content)
+        case PartStartEvent(part=ThinkingPart(content=content)):
+            return ThinkingChunk(message=reply.id, content=content or "")
+        case PartDeltaEvent(delta=TextPartDelta(content_delta=content)):
+            return ModelResponseChunk(message=reply.id, content=content or "")
+        case PartDeltaEvent(delta=ThinkingPartDelta(content_delta=content)):
+            return ThinkingChunk(message=reply.id, content=content or "")
+        case _:
+            return None
+
+
+CreateMessageServiceDependency = Annotated[CreateMessageService, Depends()]
@@ -0,0 +1,59 @@
+from typing import Annotated
+
+from fastapi import Depends
+from sqlalchemy import func, literal, or_, select
+
+from api.db.sqlalchemy_engine import SessionDependency
+from db.models.message import Message
+
+
+class MessageRepository:
+    def __init__(self, session: SessionDependency):
+        self.session = session
+
+    @staticmethod
+    def _not_expired():
+        return or_(
+            Message.expiration_time == None,  # noqa: E711
+            Message.expiration_time > func.now(),
+        )
+
+    async def get_by_id(self, message_id: str) -> Message | None:
+        stmt = select(Message).where(Message.id == message_id).where(self._not_expired())
+
+        result = await self.session.scalars(stmt)
+        return result.one_or_none()
+
+    async def get_chain(self, leaf: Message) -> list[Message]:
+        """
+        Returns the messages from the root of leaf's thread down to leaf, in order. The parent chain is walked in the
+        database, so other branches of the thread aren't loaded.
+        """
+        ancestors = (
+            select(Message.id, Message.parent, literal(1).label("depth"))
+            .where(Message.id == leaf.parent)
+            .cte("ancestors", recursive=True)
+        )
+        ancestors = ancestors.union_all(
+            select(Message.id, Message.parent, ancestors.c.depth + 1).join(ancestors, Message.id == ancestors.c.parent)
+        )
+
+        stmt = (
+            select(Message)
+            .join(ancestors, Message.id == ancestors.c.id)
+            .where(self._not_expired())
+            .order_by(ancestors.c.depth.desc())
+        )
+
+        result = await self.session.scalars(stmt)
+        return [*result.all(), leaf]
+
+    async def add(self, *messages: Message) -> None:
+        self.session.add_all(messages)
+        await self.session.flush()
+
+    async def commit(self) -> None:
+        await self.session.commit()
+
+
+MessageRepositoryDependency = Annotated[MessageRepository, Depends()]
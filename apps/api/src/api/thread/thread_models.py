@@ -0,0 +1,81 @@
+from enum import StrEnum
+from typing import Literal
+
+from pydantic import AwareDatetime, Field, field_validator
+
+from core.api_interface import APIInterface
+from db.models.inference_opts import InferenceOpts
+from db.models.message import Message
+from db.models.model_config import ModelType
+
+
+class Role(StrEnum):
+    User = "user"
+    Assistant = "assistant"
+    System = "system"
+    ToolResponse = "tool_call_result"
+
+
+class InferenceOptionsResponse(InferenceOpts, APIInterface): ...
+
+
+class FlatMessage(APIInterface):
+    id: str
+    content: str
+    creator: str
+    role: Role
+    opts: InferenceOptionsResponse
+    root: str
+    created: AwareDatetime
+    model_id: str
+    model_host: str
+    parent: str | None = Field(default=None)
+    children: list[str] | None = Field(default=None)
+    final: bool = Field(default=False)
+    private: bool = Field(default=False)
+    model_type: ModelType | None = None
+    finish_reason: str | None = None
+    harmful: bool | None = None
+    expiration_time: AwareDatetime | None = Field(default=None)
+    thinking: str | None = Field(default=None)
+
+    @field_validator("children", mode="before")
+    @classmethod
+    def map_message_children_to_ids(cls, value):
+        if isinstance(value, list):
+            return [child.id if isinstance(child, Message) else child for child in value]
+
+        return value
+
+
+class Thread(APIInterface):
+    id: str
+    messages: list[FlatMessage]
+
+
+class StreamStartChunk(APIInterface):
+    type: Literal["start"] = "start"
+    message: str
+
+
+class ModelResponseChunk(APIInterface):
+    type: Literal["modelResponse"] = "modelResponse"
+    message: str
+    content: str
+
+
+class ThinkingChunk(APIInterface):
+    type: Literal["thinking"] = "thinking"
+    message: str
+    content: str
+
+
+class StreamErrorChunk(APIInterface):
+    message: str
+    error: str
+    reason: str
+
+
+class StreamEndChunk(APIInterface):
+    type: Literal["end"] = "end"
+    message: str
@@ -0,0 +1,26 @@
+from fastapi import APIRouter
+from fastapi.responses import StreamingResponse
+
+from api.auth.auth_service import AuthServiceDependency
+from api.thread.create_message_service import CreateMessageRequest, CreateMessageServiceDependency
+
+thread_router = APIRouter(prefix="/threads")
+
+
+@thread_router.post("/")
+async def create_message(
+    request: CreateMessageRequest,
+    auth_service: AuthServiceDependency,
+    create_message_service: CreateMessageServiceDependency,
+) -> StreamingResponse:
+    """
+    Stream a prompt response
+
+    Responds with newline-delimited JSON: a start chunk, the thread, the model's response chunks, the finished thread
+    and an end chunk.
+    """
+    token = auth_service.optional_auth()
+
+    stream = await create_message_service.create(request, token)
+
+    return StreamingResponse(stream, media_type="application/jsonl")
@@ -0,0 +1,47 @@
+"""Notify listeners when model configs change
+
+Revision ID: c4a8d2e6f1b3
+Revises: b7e3f1c9a2d4
+Create Date: 2026-10-16 18:02:17.514920
+
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "c4a8d2e6f1b3"
+down_revision: str | None = "b7e3f1c9a2d4"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # API workers keep model configs in memory and LISTEN on this channel to know when to reload them
+    op.execute("""
+        CREATE FUNCTION notify_model_config_changed() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('model_config_changed', TG_TABLE_NAME);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER model_config_changed
+        AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON model_config
+        FOR EACH STATEMENT EXECUTE FUNCTION notify_model_config_changed()
+    """)
+    op.execute("""
+        CREATE TRIGGER multi_modal_model_config_changed
+        AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON multi_modal_model_config
+        FOR EACH STATEMENT EXECUTE FUNCTION notify_model_config_changed()
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER multi_modal_model_config_changed ON multi_modal_model_config")
+    op.execute("DROP TRIGGER model_config_changed ON model_config")
+    op.execute("DROP FUNCTION notify_model_config_changed()")
@@ -19,6 +19,7 @@ from src.message.GoogleCloudStorage import GoogleCloudStorage
 from src.openapi import openapi_blueprint
 from src.otel.otel_setup import setup_otel
 from src.safety_queue.set_up_safety_queue import set_up_safety_queue
+from src.tools.mcp_tool_catalog import get_mcp_tool_catalog
 from src.v4 import create_v4_blueprint
 
 
@@ -39,6 +40,9 @@ def create_app():
 
     set_up_safety_queue()
 
+    # Start fetching MCP tool lists now so the first requests don't have to wait for them
+    get_mcp_tool_catalog().refresh([server for server in cfg.mcp.servers if server.enabled])
+
     dbc = db.Client.from_config(cfg.db)
     db_engine = make_db_engine(cfg.db, pool=dbc.pool)
     SQLAlchemyInstrumentor().instrument(engine=db_engine, enable_commenter=True)
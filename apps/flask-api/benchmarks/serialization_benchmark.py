@@ -0,0 +1,90 @@
+"""
+Compares how many stream lines per second format_message writes against the json.dumps path it replaced.
+
+The old path ran every chunk through Flask's JSON provider: json.dumps with CustomEncoder, which calls model_dump() on
+each model, sorts the keys and escapes non-ASCII text. Each case is timed on its own and as a mix that looks like a
+model response. Run it from apps/flask-api:
+
+    PYTHONPATH=. uv run python benchmarks/serialization_benchmark.py --messages 20
+"""
+
+import argparse
+import timeit
+from collections.abc import Callable
+from typing import Any
+
+from flask import Flask, json
+
+from benchmarks.thread_stream_benchmark import stream_agent_thread
+from core.api_interface import APIInterface
+from db.models.tool_definitions import ToolSource
+from src import util
+from src.message.format_messages_output import format_message
+from src.message.message_chunk import (
+    ModelResponseChunk,
+    StreamEndChunk,
+    StreamStartChunk,
+    ThinkingChunk,
+    ToolCallChunk,
+)
+from src.thread.thread_models import FlatMessage, Thread
+from src.util import CustomEncoder
+
+
+def format_message_with_json_encoder(obj: Any) -> str:
+    return json.dumps(obj=obj, cls=CustomEncoder, indent=None) + "\n"
+
+
+def lines_per_second(format_line: Callable[[APIInterface], Any], objs: list[APIInterface], repeats: int) -> float:
+    timer = timeit.Timer(lambda: [format_line(obj) for obj in objs])
+    number, _ = timer.autorange()
+    best_seconds = min(timer.repeat(repeat=repeats, number=number))
+
+    return len(objs) * number / best_seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=20)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    thread_message = next(stream_agent_thread(args.messages))
+    *_, finished_thread_message = stream_agent_thread(args.messages)
+    thread = Thread.from_message(finished_thread_message)
+
+    response_chunks: list[APIInterface] = [
+        StreamStartChunk(message="msg_reply"),
+        *(ModelResponseChunk(message="msg_reply", content=" Murphy") for _ in range(200)),
+        StreamEndChunk(message="msg_reply"),
+    ]
+    cases: dict[str, list[APIInterface]] = {
+        "model response chunk": [ModelResponseChunk(message="msg_reply", content=" Murphy")],
+        "thinking chunk": [ThinkingChunk(message="msg_reply", content=" Hmm, a dog", id="thinking_1")],
+        "tool call chunk": [
+            ToolCallChunk(
+                message="msg_reply",
+                tool_call_id="call_1",
+                tool_name="search",
+                args={"query": "labrador named Murphy"},
+                tool_source=ToolSource.MCP,
+            )
+        ],
+        "flat message": [FlatMessage.from_message(thread_message)],
+        f"thread ({len(thread.messages)} messages)": [thread],
+        "model response": response_chunks,
+    }
+
+    app = Flask(__name__)
+    app.json = util.CustomJSONProvider(app)
+
+    with app.app_context():
+        print(f"{'case':>24} {'json.dumps lines/s':>19} {'format_message lines/s':>23} {'speedup':>8}")
+        for name, objs in cases.items():
+            before = lines_per_second(format_message_with_json_encoder, objs, args.repeats)
+            after = lines_per_second(format_message, objs, args.repeats)
+            print(f"{name:>24} {before:>19,.0f} {after:>23,.0f} {after / before:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
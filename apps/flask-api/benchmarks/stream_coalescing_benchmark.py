@@ -0,0 +1,84 @@
+"""
+Compares the lines and CPU time it takes to stream one model response with and without chunk coalescing.
+
+The response is --tokens text deltas of a few characters each, arriving every --token-interval-ms. Time is simulated, so
+the benchmark runs as fast as the CPU allows. Gunicorn writes each line of the stream with its own send, so the line
+count is the number of writes per stream. Run it from apps/flask-api:
+
+    PYTHONPATH=. uv run python benchmarks/stream_coalescing_benchmark.py --tokens 2000 --token-interval-ms 2
+"""
+
+import argparse
+import time
+from collections.abc import Generator
+
+from flask import Flask
+
+from src import util
+from src.config.Config import StreamCoalescing
+from src.message.coalesce_chunks import coalesce_chunks
+from src.message.format_messages_output import format_messages
+from src.message.message_chunk import Chunk, ModelResponseChunk, StreamEndChunk, StreamStartChunk
+
+TOKENS = ["Murphy", " is", " a", " good", " dog", ",", " and", " he", " knows", " it", ".", "\n"]
+
+
+class SimulatedClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def stream_model_response(token_count: int, token_interval_seconds: float, clock: SimulatedClock) -> Generator[Chunk]:
+    yield StreamStartChunk(message="msg_reply")
+    for index in range(token_count):
+        clock.now = index * token_interval_seconds
+        yield ModelResponseChunk(message="msg_reply", content=TOKENS[index % len(TOKENS)])
+    yield StreamEndChunk(message="msg_reply")
+
+
+def measure(token_count: int, token_interval_seconds: float, coalescing: StreamCoalescing) -> tuple[int, int, float]:
+    clock = SimulatedClock()
+    stream: Generator[Chunk] = stream_model_response(token_count, token_interval_seconds, clock)
+    if coalescing.enabled:
+        stream = coalesce_chunks(
+            stream, max_delay_seconds=coalescing.max_delay_seconds, max_bytes=coalescing.max_bytes, clock=clock
+        )
+
+    start = time.process_time()
+    lines = list(format_messages(stream))
+    cpu_seconds = time.process_time() - start
+
+    return len(lines), sum(len(line) for line in lines), cpu_seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tokens", type=int, default=2000)
+    parser.add_argument("--token-interval-ms", type=float, default=2.0)
+    parser.add_argument("--max-delay-ms", type=float, default=20.0)
+    parser.add_argument("--max-bytes", type=int, default=256)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    app.json = util.CustomJSONProvider(app)
+
+    settings = {
+        "off": StreamCoalescing(enabled=False),
+        "on": StreamCoalescing(enabled=True, max_delay_seconds=args.max_delay_ms / 1000, max_bytes=args.max_bytes),
+    }
+
+    with app.app_context():
+        print(f"{'coalescing':>10} {'writes':>7} {'bytes':>10} {'cpu (best of ' + str(args.repeats) + ')':>20}")
+        for name, coalescing in settings.items():
+            results = [measure(args.tokens, args.token_interval_ms / 1000, coalescing) for _ in range(args.repeats)]
+            line_count, byte_count, _ = results[0]
+            best_cpu_seconds = min(cpu_seconds for _, _, cpu_seconds in results)
+            print(f"{name:>10} {line_count:>7} {byte_count:>10,} {best_cpu_seconds * 1000:>18.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Opens many concurrent thread streams against a running API and reports how many streams the server was
+producing at once, time to first byte, and total stream time.
+
+Run it against a local server started with ./start.sh (or ./dev.sh):
+
+    uv run python benchmarks/stream_load_test.py --concurrency 64 --requests 256
+
+Pass --api v5 to send the same load to the FastAPI app's /v5/threads endpoint instead (apps/api, started with
+`fastapi run main.py --port 8888`), which is how the two streaming paths are compared:
+
+    uv run python benchmarks/stream_load_test.py --api v5 --origin http://localhost:8888 --concurrency 64
+
+Pointing --host/--model at a model with a slow upstream is the most useful setup, since streams that finish
+instantly never overlap and won't show whether a worker can hold more than one stream open.
+"""
+
+import argparse
+import statistics
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+import requests
+
+ANONYMOUS_USER_ID_HEADER = "X-Anonymous-User-ID"
+
+
+@dataclass
+class StreamResult:
+    ok: bool
+    ttfb_s: float | None
+    total_s: float
+    error: str | None = None
+
+
+class ActiveStreamCounter:
+    """Counts streams between their first byte and their last, i.e. streams the server is actively producing."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.current = 0
+        self.peak = 0
+
+    def start(self):
+        with self._lock:
+            self.current += 1
+            self.peak = max(self.peak, self.current)
+
+    def end(self):
+        with self._lock:
+            self.current -= 1
+
+
+def post_stream(api: str, origin: str, host: str, model: str, content: str) -> requests.Response:
+    headers = {ANONYMOUS_USER_ID_HEADER: str(uuid.uuid4())}
+
+    if api == "v5":
+        return requests.post(
+            f"{origin}/v5/threads/",
+            headers=headers,
+            json={"content": content, "model": model, "private": True},
+            stream=True,
+            timeout=600,
+        )
+
+    return requests.post(
+        f"{origin}/v4/threads",
+        headers=headers,
+        files={
+            "content": (None, content),
+            "host": (None, host),
+            "model": (None, model),
+            "private": (None, "true"),
+        },
+        stream=True,
+        timeout=600,
+    )
+
+
+def stream_once(
+    api: str, origin: str, host: str, model: str, content: str, active: ActiveStreamCounter
+) -> StreamResult:
+    start = time.perf_counter()
+    ttfb: float | None = None
+
+    try:
+        with post_stream(api, origin, host, model, content) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if ttfb is None and line:
+                    ttfb = time.perf_counter() - start
+                    active.start()
+    except requests.RequestException as e:
+        return StreamResult(ok=False, ttfb_s=ttfb, total_s=time.perf_counter() - start, error=str(e))
+    finally:
+        if ttfb is not None:
+            active.end()
+
+    return StreamResult(ok=True, ttfb_s=ttfb, total_s=time.perf_counter() - start)
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))
+    return ordered[index]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--api", choices=["v4", "v5"], default="v4")
+    parser.add_argument("--origin", default="http://localhost:8000")
+    parser.add_argument("--host", default="test_backend")
+    parser.add_argument("--model", default="test-model-no-tools")
+    parser.add_argument("--content", default="Write a short poem about a labrador named Murphy.")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=128)
+    args = parser.parse_args()
+
+    active = ActiveStreamCounter()
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        results = list(
+            executor.map(
+                lambda _: stream_once(args.api, args.origin, args.host, args.model, args.content, active),
+                range(args.requests),
+            )
+        )
+    wall_s = time.perf_counter() - wall_start
+
+    succeeded = [r for r in results if r.ok]
+    failed = [r for r in results if not r.ok]
+    ttfbs = [r.ttfb_s for r in succeeded if r.ttfb_s is not None]
+    totals = [r.total_s for r in succeeded]
+
+    print(f"requests:            {len(results)} ({len(failed)} failed)")
+    print(f"wall time:           {wall_s:.2f}s ({len(succeeded) / wall_s:.1f} streams/s)")
+    print(f"peak active streams: {active.peak}")
+    print(
+        f"ttfb p50/p95/p99:    {percentile(ttfbs, 50):.3f}s / {percentile(ttfbs, 95):.3f}s / {percentile(ttfbs, 99):.3f}s"
+    )
+    print(
+        f"stream p50/p95/max:  {percentile(totals, 50):.3f}s / {percentile(totals, 95):.3f}s / {max(totals, default=0):.3f}s"
+    )
+    if ttfbs:
+        print(f"ttfb mean/stdev:     {statistics.mean(ttfbs):.3f}s / {statistics.pstdev(ttfbs):.3f}s")
+    for r in failed[:5]:
+        print(f"error: {r.error}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Compares the bytes and CPU time it takes to stream an agent thread in the full and delta stream modes.
+
+The stream is replayed in memory the way stream_new_message yields it: every step adds an empty assistant reply and
+yields the thread, then finishes the reply with a tool call, adds the tool's response and yields the thread again.
+Model response chunks are the same in both modes, so they're left out. Run it from apps/flask-api:
+
+    PYTHONPATH=. uv run python benchmarks/thread_stream_benchmark.py --messages 50
+"""
+
+import argparse
+import time
+from collections.abc import Generator
+from datetime import UTC, datetime
+
+from flask import Flask
+from sqlalchemy.orm.attributes import set_committed_value
+
+from db.models.message import Message
+from db.models.tool_call import ToolCall
+from db.models.tool_definitions import ToolSource
+from src import util
+from src.dao.message.message_models import Role
+from src.message.create_message_service.stream_new_message import repair_children
+from src.message.format_messages_output import format_messages
+from src.message.message_chunk import StreamMode
+
+ASSISTANT_CONTENT = "Let me look that up. " * 25
+TOOL_RESPONSE_CONTENT = "A search result about labradors named Murphy. " * 50
+
+
+def create_message(message_id: str, role: Role, content: str, parent: Message | None, *, final: bool) -> Message:
+    message = Message(
+        id=message_id,
+        content=content,
+        creator="benchmark",
+        role=role,
+        opts={},
+        root=parent.root if parent is not None else message_id,
+        model_id="benchmark-model",
+        model_host="test_backend",
+        parent=parent.id if parent is not None else None,
+        final=final,
+        expiration_time=None,
+    )
+    message.created = datetime.now(UTC)
+    set_committed_value(message, "labels", [])
+
+    return message
+
+
+def stream_agent_thread(message_count: int) -> Generator[Message]:
+    system_message = create_message("msg_system", Role.System, "You are a helpful agent.", None, final=True)
+    user_message = create_message("msg_user", Role.User, "Find me a poem about Murphy.", system_message, final=True)
+    message_chain = [system_message, user_message]
+
+    step = 0
+    while len(message_chain) < message_count:
+        reply = create_message(f"msg_reply_{step}", Role.Assistant, "", message_chain[-1], final=False)
+        message_chain.append(reply)
+        repair_children(message_chain)
+        yield system_message
+
+        reply.content = ASSISTANT_CONTENT
+        reply.final = True
+        reply.tool_calls = [
+            ToolCall(
+                tool_call_id=f"tool_call_{step}",
+                tool_name="search",
+                tool_source=ToolSource.MCP,
+                args={"query": f"labrador named Murphy, page {step}"},
+                message_id=reply.id,
+            )
+        ]
+        message_chain.append(
+            create_message(f"msg_tool_{step}", Role.ToolResponse, TOOL_RESPONSE_CONTENT, reply, final=True)
+        )
+        repair_children(message_chain)
+        yield system_message
+
+        step += 1
+
+
+def measure(message_count: int, stream_mode: StreamMode) -> tuple[int, int, float]:
+    start = time.process_time()
+    lines = list(format_messages(stream_agent_thread(message_count), stream_mode=stream_mode))
+    cpu_seconds = time.process_time() - start
+
+    return len(lines), sum(len(line) for line in lines), cpu_seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=50)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    app.json = util.CustomJSONProvider(app)
+
+    with app.app_context():
+        print(f"{'mode':>6} {'lines':>6} {'bytes':>12} {'cpu (best of ' + str(args.repeats) + ')':>20}")
+        for stream_mode in StreamMode:
+            results = [measure(args.messages, stream_mode) for _ in range(args.repeats)]
+            line_count, byte_count, _ = results[0]
+            best_cpu_seconds = min(cpu_seconds for _, _, cpu_seconds in results)
+            print(f"{stream_mode:>6} {line_count:>6} {byte_count:>12,} {best_cpu_seconds * 1000:>18.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
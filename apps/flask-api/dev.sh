@@ -3,6 +3,8 @@ pwd
 exec \
     gunicorn \
     --workers 1 \
+    --worker-class gthread \
+    --threads "${GUNICORN_THREADS:-8}" \
     --timeout 0 \
     --bind 0.0.0.0:8000 \
     --enable-stdio-inheritance \
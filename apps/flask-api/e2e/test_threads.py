@@ -397,6 +397,8 @@ class TestThreadEndpoints(BaseTestThreadEndpoints):
         r.raise_for_status()
 
         response = GetThreadsResponse.model_validate(r.json())
+        # The total is only counted for the first page
+        assert response.meta.total is not None
         assert response.meta.total > 0
         assert response.meta.offset == 0
         assert response.meta.limit == 10
@@ -5,11 +5,14 @@ from pydantic import ValidationError
 
 from src import db
 from src.agent.agent_stream_service import AgentChatRequest, stream_agent_chat
+from src.auth.auth_service import authn
 from src.auth.resource_protectors import anonymous_auth_protector
+from src.config.get_config import get_config
 from src.error import handle_validation_error
 from src.flask_pydantic_api.api_wrapper import pydantic_api
 from src.message.format_messages_output import format_messages
 from src.message.GoogleCloudStorage import GoogleCloudStorage
+from src.message.stream_replay import get_stream_replay_registry
 
 
 def create_agents_blueprint(dbc: db.Client, storage_client: GoogleCloudStorage) -> Blueprint:
@@ -19,10 +22,34 @@ def create_agents_blueprint(dbc: db.Client, storage_client: GoogleCloudStorage)
     @anonymous_auth_protector()
     @pydantic_api(name="Stream a chat agent response", tags=["v4", "agents"])
     def stream_chat_agent_response(request: AgentChatRequest):
+        def start_stream():
+            return stream_agent_chat(request=request, dbc=dbc, storage_client=storage_client)
+
         try:
-            stream_response = stream_agent_chat(request=request, dbc=dbc, storage_client=storage_client)
+            stream_replay = get_stream_replay_registry()
+            if stream_replay is not None:
+                stream_lines = stream_replay.start(
+                    start_stream,
+                    owner=authn().client,
+                    stream_mode=request.stream_mode,
+                    coalescing=get_config().stream_coalescing,
+                )
+                if isinstance(stream_lines, Generator):
+                    return Response(stream_lines, mimetype="application/jsonl")
+                return jsonify(stream_lines)
+
+            stream_response = start_stream()
             if isinstance(stream_response, Generator):
-                return Response(stream_with_context(format_messages(stream_response)), mimetype="application/jsonl")
+                return Response(
+                    stream_with_context(
+                        format_messages(
+                            stream_response,
+                            stream_mode=request.stream_mode,
+                            coalescing=get_config().stream_coalescing,
+                        )
+                    ),
+                    mimetype="application/jsonl",
+                )
             return jsonify(stream_response)
 
         except ValidationError as e:
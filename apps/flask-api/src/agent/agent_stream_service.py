@@ -15,6 +15,7 @@ from src.message.create_message_service.endpoint import (
     stream_message_from_model,
 )
 from src.message.GoogleCloudStorage import GoogleCloudStorage
+from src.message.message_chunk import StreamMode
 from src.tools.mcp_service import find_mcp_config_by_id
 
 
@@ -28,6 +29,7 @@ class AgentChatRequest(APIInterface):
         default=None
     )
     max_steps: int | None = Field(default=None)
+    stream_mode: StreamMode = Field(default=StreamMode.FULL)
 
     @field_validator("content", mode="after")
     @classmethod
@@ -1,4 +1,5 @@
 from flask import Blueprint
+from sqlalchemy.orm import Session
 from werkzeug import exceptions
 
 from infini_gram_api_client import Client
@@ -10,7 +11,7 @@ from src.attribution.attribution_service import (
 from src.config.get_config import cfg
 from src.dao.flask_sqlalchemy_session import current_session
 from src.flask_pydantic_api.api_wrapper import pydantic_api
-from src.model_config.get_model_config_service import get_single_model_config_admin
+from src.model_config.model_catalog import get_model_catalog
 
 attribution_blueprint = Blueprint(name="attribution", import_name=__name__)
 
@@ -20,7 +21,7 @@ attribution_blueprint = Blueprint(name="attribution", import_name=__name__)
 def get_attribution_for_model_response(
     corpuslink_request: GetAttributionRequest,
 ) -> AttributionResponse:
-    config = get_single_model_config_admin(current_session, corpuslink_request.model_id)
+    config = get_model_catalog().get_model(lambda: Session(current_session.get_bind()), corpuslink_request.model_id)
     if config is None:
         raise exceptions.NotFound
 
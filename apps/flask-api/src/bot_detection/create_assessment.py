@@ -1,6 +1,12 @@
 from google.cloud import recaptchaenterprise_v1
 from google.cloud.recaptchaenterprise_v1 import Assessment
 
+from src.util.client_registry import client_registry
+
+
+def get_recaptcha_client() -> recaptchaenterprise_v1.RecaptchaEnterpriseServiceClient:
+    return client_registry.get("recaptcha_enterprise", recaptchaenterprise_v1.RecaptchaEnterpriseServiceClient)
+
 
 # Taken from Google's impl code https://console.cloud.google.com/security/recaptcha/6LeriH8qAAAAAMM4IDvYUaxqdg7d6yPVSc5ayQHy/integration?project=ai2-reviz
 def create_assessment(
@@ -19,7 +25,7 @@ def create_assessment(
         recaptcha_action: Action name corresponding to the token.
     """
 
-    client = recaptchaenterprise_v1.RecaptchaEnterpriseServiceClient()
+    client = get_recaptcha_client()
 
     # Set the properties of the event to be tracked.
     event = recaptchaenterprise_v1.Event()
@@ -72,6 +72,9 @@ class Wildguard:
     address: str
     token: str
     compute_source_id: str
+    # Identifies the model behind the WildGuard Modal function. Its verdicts are only cached while this is set, and
+    # changing it stops verdicts from the previous model being reused
+    model_version: str | None
 
 
 @dataclass
@@ -122,11 +125,35 @@ class McpServer:
     id: str
     enabled: bool
     available_for_all_models: bool
+    # Tools whose results can be reused for identical calls, mapped to how long a result is kept for
+    tool_result_cache_ttl_seconds: dict[str, float]
+
+
+class McpToolCatalog(BaseModel):
+    # Tool lists are cached per MCP server. Once a list is older than ttl_seconds it's still served while a fresh copy
+    # is fetched in the background
+    ttl_seconds: float = Field(default=300.0)
+    fetch_timeout_seconds: float = Field(default=10.0)
+    # How long a request waits for a server whose tools haven't been fetched yet before going on without them
+    wait_seconds: float = Field(default=2.0)
+    # How long to wait before trying a server again after a fetch fails
+    retry_seconds: float = Field(default=30.0)
+
+
+class McpSessionPool(BaseModel):
+    # Tool calls share one initialized session per MCP server instead of connecting for every call
+    max_concurrent_calls_per_server: int = Field(default=8)
+    connect_timeout_seconds: float = Field(default=5.0)
+    # A session that hasn't been used for this long is pinged before it's used again, and replaced if that fails
+    health_check_after_idle_seconds: float = Field(default=60.0)
+    ping_timeout_seconds: float = Field(default=2.0)
 
 
 @dataclass
 class Mcp:
     servers: list[McpServer]
+    tool_catalog: McpToolCatalog
+    session_pool: McpSessionPool
 
 
 @dataclass
@@ -154,6 +181,85 @@ class GoogleModerateText(BaseModel):
     )
 
 
+class SafetyVerdictCache(BaseModel):
+    # Text safety verdicts are reused for identical text until they expire
+    enabled: bool = Field(default=True)
+    ttl_seconds: float = Field(default=3600.0)
+    max_entries: int = Field(default=10_000)
+    # Shares verdicts between workers through the redis instance at queue_url
+    use_redis: bool = Field(default=False)
+
+
+class SafetyChecks(BaseModel):
+    # Shared deadline for the checks run before a message is created. Checks that miss it use their failure policy
+    timeout_seconds: float = Field(default=30.0)
+    # Checks from every request in a worker run on a shared pool of this many threads
+    max_workers: int = Field(default=32)
+    verdict_cache: SafetyVerdictCache = Field(default_factory=SafetyVerdictCache)
+
+
+class ToolCalls(BaseModel):
+    # Tool calls from one model reply run concurrently, up to this many at a time
+    max_concurrent_calls_per_step: int = Field(default=4)
+    # Tool calls from every reply in a worker run on a shared pool of this many threads
+    max_workers: int = Field(default=32)
+    # Remote tool calls that take longer than this are abandoned and the model is told the tool timed out
+    timeout_seconds: float = Field(default=120.0)
+    # Internal tools whose results can be reused for identical calls, mapped to how long a result is kept for. MCP tools
+    # are configured on their server
+    internal_tool_result_cache_ttl_seconds: dict[str, float] = Field(default_factory=dict)
+    result_cache_max_entries: int = Field(default=1000)
+
+
+class InferenceHttpClient(BaseModel):
+    # Connection pool shared by every OpenAI-compatible inference provider in a worker
+    max_connections: int = Field(default=100)
+    max_keepalive_connections: int = Field(default=20)
+    keepalive_expiry_seconds: float = Field(default=60.0)
+    connect_timeout_seconds: float = Field(default=5.0)
+    timeout_seconds: float = Field(default=600.0)
+
+
+class ModelCatalog(BaseModel):
+    # Workers keep model configs in memory. They're reloaded when Postgres notifies a worker that they changed, and
+    # after max_age_seconds in case a notification was missed
+    listen_for_changes: bool = Field(default=True)
+    max_age_seconds: float = Field(default=300.0)
+
+
+class StreamCoalescing(BaseModel):
+    # Merges text and thinking deltas that arrive close together into one line of the response stream. The first
+    # delta of a message is always sent right away
+    enabled: bool = Field(default=False)
+    max_delay_seconds: float = Field(default=0.02)
+    max_bytes: int = Field(default=256)
+
+
+class StreamReplay(BaseModel):
+    # Runs each response stream on its own thread, apart from the request that started it, and keeps the lines it
+    # writes so a client that lost its connection can catch up with GET /v4/threads/<id>/stream?after=<lines read>
+    enabled: bool = Field(default=False)
+    max_lines_per_stream: int = Field(default=5000)
+    max_streams: int = Field(default=1000)
+    # Streams run on a pool of this many threads per worker. A stream started while they're all busy waits for one. A
+    # worker that's shutting down waits for its streams to finish, up to the server's graceful timeout
+    max_concurrent_streams: int = Field(default=64)
+    # How long a finished stream can still be replayed for
+    retention_seconds: float = Field(default=300.0)
+    # Readers stop following a stream that hasn't written anything for this long
+    idle_timeout_seconds: float = Field(default=120.0)
+    # Copies the lines to the redis instance at queue_url so clients can catch up through any worker
+    use_redis: bool = Field(default=False)
+
+
+class StreamCancellation(BaseModel):
+    # Stops a response and its model request as soon as the client disconnects, instead of when the response is next
+    # written. Streams that can be resumed (stream_replay) keep going without their client either way.
+    cancel_on_disconnect: bool = Field(default=True)
+    # Sends cancel requests through the redis instance at queue_url so a stream can be cancelled through any worker
+    use_redis: bool = Field(default=False)
+
+
 DEFAULT_CONFIG_PATH = "/secret/cfg/config.json"
 
 
@@ -176,6 +282,13 @@ class Config:
     modal_openai: ModalOpenAI
     mcp: Mcp
     google_moderate_text: GoogleModerateText
+    safety_checks: SafetyChecks
+    tool_calls: ToolCalls
+    inference_http_client: InferenceHttpClient
+    model_catalog: ModelCatalog
+    stream_coalescing: StreamCoalescing
+    stream_replay: StreamReplay
+    stream_cancellation: StreamCancellation
     otel: Otel
     queue_url: str
 
@@ -222,6 +335,7 @@ class Config:
                     address=data["wildguard"].get("address"),
                     token=data["wildguard"].get("token"),
                     compute_source_id=data["wildguard"].get("compute_source_id"),
+                    model_version=data["wildguard"].get("model_version"),
                 ),
                 infini_gram=InfiniGram(
                     model_index_map={
@@ -269,10 +383,20 @@ class Config:
                             id=server["id"],
                             enabled=server["enabled"],
                             available_for_all_models=server.get("available_for_all_models", True),
+                            tool_result_cache_ttl_seconds=server.get("tool_result_cache_ttl_seconds", {}),
                         )
                         for server in data["mcp"]["servers"]
-                    ]
+                    ],
+                    tool_catalog=McpToolCatalog.model_validate(data["mcp"].get("tool_catalog", {})),
+                    session_pool=McpSessionPool.model_validate(data["mcp"].get("session_pool", {})),
                 ),
                 google_moderate_text=GoogleModerateText.model_validate(data.get("google_safety_check", {})),
+                safety_checks=SafetyChecks.model_validate(data.get("safety_checks", {})),
+                tool_calls=ToolCalls.model_validate(data.get("tool_calls", {})),
+                inference_http_client=InferenceHttpClient.model_validate(data.get("inference_http_client", {})),
+                model_catalog=ModelCatalog.model_validate(data.get("model_catalog", {})),
+                stream_coalescing=StreamCoalescing.model_validate(data.get("stream_coalescing", {})),
+                stream_replay=StreamReplay.model_validate(data.get("stream_replay", {})),
+                stream_cancellation=StreamCancellation.model_validate(data.get("stream_cancellation", {})),
                 queue_url=data.get("queue_url"),
             )
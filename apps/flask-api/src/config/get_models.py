@@ -1,14 +1,15 @@
 import logging
 
+from sqlalchemy.orm import Session
 from werkzeug import exceptions
 
 from db.models.model_config import ModelConfig, MultiModalModelConfig
 from src.dao.flask_sqlalchemy_session import current_session
-from src.model_config.get_model_config_service import get_single_model_config_admin
+from src.model_config.model_catalog import get_model_catalog
 
 
 def get_model_by_id(id: str) -> ModelConfig | MultiModalModelConfig:
-    model = get_single_model_config_admin(current_session, id)
+    model = get_model_catalog().get_model(lambda: Session(current_session.get_bind()), id)
 
     if model is None:
         logging.getLogger().error("Couldn't find model %s", id)
@@ -86,3 +86,20 @@ class MessageList(paged.List):
 class ThreadList:
     threads: Sequence[SQLAMessage] | Sequence[Message]
     meta: paged.ListMeta
+    next_cursor: str | None = None
+
+
+@dataclass
+class ThreadSummaryRow:
+    id: str
+    snippet: str
+    model_id: str
+    created: datetime
+    message_count: int
+
+
+@dataclass
+class ThreadSummaryList:
+    threads: Sequence[ThreadSummaryRow]
+    meta: paged.ListMeta
+    next_cursor: str | None = None
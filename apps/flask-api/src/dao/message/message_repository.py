@@ -1,11 +1,14 @@
 import abc
+from collections import defaultdict
 from collections.abc import Sequence
-from typing import cast
+from typing import Any, TypeVar, cast
 
-from sqlalchemy import CursorResult, func, or_, select, update
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import ColumnElement, CursorResult, Select, case, func, inspect, literal, or_, select, tuple_, update
+from sqlalchemy.orm import Session, aliased, defer, joinedload, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
 
 import core.object_id as obj
+from core.text_snippet import text_snippet
 from db.models.label import Label
 from db.models.message import Message
 from db.models.model_config import ModelType
@@ -13,20 +16,29 @@ from src.dao import label as old_label
 from src.dao import paged
 from src.dao.message.inference_opts_model import InferenceOpts
 from src.dao.message.message_models import Message as OldMessage
-from src.dao.message.message_models import Role, ThreadList
+from src.dao.message.message_models import Role, ThreadList, ThreadSummaryList, ThreadSummaryRow
 from src.dao.paged import Opts
-from src.message.map_text_snippet import text_snippet
+from src.dao.statement_counter import count_statements
+from src.otel.default_tracer import get_default_tracer
+
+tracer = get_default_tracer()
+
+T = TypeVar("T", bound=tuple[Any, ...])
 
 
 class BaseMessageRepository(abc.ABC):
     @abc.abstractmethod
-    def add(self, message: Message) -> Message:
+    def add(self, message: Message, *, commit: bool = True) -> Message:
         raise NotImplementedError
 
     @abc.abstractmethod
     def get_messages_by_root(self, message_id: obj.ID, user_id: str) -> Sequence[Message] | None:
         raise NotImplementedError
 
+    @abc.abstractmethod
+    def get_message_chain(self, message_id: obj.ID, user_id: str) -> Sequence[Message]:
+        raise NotImplementedError
+
     @abc.abstractmethod
     def get_messages_by_root_for_delete(self, message_id: obj.ID) -> Sequence[Message]:
         raise NotImplementedError
@@ -43,7 +55,11 @@ class BaseMessageRepository(abc.ABC):
         raise NotImplementedError
 
     @abc.abstractmethod
-    def update(self, message: Message) -> Message:
+    def update(self, message: Message, *, commit: bool = True) -> Message:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def commit(self) -> None:
         raise NotImplementedError
 
     @abc.abstractmethod
@@ -58,6 +74,10 @@ class BaseMessageRepository(abc.ABC):
     def get_threads_for_user(self, user_id: str, sort_opts: Opts) -> ThreadList:
         raise NotImplementedError
 
+    @abc.abstractmethod
+    def get_thread_summaries_for_user(self, user_id: str, sort_opts: Opts) -> ThreadSummaryList:
+        raise NotImplementedError
+
     @abc.abstractmethod
     def migrate_messages_to_new_user(self, previous_user_id: str, new_user_id: str) -> int:
         raise NotImplementedError
@@ -66,6 +86,10 @@ class BaseMessageRepository(abc.ABC):
     def get_by_creator(self, creator_id: str) -> Sequence[Message]:
         raise NotImplementedError
 
+    @abc.abstractmethod
+    def release_connection(self) -> None:
+        raise NotImplementedError
+
 
 class MessageRepository(BaseMessageRepository):
     session: Session
@@ -73,12 +97,20 @@ class MessageRepository(BaseMessageRepository):
     def __init__(self, session: Session):
         self.session = session
 
-    def add(self, message: Message) -> Message:
+    def add(self, message: Message, *, commit: bool = True) -> Message:
+        """
+        Pass commit=False to batch this insert with later writes. It'll be sent on the next commit() (or autoflush).
+
+        The server-generated columns are fetched with RETURNING when the insert is flushed, so there's no need to read
+        the row back.
+        """
+        message.snippet = text_snippet(message.content)
         self.session.add(message)
-        self.session.flush()
-        self.session.commit()
 
-        return self.session.get_one(Message, message.id)
+        if commit:
+            self.session.commit()
+
+        return message
 
     def get_messages_by_root(self, message_id: obj.ID, user_id: str) -> Sequence[Message] | None:
         query = (
@@ -96,30 +128,96 @@ class MessageRepository(BaseMessageRepository):
 
         return self.session.scalars(query).unique().all()
 
+    @tracer.start_as_current_span("MessageRepository.get_message_chain")
+    def get_message_chain(self, message_id: obj.ID, user_id: str) -> Sequence[Message]:
+        """
+        Gets the message and its ancestors, ordered from the root down to the message. Other branches of the thread
+        aren't loaded.
+
+        The chain is walked in the database with a recursive CTE. Tool calls, tool definitions and the user's labels
+        are loaded up front so building the model's context doesn't lazy load them message by message.
+        """
+        ancestors = (
+            select(Message.id, Message.parent, literal(0).label("depth"))
+            .where(Message.id == message_id)
+            .cte("ancestors", recursive=True)
+        )
+        ancestors = ancestors.union_all(
+            select(Message.id, Message.parent, ancestors.c.depth + 1).join(ancestors, Message.id == ancestors.c.parent)
+        )
+
+        query = (
+            select(Message)
+            .join(ancestors, Message.id == ancestors.c.id)
+            .where(
+                or_(
+                    Message.expiration_time == None,  # noqa: E711
+                    Message.expiration_time > func.now(),
+                )
+            )
+            .options(
+                # logprobs can be large and nothing in the chain reads them
+                defer(Message.logprobs),
+                selectinload(Message.tool_calls),
+                selectinload(Message.tool_definitions),
+                selectinload(Message.labels.and_(Label.deleted == None, Label.creator == user_id)),  # noqa: E711
+            )
+            .order_by(ancestors.c.depth.desc())
+        )
+
+        with count_statements(self.session):
+            return self.session.scalars(query).all()
+
     def get_messages_by_root_for_delete(self, message_id: obj.ID) -> Sequence[Message]:
         query = select(Message).where(Message.root == message_id)
 
         return self.session.scalars(query).unique().all()
 
+    @tracer.start_as_current_span("MessageRepository.get_message_with_children")
     def get_message_with_children(self, message_id: obj.ID, user_id: str) -> Sequence[Message] | None:
+        """
+        Gets the message and everything under it, flattened depth first with siblings in the order they were created.
+
+        The subtree is fetched with a recursive CTE and its tool calls, tool definitions and the user's labels are
+        loaded alongside it, so the number of queries doesn't grow with the size of the thread. children is filled in
+        from the loaded messages instead of being lazy loaded.
+        """
+        descendants = select(Message.id).where(Message.id == message_id).cte("descendants", recursive=True)
+        descendants = descendants.union_all(select(Message.id).join(descendants, Message.parent == descendants.c.id))
+
         query = (
             select(Message)
-            .where(Message.id == message_id)
+            .join(descendants, Message.id == descendants.c.id)
             .where(
                 or_(
                     Message.expiration_time == None,
                     Message.expiration_time > func.now(),
                 )
             )
-            .options(joinedload(Message.labels.and_(Label.deleted == None, Label.creator == user_id)))  # noqa: E711
-            .order_by(Message.created.asc())
+            .options(
+                selectinload(Message.tool_calls),
+                selectinload(Message.tool_definitions),
+                selectinload(Message.labels.and_(Label.deleted == None, Label.creator == user_id)),  # noqa: E711
+            )
+            .order_by(Message.created.asc(), Message.id.asc())
         )
 
-        result = self.session.scalars(query).unique().all()
-        if len(result) == 0:
+        with count_statements(self.session):
+            messages = self.session.scalars(query).all()
+
+        message = next((message for message in messages if message.id == message_id), None)
+        if message is None:
             return None
 
-        return self.flatten_message_children(result[0])
+        children_by_parent: dict[str, list[Message]] = defaultdict(list)
+        for child in messages:
+            if child.parent is not None and child.id != message_id:
+                children_by_parent[child.parent].append(child)
+
+        for parent in messages:
+            set_committed_value(parent, "children", children_by_parent[parent.id])
+
+        return self.flatten_message_children(message)
 
     def flatten_message_children(self, message: Message):
         result = [message]
@@ -144,16 +242,45 @@ class MessageRepository(BaseMessageRepository):
             return None
         return results[0]
 
-    def update(self, message: Message) -> Message:
-        message_to_update = self.session.get_one(Message, message.id)
+    @tracer.start_as_current_span("MessageRepository.update")
+    def update(self, message: Message, *, commit: bool = True) -> Message:
+        """
+        Writes the columns that changed on message with a single UPDATE. Relationships like tool_definitions aren't
+        written, so their association rows are left alone.
+        """
+        # Snippets are stored so reading messages doesn't have to strip their HTML again
+        if inspect(message).attrs.content.history.has_changes():
+            message.snippet = text_snippet(message.content)
 
-        for var, value in vars(message).items():
-            setattr(message_to_update, var, value) if value else None
+        with count_statements(self.session):
+            # Messages we loaded or added in this session are already tracked. Flushing them only writes dirty columns
+            message_to_update = message if message in self.session else self._update_untracked(message)
+
+            if commit:
+                self.session.commit()
 
-        self.session.flush()
-        self.session.commit()
         return message_to_update
 
+    def _update_untracked(self, message: Message) -> Message:
+        message_state = inspect(message)
+        changed_columns = {
+            column.key: message_state.attrs[column.key].value
+            for column in inspect(Message).column_attrs
+            if column.key != "id" and message_state.attrs[column.key].history.has_changes()
+        }
+
+        if not changed_columns:
+            return message
+
+        return self.session.scalars(
+            update(Message).where(Message.id == message.id).values(changed_columns).returning(Message)
+        ).one()
+
+    @tracer.start_as_current_span("MessageRepository.commit")
+    def commit(self) -> None:
+        with count_statements(self.session):
+            self.session.commit()
+
     def soft_delete(self, message_id: obj.ID) -> None | Message:
         msg = self.session.execute(
             update(Message).where(Message.id == message_id).values(deleted=func.now()).returning(Message)
@@ -169,28 +296,67 @@ class MessageRepository(BaseMessageRepository):
         self.session.commit()
 
     def get_threads_for_user(self, user_id: str, sort_opts: Opts) -> ThreadList:
-        thread_conditions = [
-            Message.creator == user_id,
-            Message.final == True,  # noqa: E712
-            Message.parent == None,  # noqa: E711
-            or_(Message.expiration_time == None, Message.expiration_time > func.now()),  # noqa: E711
-        ]
+        select_messages = _paginate_threads(select(Message).where(*_thread_conditions(user_id)), sort_opts)
 
-        total = self.session.query(Message.id).where(*thread_conditions).count()
+        threads, next_cursor = _split_next_page(self.session.scalars(select_messages).unique().all(), sort_opts)
 
-        select_messages = select(Message).where(*thread_conditions).order_by(Message.created.desc())
+        return ThreadList(
+            threads=threads,
+            meta=self._thread_list_meta(user_id, sort_opts),
+            next_cursor=next_cursor,
+        )
+
+    def get_thread_summaries_for_user(self, user_id: str, sort_opts: Opts) -> ThreadSummaryList:
+        """
+        Lists the same threads as get_threads_for_user, but only reads each thread's root and counts its messages
+        instead of loading them, all in one query.
+
+        Only the root's stored snippet is read. Its content is only read for roots written before snippets were stored.
+        """
+        thread_message = aliased(Message)
+        message_count = select(func.count(thread_message.id)).where(thread_message.root == Message.id).scalar_subquery()
+
+        select_summaries = _paginate_threads(
+            select(
+                Message.id,
+                Message.snippet,
+                case((Message.snippet == None, Message.content)).label("content"),  # noqa: E711
+                Message.model_id,
+                Message.created,
+                message_count.label("message_count"),
+            ).where(*_thread_conditions(user_id)),
+            sort_opts,
+        )
 
-        if sort_opts.limit is not None:
-            select_messages = select_messages.limit(sort_opts.limit)
+        rows, next_cursor = _split_next_page(self.session.execute(select_summaries).all(), sort_opts)
 
-        if sort_opts.offset is not None:
-            select_messages = select_messages.offset(sort_opts.offset)
+        return ThreadSummaryList(
+            threads=[
+                ThreadSummaryRow(
+                    id=row.id,
+                    snippet=row.snippet if row.snippet is not None else text_snippet(row.content),
+                    model_id=row.model_id,
+                    created=row.created,
+                    message_count=row.message_count,
+                )
+                for row in rows
+            ],
+            meta=self._thread_list_meta(user_id, sort_opts),
+            next_cursor=next_cursor,
+        )
 
-        threads = self.session.scalars(select_messages).unique().all()
+    def _thread_list_meta(self, user_id: str, sort_opts: Opts) -> paged.ListMeta:
+        # Clients already have the total from the first page, so don't count again for every page after it
+        total = (
+            self.session.query(Message.id).where(*_thread_conditions(user_id)).count()
+            if sort_opts.cursor is None
+            else None
+        )
 
-        return ThreadList(
-            threads=threads,
-            meta=paged.ListMeta(total=total, offset=sort_opts.offset, limit=sort_opts.limit),
+        return paged.ListMeta(
+            total=total,
+            offset=sort_opts.offset if sort_opts.cursor is None else None,
+            limit=sort_opts.limit,
         )
 
     def migrate_messages_to_new_user(self, previous_user_id: str, new_user_id: str):
@@ -211,6 +377,50 @@ class MessageRepository(BaseMessageRepository):
         query = select(Message).where(Message.creator == creator_id)
         return self.session.scalars(query).unique().all()
 
+    def release_connection(self) -> None:
+        # Lazy loads open a read transaction that keeps a pooled connection checked out. Streaming requests sit on
+        # that connection for the whole generation, so end the transaction before waiting on the model.
+        if not self.session.new and not self.session.dirty:
+            self.session.commit()
+
+
+def _thread_conditions(user_id: str) -> list[ColumnElement[bool]]:
+    return [
+        Message.creator == user_id,
+        Message.final == True,  # noqa: E712
+        Message.parent == None,  # noqa: E711
+        or_(Message.expiration_time == None, Message.expiration_time > func.now()),  # noqa: E711
+    ]
+
+
+def _paginate_threads(query: Select[T], sort_opts: Opts) -> Select[T]:
+    query = query.order_by(Message.created.desc(), Message.id.desc())
+
+    if sort_opts.cursor is not None:
+        query = query.where(
+            tuple_(Message.created, Message.id)
+            < tuple_(literal(sort_opts.cursor.created), literal(sort_opts.cursor.id))
+        )
+    elif sort_opts.offset is not None:
+        query = query.offset(sort_opts.offset)
+
+    if sort_opts.limit is not None:
+        # Fetch one extra thread to find out if there's another page
+        query = query.limit(sort_opts.limit + 1)
+
+    return query
+
+
+def _split_next_page(threads: Sequence[Any], sort_opts: Opts) -> tuple[Sequence[Any], str | None]:
+    if sort_opts.limit is None or len(threads) <= sort_opts.limit:
+        return threads, None
+
+    threads = threads[: sort_opts.limit]
+    # There's nothing to continue from with a limit of 0
+    next_cursor = paged.Cursor(created=threads[-1].created, id=threads[-1].id).encode() if threads else None
+
+    return threads, next_cursor
+
 
 def map_sqla_to_old(message: Message) -> OldMessage:
     # Map message.role to old Role enum; default to user if unknown
@@ -255,7 +465,7 @@ def map_sqla_to_old(message: Message) -> OldMessage:
     return OldMessage(
         id=message.id,
         content=message.content,
-        snippet=text_snippet(message.content),
+        snippet=message.snippet if message.snippet is not None else text_snippet(message.content),
         creator=message.creator,
         role=mapped_role,
         opts=mapped_opts,
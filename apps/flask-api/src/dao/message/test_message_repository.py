@@ -0,0 +1,311 @@
+from collections.abc import Iterator
+from datetime import UTC, datetime
+
+import pytest
+from sqlalchemy import event, insert, update
+from sqlalchemy.orm import Session
+
+from db.models.label import Label
+from db.models.message import Message
+from db.models.tool_call import ToolCall
+from db.models.tool_definitions import ToolDefinition, ToolSource
+from src.dao.message.message_repository import MessageRepository
+from src.dao.paged import Cursor, Opts
+from src.dao.statement_counter import count_statements
+
+
+@pytest.fixture
+def executed_statements(sql_alchemy: Session) -> Iterator[list[str]]:
+    statements: list[str] = []
+
+    def record_statement(_conn, _cursor, statement, *_args):
+        statements.append(statement)
+
+    engine = sql_alchemy.get_bind()
+    event.listen(engine, "before_cursor_execute", record_statement)
+    yield statements
+    event.remove(engine, "before_cursor_execute", record_statement)
+
+
+def create_message(message_repository: MessageRepository) -> Message:
+    return message_repository.add(
+        Message(
+            id="msg_test",
+            content="content",
+            creator="creator",
+            role="user",
+            opts={},
+            root="msg_test",
+            model_id="model_id",
+            model_host="model_host",
+            parent=None,
+            expiration_time=None,
+            tool_definitions=[
+                ToolDefinition(
+                    id="td_test",
+                    name="test tool",
+                    description="test tool",
+                    tool_source=ToolSource.INTERNAL,
+                    parameters=None,
+                )
+            ],
+        )
+    )
+
+
+def test_update_only_writes_changed_columns(sql_alchemy: Session, executed_statements: list[str]):
+    message_repository = MessageRepository(sql_alchemy)
+    message = create_message(message_repository)
+    executed_statements.clear()
+
+    message.final = True
+    message_repository.update(message)
+
+    assert len(executed_statements) == 1
+    assert executed_statements[0].startswith("UPDATE message SET final=")
+    assert "content" not in executed_statements[0]
+
+
+def test_update_writes_untracked_message_without_reading_it(sql_alchemy: Session, executed_statements: list[str]):
+    message_repository = MessageRepository(sql_alchemy)
+    message = create_message(message_repository)
+    sql_alchemy.expunge(message)
+    executed_statements.clear()
+
+    message.final = True
+    message.harmful = False
+    updated_message = message_repository.update(message)
+
+    assert len(executed_statements) == 1
+    assert executed_statements[0].startswith("UPDATE message SET final=")
+    assert "RETURNING" in executed_statements[0]
+    assert "content=" not in executed_statements[0]
+    assert "tool_definition" not in executed_statements[0]
+
+    assert updated_message.final is True
+    assert updated_message.harmful is False
+    assert [tool_definition.id for tool_definition in updated_message.tool_definitions or []] == ["td_test"]
+
+
+def test_stores_snippets_when_content_is_written(sql_alchemy: Session):
+    message_repository = MessageRepository(sql_alchemy)
+    message = create_message(message_repository)
+    assert message.snippet == "content"
+
+    message.content = "<p>Hello <b>world</b></p>"
+    message_repository.update(message)
+
+    sql_alchemy.expire_all()
+    assert message.snippet == "Hello world"
+
+
+def test_count_statements(sql_alchemy: Session):
+    message_repository = MessageRepository(sql_alchemy)
+    message = create_message(message_repository)
+
+    with count_statements(sql_alchemy) as statement_count:
+        message.final = True
+        message.content = "new content"
+        sql_alchemy.flush()
+
+    assert statement_count.count == 1
+
+
+def test_count_statements_doesnt_check_out_a_connection(sql_alchemy: Session):
+    with count_statements(sql_alchemy) as statement_count:
+        assert not sql_alchemy.in_transaction()
+
+    assert statement_count.count == 0
+
+
+def test_get_message_chain_only_loads_ancestors(sql_alchemy: Session, executed_statements: list[str]):
+    message_repository = MessageRepository(sql_alchemy)
+
+    def add_message(message_id: str, parent: str | None) -> None:
+        message_repository.add(
+            Message(
+                id=message_id,
+                content=message_id,
+                creator="creator",
+                role="user",
+                opts={},
+                root="msg_root",
+                model_id="model_id",
+                model_host="model_host",
+                parent=parent,
+                expiration_time=None,
+            )
+        )
+
+    # msg_root -> msg_a -> msg_b, with msg_sibling branching off msg_a
+    add_message("msg_root", None)
+    add_message("msg_a", "msg_root")
+    add_message("msg_b", "msg_a")
+    add_message("msg_sibling", "msg_a")
+    sql_alchemy.expunge_all()
+    executed_statements.clear()
+
+    chain = message_repository.get_message_chain("msg_b", "creator")
+
+    assert [message.id for message in chain] == ["msg_root", "msg_a", "msg_b"]
+    assert "WITH RECURSIVE" in executed_statements[0]
+
+    for message in chain:
+        assert message.tool_calls == []
+        assert message.tool_definitions == []
+        assert message.labels == []
+    assert len(executed_statements) == 4, "relationships should be loaded once for the whole chain"
+
+
+def test_get_message_chain_for_missing_message(sql_alchemy: Session):
+    assert MessageRepository(sql_alchemy).get_message_chain("msg_missing", "creator") == []
+
+
+def add_thread(message_repository: MessageRepository, root_id: str, branches: int, depth: int) -> None:
+    """Adds a thread with `branches` replies to the root, each followed by a chain of `depth` messages."""
+    message_ids: list[str] = []
+
+    def add_message(message_id: str, parent: str | None) -> None:
+        message_ids.append(message_id)
+        message_repository.add(
+            Message(
+                id=message_id,
+                content=message_id,
+                creator="creator",
+                role="user",
+                opts={},
+                root=root_id,
+                model_id="model_id",
+                model_host="model_host",
+                parent=parent,
+                expiration_time=None,
+                tool_calls=[
+                    ToolCall(
+                        tool_call_id=f"{message_id}_tool_call",
+                        tool_name="test tool",
+                        tool_source=ToolSource.INTERNAL,
+                        args=None,
+                        message_id=message_id,
+                    )
+                ],
+            ),
+            commit=False,
+        )
+
+    add_message(root_id, None)
+    for branch in range(branches):
+        parent = root_id
+        for step in range(depth):
+            message_id = f"{root_id}_{branch}_{step}"
+            add_message(message_id, parent)
+            parent = message_id
+
+    message_repository.session.flush()
+    message_repository.session.execute(
+        insert(Label),
+        [
+            {"id": f"{message_id}_label", "message": message_id, "rating": 1, "creator": "creator"}
+            for message_id in message_ids
+        ],
+    )
+    message_repository.commit()
+
+
+def test_get_message_with_children_query_count_does_not_grow_with_the_thread(sql_alchemy: Session):
+    message_repository = MessageRepository(sql_alchemy)
+    add_thread(message_repository, "msg_small", branches=1, depth=1)
+    add_thread(message_repository, "msg_large", branches=4, depth=5)
+    sql_alchemy.expunge_all()
+
+    statement_counts: dict[str, int] = {}
+    for root_id in ["msg_small", "msg_large"]:
+        with count_statements(sql_alchemy) as statement_count:
+            messages = message_repository.get_message_with_children(root_id, "creator")
+            assert messages is not None
+
+            # Read everything a thread response reads, so any lazy loads are counted too
+            for message in messages:
+                assert len(message.labels) == 1
+                assert len(message.tool_calls or []) == 1
+                assert message.tool_definitions == []
+                assert all(child.parent == message.id for child in message.children or [])
+
+        statement_counts[root_id] = statement_count.count
+
+    assert len(messages) == 21
+    assert [message.id for message in messages[:3]] == ["msg_large", "msg_large_0_0", "msg_large_0_1"]
+    assert statement_counts["msg_small"] == statement_counts["msg_large"]
+
+
+def test_get_threads_for_user_pages_with_a_cursor(sql_alchemy: Session):
+    message_repository = MessageRepository(sql_alchemy)
+    # These are added in one transaction so they share a created time, which leaves the id to order them
+    for index in range(5):
+        message_id = f"msg_thread_{index}"
+        message_repository.add(
+            Message(
+                id=message_id,
+                content=message_id,
+                creator="creator",
+                role="user",
+                opts={},
+                root=message_id,
+                model_id="model_id",
+                model_host="model_host",
+                parent=None,
+                final=True,
+                expiration_time=None,
+            ),
+            commit=False,
+        )
+    message_repository.commit()
+
+    first_page = message_repository.get_threads_for_user("creator", Opts(offset=0, limit=2))
+    assert [thread.id for thread in first_page.threads] == ["msg_thread_4", "msg_thread_3"]
+    assert first_page.meta.total == 5
+    assert first_page.next_cursor is not None
+
+    thread_ids = [thread.id for thread in first_page.threads]
+    next_cursor: str | None = first_page.next_cursor
+    while next_cursor is not None:
+        page = message_repository.get_threads_for_user("creator", Opts(limit=2, cursor=Cursor.decode(next_cursor)))
+        assert page.meta.total is None
+        thread_ids.extend(thread.id for thread in page.threads)
+        next_cursor = page.next_cursor
+
+    assert thread_ids == [f"msg_thread_{index}" for index in reversed(range(5))]
+
+
+def test_cursor_round_trips():
+    cursor = Cursor(created=datetime(2025, 1, 2, 3, 4, 5, 678901, tzinfo=UTC), id="msg_test")
+
+    assert Cursor.decode(cursor.encode()) == cursor
+
+    with pytest.raises(ValueError, match="invalid cursor"):
+        Cursor.decode("not a cursor")
+
+
+def test_get_thread_summaries_for_user_counts_messages(sql_alchemy: Session, executed_statements: list[str]):
+    message_repository = MessageRepository(sql_alchemy)
+    add_thread(message_repository, "msg_small", branches=1, depth=1)
+    add_thread(message_repository, "msg_large", branches=3, depth=4)
+    sql_alchemy.execute(update(Message).where(Message.parent == None).values(final=True))  # noqa: E711
+    # A thread written before snippets were stored
+    sql_alchemy.execute(update(Message).where(Message.id == "msg_small").values(snippet=None))
+    sql_alchemy.commit()
+    executed_statements.clear()
+
+    summary_list = message_repository.get_thread_summaries_for_user("creator", Opts(limit=1))
+
+    assert [(summary.id, summary.message_count) for summary in summary_list.threads] == [("msg_large", 13)]
+    assert summary_list.threads[0].snippet == "msg_large"
+    assert summary_list.meta.total == 2
+    assert summary_list.next_cursor is not None
+    assert len(executed_statements) == 2, "one query for the page and one for the total"
+
+    next_page = message_repository.get_thread_summaries_for_user(
+        "creator", Opts(limit=1, cursor=Cursor.decode(summary_list.next_cursor))
+    )
+    assert [(summary.id, summary.message_count) for summary in next_page.threads] == [("msg_small", 2)]
+    assert next_page.threads[0].snippet == "msg_small"
+    assert next_page.next_cursor is None
@@ -1,3 +1,7 @@
+import base64
+import binascii
+import json
+from datetime import datetime
 from enum import StrEnum
 
 from flask import Request
@@ -25,9 +29,33 @@ class Sort:
     direction: SortDirection = SortDirection.DESC
 
 
+@dataclass
+class Cursor:
+    """
+    Points just past the last item of a page for keyset pagination, so the next page can start from there instead of
+    skipping over an offset. Items are ordered by created, with id breaking ties.
+    """
+
+    created: datetime
+    id: str
+
+    def encode(self) -> str:
+        return base64.urlsafe_b64encode(json.dumps([self.created.isoformat(), self.id]).encode()).decode()
+
+    @staticmethod
+    def decode(cursor: str) -> "Cursor":
+        try:
+            created, item_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            return Cursor(created=datetime.fromisoformat(created), id=item_id)
+        except (binascii.Error, UnicodeDecodeError, TypeError, ValueError) as e:
+            msg = "invalid cursor"
+            raise ValueError(msg) from e
+
+
 @dataclass
 class ListMeta:
-    total: int
+    # Can be left out when counting would be expensive, like on pages after the first
+    total: int | None
     offset: int | None = None
     limit: int | None = None
     sort: Sort | None = None
@@ -43,6 +71,7 @@ class Opts:
     offset: int | None = None
     limit: int | None = None
     sort: Sort | None = None
+    cursor: Cursor | None = None
 
     @staticmethod
     def from_sort_options(sort_options: SortOptions) -> "Opts":
@@ -0,0 +1,50 @@
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from opentelemetry import trace
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+STATEMENT_COUNT_ATTRIBUTE = "db.statement_count"
+
+
+@dataclass
+class StatementCount:
+    count: int = 0
+
+
+_current_statement_count: ContextVar[StatementCount | None] = ContextVar("statement_count", default=None)
+_listen_lock = threading.Lock()
+
+
+def _count_statement(*_args, **_kwargs) -> None:
+    statement_count = _current_statement_count.get()
+    if statement_count is not None:
+        statement_count.count += 1
+
+
+@contextmanager
+def count_statements(session: Session) -> Iterator[StatementCount]:
+    """
+    Counts the SQL statements sent to the database inside the block and records the total on the current span as
+    db.statement_count.
+
+    The counting listener is attached to the session's bind the first time it's used there. It only counts statements
+    run in the current context, so statements from other requests sharing the engine aren't counted, and it doesn't
+    check out a connection before the session needs one.
+    """
+    bind = session.get_bind()
+    with _listen_lock:
+        if not event.contains(bind, "before_cursor_execute", _count_statement):
+            event.listen(bind, "before_cursor_execute", _count_statement)
+
+    statement_count = StatementCount()
+    token = _current_statement_count.set(statement_count)
+    try:
+        yield statement_count
+    finally:
+        _current_statement_count.reset(token)
+        trace.get_current_span().set_attribute(STATEMENT_COUNT_ATTRIBUTE, statement_count.count)
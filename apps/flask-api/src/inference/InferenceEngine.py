@@ -36,6 +36,9 @@ class FinishReason(StrEnum):
     # Something related to tools had an error
     ToolError = "tool error"
 
+    # The response was stopped before it finished, because the user asked to stop it or disconnected
+    Cancelled = "cancelled"
+
     # General exceptions
     Unknown = "unknown"
 
@@ -15,6 +15,7 @@ from src.message.SafetyChecker import (
     SafetyCheckRequest,
     SafetyCheckResponse,
 )
+from src.util.client_registry import client_registry
 
 
 class ViolationInfo(APIInterface):
@@ -71,16 +72,24 @@ class GoogleModerateTextResponse(SafetyCheckResponse):
         ]
 
 
+def get_language_client() -> LanguageServiceClient:
+    return client_registry.get(
+        "google_language",
+        lambda: LanguageServiceClient(client_options={"api_key": get_config().google_cloud_services.api_key}),
+    )
+
+
 class GoogleModerateText(SafetyChecker):
+    model_version = "MODEL_VERSION_2"
     client: LanguageServiceClient
 
     def __init__(self):
-        self.client = LanguageServiceClient(client_options={"api_key": get_config().google_cloud_services.api_key})
+        self.client = get_language_client()
 
     def check_request(self, req: SafetyCheckRequest) -> SafetyCheckResponse:
         request = ModerateTextRequest(
             document=Document(content=req.content, type=Document.Type.PLAIN_TEXT),
-            model_version="MODEL_VERSION_2",
+            model_version=self.model_version,
         )
 
         start_ns = time_ns()
@@ -9,10 +9,16 @@ from src.message.SafetyChecker import (
     SafetyCheckResponse,
 )
 from src.otel.default_tracer import get_default_tracer
+from src.util.client_registry import client_registry
 
 tracer = get_default_tracer()
 
 
+def get_vision_session() -> requests.Session:
+    # A shared session keeps the connection to the Vision API open between requests
+    return client_registry.get("google_vision", requests.Session)
+
+
 class GoogleVisionSafeSearchResponse(SafetyCheckResponse):
     response: requests.Response
     result: SafeSearchAnnotation
@@ -57,7 +63,7 @@ class GoogleVisionSafeSearch(SafetyChecker):
             ]
         }
 
-        result = requests.post(
+        result = get_vision_session().post(
             url="https://vision.googleapis.com/v1/images:annotate",
             headers=headers,
             json=request,
@@ -22,6 +22,9 @@ class SafetyCheckResponse:
 
 
 class SafetyChecker:
+    # Identifies the model that makes the checker's decisions, so cached verdicts from another model aren't reused
+    model_version: str = ""
+
     @abstractmethod
     def check_request(self, req: SafetyCheckRequest) -> SafetyCheckResponse:
         raise NotImplementedError
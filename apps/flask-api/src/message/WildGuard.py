@@ -10,6 +10,10 @@ from src.message.SafetyChecker import (
     SafetyCheckRequest,
     SafetyCheckResponse,
 )
+from src.util.client_registry import client_registry
+
+WILDGUARD_APP_NAME = "wildguard"
+WILDGUARD_FUNCTION_NAME = "wildguard_api"
 
 
 @dataclasses.dataclass
@@ -40,18 +44,30 @@ class WildguardResponse(SafetyCheckResponse):
         return val.lower() == "yes"
 
 
+def get_modal_client() -> modal.Client:
+    return client_registry.get(
+        "modal",
+        lambda: modal.Client.from_credentials(get_config.cfg.modal.token, get_config.cfg.modal.token_secret),
+    )
+
+
+def get_wildguard_function() -> modal.Function:
+    return client_registry.get(
+        "wildguard_function",
+        lambda: modal.Function.lookup(WILDGUARD_APP_NAME, WILDGUARD_FUNCTION_NAME, client=get_modal_client()),
+    )
+
+
 class WildGuard(SafetyChecker):
-    client: modal.Client
+    function: modal.Function
 
     def __init__(self) -> None:
-        self.client = modal.Client.from_credentials(get_config.cfg.modal.token, get_config.cfg.modal.token_secret)
+        self.function = get_wildguard_function()
 
     def check_request(self, req: SafetyCheckRequest) -> SafetyCheckResponse:
-        f = modal.Function.lookup("wildguard", "wildguard_api", client=self.client)
-
         start_ns = time_ns()
         # the wildguard returns a generator that yields a single response
-        result = list(f.remote_gen(req.content)).pop()
+        result = list(self.function.remote_gen(req.content)).pop()
         end_ns = time_ns()
 
         response = WildguardResponse(
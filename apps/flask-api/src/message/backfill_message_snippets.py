@@ -0,0 +1,65 @@
+"""
+Stores snippets for messages written before snippets were stored, so reading them doesn't strip their HTML every time.
+
+Run it with the API's config:
+
+    FLASK_CONFIG_PATH=config.json uv run python -m src.message.backfill_message_snippets --batch-size 1000
+
+Messages are updated in batches of --batch-size, each in its own transaction, so it's safe to stop and run again.
+"""
+
+import argparse
+import logging
+
+from sqlalchemy import Engine, bindparam, create_engine, select, update
+
+from core.text_snippet import text_snippet
+from db.models.message import Message
+from db.url import make_url
+from src.config.get_config import get_config
+
+
+def backfill_message_snippets(engine: Engine, batch_size: int) -> int:
+    updated_count = 0
+    last_id = ""
+
+    while True:
+        with engine.begin() as connection:
+            rows = connection.execute(
+                select(Message.id, Message.content)
+                .where(Message.snippet == None, Message.id > last_id)  # noqa: E711
+                .order_by(Message.id)
+                .limit(batch_size)
+            ).all()
+
+            if not rows:
+                return updated_count
+
+            connection.execute(
+                update(Message).where(Message.id == bindparam("message_id")).values(snippet=bindparam("new_snippet")),
+                [{"message_id": row.id, "new_snippet": text_snippet(row.content)} for row in rows],
+            )
+
+        updated_count += len(rows)
+        last_id = rows[-1].id
+        logging.getLogger().info("Stored snippets for %d messages", updated_count)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    engine = create_engine(make_url(get_config().db.conninfo))
+    try:
+        updated_count = backfill_message_snippets(engine, args.batch_size)
+    finally:
+        engine.dispose()
+
+    logging.getLogger().info("Done. Stored snippets for %d messages", updated_count)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import time
+from collections.abc import Callable, Generator, Iterable
+from typing import TypeVar
+
+from src.message.message_chunk import ModelResponseChunk, ThinkingChunk
+
+T = TypeVar("T")
+
+ContentChunk = ModelResponseChunk | ThinkingChunk
+
+
+def _content_key(chunk: ContentChunk) -> tuple[type, str, str | None]:
+    # Thinking parts have their own ids, deltas from different parts aren't merged
+    return type(chunk), chunk.message, chunk.id if isinstance(chunk, ThinkingChunk) else None
+
+
+def _merge(chunks: list[ContentChunk]) -> ContentChunk:
+    if len(chunks) == 1:
+        return chunks[0]
+
+    return chunks[0].model_copy(update={"content": "".join(chunk.content for chunk in chunks)})
+
+
+def coalesce_chunks(
+    stream: Iterable[T],
+    *,
+    max_delay_seconds: float,
+    max_bytes: int,
+    clock: Callable[[], float] = time.monotonic,
+) -> Generator[T | ContentChunk]:
+    """
+    Merges consecutive text and thinking deltas for the same message so fast models don't send a line per token.
+
+    The first delta of a run is passed on right away. The deltas after it are held and sent as one chunk once they add
+    up to max_bytes, or once max_delay_seconds has passed since the last chunk of the run was sent. Anything else in
+    the stream sends the held deltas first. Nothing runs in the background, so held deltas wait for the next item
+    in the stream at most.
+    """
+    run_key: tuple[type, str, str | None] | None = None
+    last_sent_at = 0.0
+    held_chunks: list[ContentChunk] = []
+    held_bytes = 0
+
+    try:
+        for item in stream:
+            key = _content_key(item) if isinstance(item, ContentChunk) else None
+            if key != run_key or not isinstance(item, ContentChunk):
+                if held_chunks:
+                    yield _merge(held_chunks)
+                    held_chunks, held_bytes = [], 0
+
+                run_key = key
+                last_sent_at = clock()
+                yield item
+                continue
+
+            held_chunks.append(item)
+            held_bytes += len(item.content.encode())
+
+            now = clock()
+            if held_bytes >= max_bytes or now - last_sent_at >= max_delay_seconds:
+                yield _merge(held_chunks)
+                held_chunks, held_bytes = [], 0
+                last_sent_at = now
+    except Exception:
+        # Send what was already generated before the error
+        if held_chunks:
+            yield _merge(held_chunks)
+        raise
+
+    if held_chunks:
+        yield _merge(held_chunks)
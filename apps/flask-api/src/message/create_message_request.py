@@ -24,6 +24,7 @@ from src.dao.message.inference_opts_model import (
 )
 from src.dao.message.message_models import Role
 from src.flask_pydantic_api.utils import UploadedFile
+from src.message.message_chunk import StreamMode
 
 
 def captcha_token_required_if_captcha_enabled(value: str | None):
@@ -84,6 +85,8 @@ class CreateMessageRequest(APIInterface):
 
     files: list[UploadedFile] | None = Field(default=None)
 
+    stream_mode: StreamMode = Field(default=StreamMode.FULL)
+
     @model_validator(mode="after")
     def check_original_and_parent_are_different(self) -> Self:
         if self.original is not None and self.parent == self.original:
@@ -33,6 +33,8 @@ def setup_msg_thread(
     request: CreateMessageRequestWithFullMessages,
     client_auth: Token,
     agent_id: str | None,
+    *,
+    commit: bool = True,
 ) -> list[Message]:
     system_msg = None
     message_chain: list[Message] = []
@@ -60,28 +62,16 @@ def setup_msg_thread(
             agent_id=agent_id,
         )
 
-        message_repository.add(system_msg)
+        message_repository.add(system_msg, commit=commit)
 
     if request.parent:
-        parent = message_repository.get_message_by_id(request.parent.id)
-        if parent is None:
+        message_chain = list(message_repository.get_message_chain(request.parent.id, client_auth.client))
+        if len(message_chain) == 0 or message_chain[-1].id != request.parent.id:
             raise exceptions.NotFound
-        message_chain.append(parent)
-
-    if request.root is not None:
-        messages = message_repository.get_messages_by_root(request.root.id, client_auth.client) or []
-        msgs: dict[str, Message] = {}
-        for message in messages:
-            msgs[message.id] = message
-
-        while message_chain[-1].parent is not None:
-            message_chain.append(msgs[message_chain[-1].parent])
 
     if system_msg is not None:
         message_chain.append(system_msg)
 
-    message_chain.reverse()
-
     return message_chain
 
 
@@ -137,6 +127,7 @@ def create_user_message(
     msg_id: obj.ID | None = None,
     is_msg_harmful: bool | None = None,
     include_mcp_servers: set[str] | None,
+    commit: bool = True,
 ):
     tool_list: list[ToolDefinition] = map_tools_for_user_message(
         request, parent, model, include_mcp_servers=include_mcp_servers
@@ -174,7 +165,7 @@ def create_user_message(
         extra_parameters=request.extra_parameters,
         agent_id=agent_id,
     )
-    return message_repository.add(message)
+    return message_repository.add(message, commit=commit)
 
 
 def create_tool_response_message(
@@ -184,6 +175,9 @@ def create_tool_response_message(
     source_tool: ToolCall,
     creator: str,
     agent_id: str | None,
+    *,
+    tool_result_cache_hit: bool | None = None,
+    commit: bool = True,
 ):
     message = Message(
         content=content,
@@ -208,9 +202,10 @@ def create_tool_response_message(
         error_code=parent.error_code,
         error_description=parent.error_description,
         error_severity=parent.error_severity,
+        tool_result_cache_hit=tool_result_cache_hit,
     )
 
-    return message_repository.add(message)
+    return message_repository.add(message, commit=commit)
 
 
 def create_assistant_message(
@@ -220,6 +215,8 @@ def create_assistant_message(
     model: ModelConfig,
     agent_id: str | None,
     creator_token: Token,
+    *,
+    commit: bool = True,
 ):
     message_expiration_time = get_expiration_time(creator_token)
 
@@ -240,7 +237,7 @@ def create_assistant_message(
         extra_parameters=parent.extra_parameters,
         agent_id=agent_id,
     )
-    return message_repository.add(message)
+    return message_repository.add(message, commit=commit)
 
 
 def clone_tool_call(source_tool: ToolCall):
@@ -30,6 +30,7 @@ from src.message.create_message_service.merge_inference_options import (
 from src.message.create_message_service.safety import (
     validate_message_security_and_safety,
 )
+from src.message.create_message_service.speculative_inference import start_speculative_inference
 from src.message.create_message_service.stream_new_message import create_new_message
 from src.message.GoogleCloudStorage import GoogleCloudStorage
 from src.message.SafetyChecker import (
@@ -90,7 +91,9 @@ class ModelMessageStreamInput:
     @staticmethod
     def from_model_create_message_request(create_message_request: CreateMessageRequest):
         return ModelMessageStreamInput(
-            **create_message_request.model_dump(exclude={"host", "n", "logprobs", "input_parts"}, by_alias=False),
+            **create_message_request.model_dump(
+                exclude={"host", "n", "logprobs", "input_parts", "stream_mode"}, by_alias=False
+            ),
             request_type=MessageType.MODEL,
             input_parts=create_message_request.input_parts,
         )
@@ -178,27 +181,37 @@ def stream_message_from_model(
 
     new_message_id = create_message_id()
 
-    validate_message_security_and_safety(
-        request=mapped_request,
-        client_auth=client_auth,
-        checker_type=checker_type,
-        user_ip_address=user_ip_address,
-        user_agent=user_agent,
-        storage_client=storage_client,
-        message_id=new_message_id,
-    )
+    # The model starts on its reply while the safety checks run. Its output is held back until they pass
+    speculative_stream = start_speculative_inference(mapped_request, model, message_repository, client_auth)
+
+    try:
+        validate_message_security_and_safety(
+            request=mapped_request,
+            client_auth=client_auth,
+            checker_type=checker_type,
+            user_ip_address=user_ip_address,
+            user_agent=user_agent,
+            storage_client=storage_client,
+            message_id=new_message_id,
+        )
 
-    return create_new_message(
-        mapped_request,
-        dbc,
-        model=model,
-        storage_client=storage_client,
-        checker_type=checker_type,
-        start_time_ns=start_time_ns,
-        client_auth=client_auth,
-        message_repository=message_repository,
-        new_message_id=new_message_id,
-    )
+        return create_new_message(
+            mapped_request,
+            dbc,
+            model=model,
+            storage_client=storage_client,
+            checker_type=checker_type,
+            start_time_ns=start_time_ns,
+            client_auth=client_auth,
+            message_repository=message_repository,
+            new_message_id=new_message_id,
+            speculative_stream=speculative_stream,
+        )
+    except Exception:
+        # Once the stream is handed to stream_new_message it closes it. Until then it's closed here
+        if speculative_stream is not None:
+            speculative_stream.close()
+        raise
 
 
 def get_parent_and_root_messages_and_private(
@@ -1,5 +1,11 @@
 import base64
-from collections.abc import Sequence
+from collections.abc import Callable, Sequence
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextvars import copy_context
+from dataclasses import dataclass
+from functools import cache
+from io import BytesIO
+from time import monotonic, time_ns
 
 from flask import current_app
 from opentelemetry import trace
@@ -21,6 +27,7 @@ from src.message.google_video_intelligence.GoogleVideoIntelligence import (
 from src.message.GoogleCloudStorage import GoogleCloudStorage
 from src.message.GoogleModerateText import GoogleModerateText
 from src.message.GoogleVisionSafeSearch import GoogleVisionSafeSearch
+from src.message.safety_verdict_cache import get_safety_verdict_cache, verdict_cache_key
 from src.message.SafetyChecker import (
     SafetyChecker,
     SafetyCheckerType,
@@ -38,21 +45,34 @@ def check_message_safety(
     checker_type: SafetyCheckerType = SafetyCheckerType.GoogleLanguage,
 ) -> bool | None:
     trace.get_current_span().set_attribute("safety_checker_type", checker_type)
-    safety_checker: SafetyChecker = GoogleModerateText()
-    request = SafetyCheckRequest(content=text)
-
-    if checker_type == SafetyCheckerType.WildGuard:
-        safety_checker = WildGuard()
+    checker_class: type[SafetyChecker] = (
+        WildGuard if checker_type == SafetyCheckerType.WildGuard else GoogleModerateText
+    )
 
-    try:
-        result = safety_checker.check_request(request)
+    # The model behind WildGuard's Modal function can change without its name changing, so its version comes from the
+    # config. Its verdicts aren't cached without one
+    model_version = (
+        cfg.wildguard.model_version if checker_type == SafetyCheckerType.WildGuard else checker_class.model_version
+    )
+    verdict_cache = get_safety_verdict_cache() if model_version is not None else None
+    cache_key = verdict_cache_key(checker_type, model_version or "", text)
+    if verdict_cache is not None:
+        cached_verdict = verdict_cache.get(cache_key)
+        if cached_verdict is not None:
+            return cached_verdict
 
-        return result.is_safe()
+    request = SafetyCheckRequest(content=text)
 
+    try:
+        result = checker_class().check_request(request).is_safe()
     except Exception as e:
         current_app.logger.exception("Skipped message safety check due to error: %s. ", repr(e))
+        return None
 
-    return None
+    if verdict_cache is not None:
+        verdict_cache.set(cache_key, result)
+
+    return result
 
 
 @tracer.start_as_current_span("check_image_safety")
@@ -138,8 +158,7 @@ def evaluate_prompt_submission_captcha(
                 "rejecting message request due to invalid captcha",
                 extra={"assessment": captcha_assessment},
             )
-            invalid_captcha_message = "invalid_captcha"
-            raise exceptions.BadRequest(invalid_captcha_message)
+            raise exceptions.BadRequest(INVALID_CAPTCHA_ERROR)
 
         if (
             captcha_assessment.risk_analysis.score == 0.0
@@ -155,10 +174,103 @@ def evaluate_prompt_submission_captcha(
 
 INAPPROPRIATE_TEXT_ERROR = "inappropriate_prompt_text"
 INAPPROPRIATE_FILE_ERROR = "inappropriate_prompt_file"
+INVALID_CAPTCHA_ERROR = "invalid_captcha"
 
 FORBIDDEN_SETTING = "User is not allowed to change this setting"
 
 
+@dataclass
+class SafetyCheck:
+    name: str
+    check: Callable[[], bool | None]
+    """Returns False to reject the message. None means the check couldn't run"""
+    rejection_error: str
+    result_on_timeout: bool | None
+    """Used in place of the check's result if it misses the deadline. False fails closed, None fails open"""
+
+
+def _run_timed(check: SafetyCheck) -> tuple[bool | None, float]:
+    start_ns = time_ns()
+    result = check.check()
+    return result, (time_ns() - start_ns) / 1_000_000
+
+
+@cache
+def get_safety_check_executor() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=cfg.safety_checks.max_workers, thread_name_prefix="safety-check")
+
+
+def run_safety_checks(checks: Sequence[SafetyCheck], timeout_seconds: float) -> None:
+    """
+    Runs the checks concurrently and raises as soon as one of them rejects the message, without waiting on the rest.
+
+    Each check's duration (or timeout) is recorded on the current span. Checks that are still running when we return
+    are left to finish in the background.
+    """
+    if not checks:
+        return
+
+    span = trace.get_current_span()
+    deadline = monotonic() + timeout_seconds
+
+    executor = get_safety_check_executor()
+    # Each check gets a copy of our context so the Flask app and the current span are available in its thread
+    pending: dict[Future[tuple[bool | None, float]], SafetyCheck] = {
+        executor.submit(copy_context().run, _run_timed, check): check for check in checks
+    }
+
+    while pending:
+        done, _ = wait(pending, timeout=max(0, deadline - monotonic()), return_when=FIRST_COMPLETED)
+        if not done:
+            break
+
+        for future in done:
+            check = pending.pop(future)
+            result, duration_ms = future.result()
+            span.set_attribute(f"safety_check.{check.name}.duration_ms", duration_ms)
+            span.set_attribute(f"safety_check.{check.name}.result", str(result))
+
+            if result is False:
+                raise exceptions.BadRequest(check.rejection_error)
+
+    for check in pending.values():
+        current_app.logger.warning(
+            "Safety check %s didn't finish within %ss",
+            check.name,
+            timeout_seconds,
+            extra={"event": "safety-check.timeout", "check": check.name},
+        )
+        span.set_attribute(f"safety_check.{check.name}.timed_out", True)
+        span.set_attribute(f"safety_check.{check.name}.result", str(check.result_on_timeout))
+
+        if check.result_on_timeout is False:
+            raise exceptions.BadRequest(check.rejection_error)
+
+
+def copy_files(files: Sequence[FileStorage]) -> list[FileStorage]:
+    """
+    Reads the files into memory once, and returns copies of them that can be read without moving the originals. A
+    check that misses the deadline keeps reading its copies while the message is created from the originals.
+    """
+    copies: list[FileStorage] = []
+    for file in files:
+        content = file.stream.read()
+        file.stream.seek(0)
+        copies.append(
+            FileStorage(stream=BytesIO(content), filename=file.filename, name=file.name, headers=file.headers)
+        )
+
+    return copies
+
+
+def captcha_result_on_timeout(*, is_anonymous_user: bool) -> bool | None:
+    # A missing assessment is rejected wherever the captcha is enforced
+    if is_anonymous_user and cfg.google_cloud_services.enable_recaptcha:
+        return False
+
+    return None
+
+
 @tracer.start_as_current_span("validate_message_security_and_safety")
 def validate_message_security_and_safety(
     request: CreateMessageRequestWithFullMessages,
@@ -169,23 +281,33 @@ def validate_message_security_and_safety(
     user_ip_address: str | None = None,
     user_agent: str | None = None,
 ):
-    evaluate_prompt_submission_captcha(
-        captcha_token=request.captcha_token,
-        user_ip_address=user_ip_address,
-        user_agent=user_agent,
-        is_anonymous_user=client_auth.is_anonymous_user,
-    )
-
     can_bypass_safety_checks = user_has_permission(client_auth.token, Permissions.WRITE_BYPASS_SAFETY_CHECKS)
 
     if can_bypass_safety_checks is False and request.bypass_safety_check is True:
         raise exceptions.Forbidden(FORBIDDEN_SETTING)
 
+    def check_captcha() -> None:
+        # Rejections are raised from here so they keep their specific error messages
+        evaluate_prompt_submission_captcha(
+            captcha_token=request.captcha_token,
+            user_ip_address=user_ip_address,
+            user_agent=user_agent,
+            is_anonymous_user=client_auth.is_anonymous_user,
+        )
+
+    captcha_check = SafetyCheck(
+        name="captcha",
+        check=check_captcha,
+        rejection_error=INVALID_CAPTCHA_ERROR,
+        result_on_timeout=captcha_result_on_timeout(is_anonymous_user=client_auth.is_anonymous_user),
+    )
+
+    timeout_seconds = cfg.safety_checks.timeout_seconds
+
     if can_bypass_safety_checks is True and request.bypass_safety_check is True:
+        run_safety_checks([captcha_check], timeout_seconds)
         return 0, None
 
-    is_content_safe = check_message_safety(request.content, checker_type=checker_type)
-
     # Sort files by type
     video_files: list[FileStorage] = []
     image_files: list[FileStorage] = []
@@ -210,17 +332,42 @@ def validate_message_security_and_safety(
         msg = "Unsupported file types in input"
         raise exceptions.BadRequest(msg)
 
-    is_video_safe = check_video_safety(files=video_files, storage_client=storage_client, message_id=message_id)
-
-    is_image_safe = check_image_safety(files=image_files)
-
-    if is_content_safe is False:
-        raise exceptions.BadRequest(INAPPROPRIATE_TEXT_ERROR)
+    checks = [
+        captcha_check,
+        # Text and image checks let the message through if they can't run, video checks don't
+        SafetyCheck(
+            name="text",
+            check=lambda: check_message_safety(request.content, checker_type=checker_type),
+            rejection_error=INAPPROPRIATE_TEXT_ERROR,
+            result_on_timeout=None,
+        ),
+    ]
+
+    video_files = copy_files(video_files)
+    image_files = copy_files(image_files)
+
+    if video_files:
+        checks.append(
+            SafetyCheck(
+                name="video",
+                check=lambda: check_video_safety(
+                    files=video_files, storage_client=storage_client, message_id=message_id
+                ),
+                rejection_error=INAPPROPRIATE_FILE_ERROR,
+                result_on_timeout=False,
+            )
+        )
 
-    if is_image_safe is False:
-        raise exceptions.BadRequest(INAPPROPRIATE_FILE_ERROR)
+    if image_files:
+        checks.append(
+            SafetyCheck(
+                name="image",
+                check=lambda: check_image_safety(files=image_files),
+                rejection_error=INAPPROPRIATE_FILE_ERROR,
+                result_on_timeout=None,
+            )
+        )
 
-    if is_video_safe is False:
-        raise exceptions.BadRequest(INAPPROPRIATE_FILE_ERROR)
+    run_safety_checks(checks, timeout_seconds)
 
     return
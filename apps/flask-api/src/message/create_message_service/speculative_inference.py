@@ -0,0 +1,110 @@
+from opentelemetry import trace
+from pydantic_ai.models import ModelRequestParameters
+
+from core.auth.token import Token
+from db.models.message import Message
+from db.models.model_config import ModelConfig
+from src.dao.message.message_models import Role
+from src.dao.message.message_repository import BaseMessageRepository
+from src.message.create_message_request import CreateMessageRequestWithFullMessages
+from src.message.create_message_service.database import map_tools_for_user_message
+from src.message.create_message_service.stream_new_message import instrumentation_settings
+from src.pydantic_inference.mapping.input.map_input import pydantic_map_messages
+from src.pydantic_inference.mapping.settings.map_settings import pydantic_settings_map
+from src.pydantic_inference.model_request_stream import ModelRequestStream, model_request_stream_sync
+from src.pydantic_inference.pydantic_model_service import get_pydantic_model
+
+
+def can_speculate(request: CreateMessageRequestWithFullMessages, model: ModelConfig) -> bool:
+    if not model.speculative_inference or request.role != Role.User:
+        return False
+
+    # Files have to be uploaded before the model can see them
+    if request.files:
+        return False
+
+    # Tool definitions are resolved and saved with the user message, so tool calling has to wait for it
+    if request.mcp_server_ids is not None:
+        return False
+
+    return not model.can_call_tools or not map_tools_for_user_message(
+        request, request.parent, model, include_mcp_servers=None
+    )
+
+
+def get_speculative_message_chain(
+    request: CreateMessageRequestWithFullMessages,
+    model: ModelConfig,
+    message_repository: BaseMessageRepository,
+    client_auth: Token,
+) -> list[Message]:
+    """
+    Builds the messages the model will be sent for this request without saving anything. These are the same messages
+    setup_msg_thread and create_user_message will create once the request passes its safety checks.
+    """
+    message_chain: list[Message] = []
+
+    if request.parent is not None:
+        message_chain.extend(message_repository.get_message_chain(request.parent.id, client_auth.client))
+    elif model.default_system_prompt is not None:
+        message_chain.append(
+            Message(
+                content=model.default_system_prompt,
+                creator=client_auth.client,
+                role=Role.System,
+                opts=request.opts.model_dump(),
+                root="",
+                model_id=model.id,
+                model_host=model.host,
+                parent=None,
+                expiration_time=None,
+            )
+        )
+
+    message_chain.append(
+        Message(
+            content=request.content,
+            input_parts=request.input_parts,
+            creator=client_auth.client,
+            role=Role.User,
+            opts=request.opts.model_dump(),
+            root="",
+            model_id=model.id,
+            model_host=model.host,
+            parent=None,
+            expiration_time=None,
+        )
+    )
+
+    return message_chain
+
+
+def start_speculative_inference(
+    request: CreateMessageRequestWithFullMessages,
+    model: ModelConfig,
+    message_repository: BaseMessageRepository,
+    client_auth: Token,
+) -> ModelRequestStream | None:
+    """
+    Starts the model's reply to this request before it's been through its safety checks, for models that have
+    speculative inference turned on.
+
+    Nothing is saved or sent to the client until the checks pass. Events from the model are buffered in the stream in
+    the meantime. Callers must close() the stream if the request is rejected, which cancels the upstream request.
+
+    Returns None if the request can't be speculated on, in which case it should be handled normally.
+    """
+    if not can_speculate(request, model):
+        return None
+
+    trace.get_current_span().set_attribute("speculative_inference", True)
+
+    message_chain = get_speculative_message_chain(request, model, message_repository, client_auth)
+
+    return model_request_stream_sync(
+        model=get_pydantic_model(model),
+        messages=pydantic_map_messages(message_chain, blob_map=None),
+        model_settings=pydantic_settings_map(request.opts, model, extra_body=request.extra_parameters),
+        model_request_parameters=ModelRequestParameters(allow_text_output=True),
+        instrument=instrumentation_settings,
+    ).start()
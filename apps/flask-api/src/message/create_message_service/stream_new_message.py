@@ -1,5 +1,6 @@
 import dataclasses
 import os
+import weakref
 from collections.abc import Callable, Generator
 from dataclasses import asdict
 from time import time_ns
@@ -10,10 +11,11 @@ from opentelemetry import trace
 from opentelemetry.trace import Status, StatusCode
 from pydantic import BaseModel
 from pydantic_ai.agent import InstrumentationSettings
-from pydantic_ai.direct import model_request_stream_sync
 from pydantic_ai.exceptions import ModelHTTPError
 from pydantic_ai.messages import ModelResponse, ToolCallPart
 from pydantic_ai.models import ModelRequestParameters
+from sqlalchemy import inspect
+from sqlalchemy.orm.attributes import set_committed_value
 
 import core.object_id as obj
 from core.auth.token import Token
@@ -51,16 +53,18 @@ from src.message.message_chunk import (
 from src.message.SafetyChecker import (
     SafetyCheckerType,
 )
+from src.message.stream_cancellation import CancelReason, StreamCancellation, get_stream_cancellation_registry
 from src.message.stream_message import StreamMetrics
 from src.pydantic_inference.mapping.input.map_input import pydantic_map_messages
 from src.pydantic_inference.mapping.output.map_output import pydantic_map_chunk
 from src.pydantic_inference.mapping.settings.map_settings import pydantic_settings_map
+from src.pydantic_inference.model_request_stream import ModelRequestStream, model_request_stream_sync
 from src.pydantic_inference.pydantic_ai_helpers import (
     find_tool_def_by_name,
     map_pydantic_tool_to_db_tool,
 )
 from src.pydantic_inference.pydantic_model_service import get_pydantic_model
-from src.tools.tools_service import call_tool, get_pydantic_tool_defs
+from src.tools.tools_service import call_tools, get_pydantic_tool_defs
 
 from .database import (
     create_assistant_message,
@@ -95,13 +99,17 @@ def create_new_message(
     message_repository: BaseMessageRepository,
     new_message_id: obj.ID,
     checker_type: SafetyCheckerType = SafetyCheckerType.GoogleLanguage,
+    speculative_stream: ModelRequestStream | None = None,
 ) -> Message | Generator[Message | MessageChunk | MessageStreamError | Chunk]:
+    # New messages are written as a unit of work: nothing is committed until the chain is ready to stream, and the
+    # streamed reply is saved along with the finalized messages in one more commit at the end.
     message_chain = setup_msg_thread(
         message_repository,
         model=model,
         request=request,
         client_auth=client_auth,
         agent_id=request.agent,
+        commit=False,
     )
 
     if request.role == Role.Assistant:
@@ -116,6 +124,7 @@ def create_new_message(
             model,
             creator_token=client_auth,
             agent_id=request.agent,
+            commit=False,
         )
         assistant_message.final = True
         message_repository.update(assistant_message)
@@ -132,6 +141,7 @@ def create_new_message(
             agent_id=request.agent,
             include_mcp_servers=request.mcp_server_ids,
             msg_id=new_message_id,
+            commit=False,
         )
         message_chain.append(user_message)
 
@@ -160,6 +170,7 @@ def create_new_message(
             request.max_steps,
             checker_type,
             blob_map,
+            speculative_stream=speculative_stream,
         )
 
     if request.role == Role.ToolResponse:
@@ -197,6 +208,7 @@ def create_new_message(
             source_tool=source_tool,
             creator=client_auth.client,
             agent_id=request.agent,
+            commit=False,
         )
         message_chain.append(tool_message)
 
@@ -228,6 +240,99 @@ def stream_new_message(
     max_steps: int | None,
     checker_type: SafetyCheckerType = SafetyCheckerType.GoogleLanguage,
     blob_map: dict[str, FileUploadResult] | None = None,
+    *,
+    speculative_stream: ModelRequestStream | None = None,
+) -> Generator[Message | MessageChunk | MessageStreamError | Chunk]:
+    """
+    Streams the model's reply to created_message, along with any further steps it takes.
+
+    The stream takes ownership of speculative_stream: it's closed when the stream finishes or is closed, or if the
+    stream is dropped without being read.
+    """
+    stream = stream_new_message_with_cancellation(
+        request,
+        dbc,
+        model,
+        start_time_ns,
+        client_token,
+        message_repository,
+        message_chain,
+        created_message,
+        max_steps,
+        checker_type,
+        blob_map,
+        speculative_stream=speculative_stream,
+    )
+
+    if speculative_stream is not None:
+        # A generator that's never started doesn't run its finally block
+        weakref.finalize(stream, speculative_stream.close)
+
+    return stream
+
+
+def stream_new_message_with_cancellation(
+    request: CreateMessageRequestWithFullMessages,
+    dbc: db.Client,
+    model: ModelConfig,
+    start_time_ns: int,
+    client_token: Token,
+    message_repository: BaseMessageRepository,
+    message_chain: list[Message],
+    created_message: Message,
+    max_steps: int | None,
+    checker_type: SafetyCheckerType,
+    blob_map: dict[str, FileUploadResult] | None,
+    *,
+    speculative_stream: ModelRequestStream | None,
+) -> Generator[Message | MessageChunk | MessageStreamError | Chunk]:
+    # The stream can be cancelled by its thread's id or the ids of the messages it creates
+    cancellations = get_stream_cancellation_registry()
+    cancellation = cancellations.start(client_token.client, message_chain[0].id, created_message.id)
+    try:
+        yield from stream_new_message_steps(
+            request,
+            dbc,
+            model,
+            start_time_ns,
+            client_token,
+            message_repository,
+            message_chain,
+            created_message,
+            max_steps,
+            checker_type,
+            blob_map,
+            cancellation,
+            speculative_stream=speculative_stream,
+        )
+    except GeneratorExit:
+        # The client has gone away mid-stream, so stop and keep what's been written
+        if any(message.final is False for message in message_chain):
+            cancellation.cancel(CancelReason.Disconnected)
+            save_cancelled_messages(message_repository, message_chain, created_message)
+        raise
+    finally:
+        cancellations.finish(cancellation)
+        # Closing is a no-op if the stream was read to the end. Otherwise this cancels the upstream request.
+        if speculative_stream is not None:
+            speculative_stream.close()
+
+
+def stream_new_message_steps(
+    request: CreateMessageRequestWithFullMessages,
+    dbc: db.Client,
+    model: ModelConfig,
+    start_time_ns: int,
+    client_token: Token,
+    message_repository: BaseMessageRepository,
+    message_chain: list[Message],
+    created_message: Message,
+    max_steps: int | None,
+    checker_type: SafetyCheckerType,
+    blob_map: dict[str, FileUploadResult] | None,
+    cancellation: StreamCancellation,
+    *,
+    speculative_stream: ModelRequestStream | None,
 ) -> Generator[Message | MessageChunk | MessageStreamError | Chunk]:
     yield StreamStartChunk(message=message_chain[0].id)
 
@@ -235,6 +340,7 @@ def stream_new_message(
         # if we have pending tool calls we should not get an assistant message
         yield prepare_yield_message_chain(message_chain, created_message)
         yield from finalize_messages(message_repository, message_chain, created_message)
+        message_repository.commit()
         yield StreamEndChunk(message=message_chain[0].id)
         return
 
@@ -256,8 +362,11 @@ def stream_new_message(
             model=model,
             creator_token=client_token,
             agent_id=request.agent,
+            commit=False,
         )
         message_chain.append(reply)
+        message_repository.commit()
+        get_stream_cancellation_registry().add(cancellation, reply.id)
 
         yield prepare_yield_message_chain(message_chain, created_message)
 
@@ -273,7 +382,11 @@ def stream_new_message(
             created_message,
             reply,
             stream_metrics,
+            cancellation,
+            speculative_stream=speculative_stream,
         )
+        # A speculative stream can only stand in for the first step's request
+        speculative_stream = None
 
         # If an error_chunk is encountered during streaming, persist it on the full assistant message
         if error_chunk is not None:
@@ -283,21 +396,26 @@ def stream_new_message(
 
         if reply.tool_calls is not None and len(reply.tool_calls) > 0:
             last_msg = reply
-            for tool in reply.tool_calls:
-                if tool.tool_source is not ToolSource.USER_DEFINED:
-                    tool_definition = find_tool_def_by_name(reply, tool.tool_name)
-                    tool_response = call_tool(tool, tool_definition)
-                    tool_msg = create_tool_response_message(
-                        message_repository,
-                        content=tool_response.content,
-                        parent=last_msg,
-                        source_tool=tool,
-                        creator=client_token.client,
-                        agent_id=request.agent,
-                    )
-                    message_chain.append(tool_msg)
+            tool_calls = [
+                (tool, find_tool_def_by_name(reply, tool.tool_name))
+                for tool in reply.tool_calls
+                if tool.tool_source is not ToolSource.USER_DEFINED
+            ]
+            for (tool, _), tool_response in zip(tool_calls, call_tools(tool_calls), strict=True):
+                tool_msg = create_tool_response_message(
+                    message_repository,
+                    content=tool_response.content,
+                    parent=last_msg,
+                    source_tool=tool,
+                    creator=client_token.client,
+                    agent_id=request.agent,
+                    tool_result_cache_hit=tool_response.metadata.cache_hit,
+                    commit=False,
+                )
+                message_chain.append(tool_msg)
 
         yield from finalize_messages(message_repository, message_chain, created_message)
+        message_repository.commit()
 
         log_create_message_stats(
             created_message,
@@ -312,7 +430,8 @@ def stream_new_message(
         yield prepare_yield_message_chain(message_chain, created_message)
 
         if (
-            reply.tool_calls is None
+            cancellation.cancelled
+            or reply.tool_calls is None
             or len(reply.tool_calls) == 0
             or any(tool.tool_source == ToolSource.USER_DEFINED for tool in reply.tool_calls)
         ):
@@ -352,6 +471,29 @@ def log_create_message_stats(
         )
 
 
+def save_cancelled_messages(
+    message_repository: BaseMessageRepository, message_chain: list[Message], user_message: Message
+) -> None:
+    """
+    Finalizes the messages of a stream that was stopped part way through, so the thread can be continued. This runs
+    when the stream is closed, so errors are logged instead of sent.
+    """
+    try:
+        for message in message_chain:
+            if message.final is False:
+                if message.role == Role.Assistant:
+                    message.finish_reason = FinishReason.Cancelled
+                message.final = True
+                message_repository.update(message, commit=False)
+
+        message_repository.commit()
+    except Exception:
+        current_app.logger.exception(
+            "Couldn't save a cancelled stream's messages",
+            extra={"message_id": user_message.id, "event": "inference.cancel-error"},
+        )
+
+
 def finalize_messages(
     message_repository: BaseMessageRepository,
     message_chain: list[Message],
@@ -360,7 +502,7 @@ def finalize_messages(
     if message_chain[0].final is False and message_chain[0].role == Role.System:
         system_msg = message_chain[0]
         system_msg.final = True
-        final_system_message = message_repository.update(system_msg)
+        final_system_message = message_repository.update(system_msg, commit=False)
 
         if final_system_message is None:
             final_system_message_error = RuntimeError(f"failed to finalize message {system_msg.id}")
@@ -373,7 +515,7 @@ def finalize_messages(
 
     if user_message.final is False:
         user_message.final = True
-        final_message = message_repository.update(user_message)
+        final_message = message_repository.update(user_message, commit=False)
         if final_message is None:
             final_message_error = RuntimeError(f"failed to finalize message {user_message.id}")
             yield MessageStreamError(
@@ -412,9 +554,14 @@ def stream_assistant_response(
     input_message: Message,
     reply: Message,
     stream_metrics: StreamMetrics,
+    cancellation: StreamCancellation,
+    *,
+    speculative_stream: ModelRequestStream | None = None,
 ) -> Generator[MessageChunk | MessageStreamError | Chunk, Any, ErrorChunk | None]:
     """
     Adds a new assistant message to the conversation, and streams the llm response to the api
+    If a speculative_stream was started for this request it's used instead of making a new request to the model
+    If the stream is cancelled the model request is stopped, and the reply keeps what the model wrote before that
     Returns the ErrorChunk if an error was encountered, otherwise None
     """
     # Capture the SHA and logger, as the current_app context is lost in the generator.
@@ -437,32 +584,56 @@ def stream_assistant_response(
         pydantic_messages = pydantic_map_messages(message_chain[:-1], blob_map)
         tools = get_pydantic_tool_defs(input_message) if model.can_call_tools else []
 
-        with model_request_stream_sync(
-            model=pydantic_inference_engine,
-            messages=pydantic_messages,
-            model_settings=pydantic_settings_map(request.opts, model, extra_body=request.extra_parameters),
-            model_request_parameters=ModelRequestParameters(function_tools=tools, allow_text_output=True),
-            instrument=instrumentation_settings,
-        ) as stream:
-            for generator_chunk_pydantic in stream:
-                if first_chunk_ns is None:
-                    first_chunk_ns = time_ns()
-
-                pydantic_chunk = pydantic_map_chunk(generator_chunk_pydantic, message=reply)
-                if pydantic_chunk is not None:
-                    if isinstance(pydantic_chunk, ErrorChunk):
-                        # Store error details for later inclusion in combined message
-                        encountered_error = pydantic_chunk
+        message_repository.release_connection()
+
+        with (
+            speculative_stream
+            or model_request_stream_sync(
+                model=pydantic_inference_engine,
+                messages=pydantic_messages,
+                model_settings=pydantic_settings_map(request.opts, model, extra_body=request.extra_parameters),
+                model_request_parameters=ModelRequestParameters(function_tools=tools, allow_text_output=True),
+                instrument=instrumentation_settings,
+            ) as stream,
+            cancellation.stopping(stream),
+        ):
+            try:
+                for generator_chunk_pydantic in stream:
+                    if first_chunk_ns is None:
+                        first_chunk_ns = time_ns()
+
+                    pydantic_chunk = pydantic_map_chunk(generator_chunk_pydantic, message=reply)
+                    if pydantic_chunk is not None:
+                        if isinstance(pydantic_chunk, ErrorChunk):
+                            # Store error details for later inclusion in combined message
+                            encountered_error = pydantic_chunk
+                            pydantic_chunks.append(pydantic_chunk)
+                            yield pydantic_chunk
+                            # Exit the stream without raising an error and return the error chunk
+                            current_span = trace.get_current_span()
+                            current_span.set_status(Status(StatusCode.ERROR))
+                            return encountered_error
                         pydantic_chunks.append(pydantic_chunk)
                         yield pydantic_chunk
-                        # Exit the stream without raising an error and return the error chunk
-                        current_span = trace.get_current_span()
-                        current_span.set_status(Status(StatusCode.ERROR))
-                        return encountered_error
-                    pydantic_chunks.append(pydantic_chunk)
-                    yield pydantic_chunk
-
-        final_stream_output = map_response_to_final_output(stream.get(), reply)
+            except GeneratorExit:
+                # The stream was closed while the model was writing. stream_new_message saves the reply, which is left
+                # empty if the model hadn't started
+                if stream.has_response:
+                    partial_output = map_response_to_final_output(stream.get(), reply)
+                    reply.content = partial_output.text
+                    reply.thinking = partial_output.thinking or None
+                raise
+
+        if cancellation.cancelled and not stream.has_response:
+            # The stream was cancelled before the model started writing
+            final_stream_output = FinalStreamOutput(tool_parts=[], text="", thinking=None)
+        else:
+            final_stream_output = map_response_to_final_output(stream.get(), reply)
+
+        if cancellation.cancelled:
+            finish_reason = FinishReason.Cancelled
+            # Tool calls are left out because the model may not have finished writing them
+            final_stream_output.tool_parts = []
 
         stream_metrics.first_chunk_ns = first_chunk_ns
         stream_metrics.input_token_count = -1
@@ -520,7 +691,7 @@ def stream_assistant_response(
     reply.completion = message_completion.id if message_completion is not None else None
     reply.thinking = final_stream_output.thinking or None
 
-    final_reply = message_repository.update(reply)
+    final_reply = message_repository.update(reply, commit=False)
 
     if final_reply is None:
         final_reply_error = RuntimeError(f"failed to finalize message {reply.id}")
@@ -553,9 +724,16 @@ def prepare_yield_message_chain(message_chain: list[Message], user_message: Mess
 
 
 def repair_children(msg_chain: list[Message]):
+    # children is only used to shape the response here. Assigning it normally would lazy load the current children of
+    # every message just to diff them, re-reading rows we've just written.
     for i, msg in enumerate(msg_chain):
         next_msg = msg_chain[i + 1] if i < len(msg_chain) - 1 else None
-        msg.children = [next_msg] if next_msg else []
+        set_committed_value(msg, "children", [next_msg] if next_msg else [])
+
+        # The chain's existing messages are loaded with their labels. The ones created for this request can't have been
+        # labeled yet, so don't query for them when the chain is serialized
+        if "labels" in inspect(msg).unloaded:
+            set_committed_value(msg, "labels", [])
 
 
 def create_prompt_from_engine_input(
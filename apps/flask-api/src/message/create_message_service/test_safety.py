@@ -0,0 +1,106 @@
+import time
+from io import BytesIO
+
+import pytest
+from pytest_mock import MockerFixture
+from werkzeug import exceptions
+from werkzeug.datastructures import FileStorage
+
+from src.message.create_message_service.safety import SafetyCheck, copy_files, run_safety_checks
+
+
+def slow_check(result: bool | None, seconds: float):  # noqa: FBT001
+    def check() -> bool | None:
+        time.sleep(seconds)
+        return result
+
+    return check
+
+
+@pytest.mark.usefixtures("flask_request_context")
+def test_runs_checks_concurrently():
+    checks = [
+        SafetyCheck(name=f"check-{i}", check=slow_check(True, 0.2), rejection_error="rejected", result_on_timeout=None)
+        for i in range(3)
+    ]
+
+    start = time.monotonic()
+    run_safety_checks(checks, timeout_seconds=5)
+
+    assert time.monotonic() - start < 0.5
+
+
+@pytest.mark.usefixtures("flask_request_context")
+def test_rejects_without_waiting_for_slower_checks():
+    checks = [
+        SafetyCheck(name="slow", check=slow_check(True, 2), rejection_error="slow rejected", result_on_timeout=None),
+        SafetyCheck(name="fast", check=slow_check(False, 0), rejection_error="fast rejected", result_on_timeout=None),
+    ]
+
+    start = time.monotonic()
+    with pytest.raises(exceptions.BadRequest, match="fast rejected"):
+        run_safety_checks(checks, timeout_seconds=5)
+
+    assert time.monotonic() - start < 1
+
+
+@pytest.mark.usefixtures("flask_request_context")
+def test_raises_errors_from_checks():
+    def check() -> bool | None:
+        msg = "invalid_captcha"
+        raise exceptions.BadRequest(msg)
+
+    with pytest.raises(exceptions.BadRequest, match="invalid_captcha"):
+        run_safety_checks(
+            [SafetyCheck(name="captcha", check=check, rejection_error="rejected", result_on_timeout=None)],
+            timeout_seconds=5,
+        )
+
+
+@pytest.mark.usefixtures("flask_request_context")
+def test_fails_open_when_a_check_times_out():
+    checks = [
+        SafetyCheck(name="text", check=slow_check(False, 1), rejection_error="rejected", result_on_timeout=None),
+    ]
+
+    run_safety_checks(checks, timeout_seconds=0.1)
+
+
+@pytest.mark.usefixtures("flask_request_context")
+def test_fails_closed_when_a_check_times_out():
+    checks = [
+        SafetyCheck(name="text", check=slow_check(True, 0), rejection_error="text rejected", result_on_timeout=None),
+        SafetyCheck(name="video", check=slow_check(True, 1), rejection_error="video rejected", result_on_timeout=False),
+    ]
+
+    with pytest.raises(exceptions.BadRequest, match="video rejected"):
+        run_safety_checks(checks, timeout_seconds=0.1)
+
+
+@pytest.mark.usefixtures("flask_request_context")
+def test_records_check_latency_on_span(mocker: MockerFixture):
+    span = mocker.Mock()
+    mocker.patch("src.message.create_message_service.safety.trace.get_current_span", return_value=span)
+
+    checks = [
+        SafetyCheck(name="text", check=slow_check(True, 0), rejection_error="rejected", result_on_timeout=None),
+        SafetyCheck(name="video", check=slow_check(True, 1), rejection_error="rejected", result_on_timeout=None),
+    ]
+    run_safety_checks(checks, timeout_seconds=0.1)
+
+    attributes = {call.args[0]: call.args[1] for call in span.set_attribute.call_args_list}
+    assert "safety_check.text.duration_ms" in attributes
+    assert attributes["safety_check.text.result"] == "True"
+    assert attributes["safety_check.video.timed_out"] is True
+
+
+def test_file_copies_are_read_separately_from_the_uploaded_files():
+    file = FileStorage(stream=BytesIO(b"image"), filename="image.png", content_type="image/png")
+
+    [copy] = copy_files([file])
+    assert copy.stream.read() == b"image"
+
+    assert file.stream.tell() == 0
+    assert file.stream.read() == b"image"
+    assert copy.filename == "image.png"
+    assert copy.mimetype == "image/png"
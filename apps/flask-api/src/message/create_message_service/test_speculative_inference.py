@@ -0,0 +1,162 @@
+import gc
+from io import BytesIO
+
+import pytest
+from pytest_mock import MockerFixture
+from sqlalchemy.orm import Session
+from werkzeug.datastructures import FileStorage
+
+from core.auth.token import Token
+from db.models.message import Message
+from db.models.model_config import ModelConfig, ModelHost, ModelType, PromptType
+from src import db
+from src.dao.message.message_models import MessageStreamError, Role
+from src.dao.message.message_repository import MessageRepository
+from src.message.create_message_request import CreateMessageRequestWithFullMessages
+from src.message.create_message_service import speculative_inference, stream_new_message
+from src.message.create_message_service.speculative_inference import can_speculate, start_speculative_inference
+from src.message.message_chunk import StreamStartChunk
+from src.pydantic_inference.model_request_stream import ModelRequestStream
+
+
+def create_request(**kwargs) -> CreateMessageRequestWithFullMessages:
+    return CreateMessageRequestWithFullMessages(
+        content="test",
+        role=Role.User,
+        model="test-model",
+        client="test-client",
+        enable_tool_calling=False,
+        agent=None,
+        captcha_token=None,
+        create_tool_definitions=None,
+        selected_tools=None,
+        mcp_server_ids=None,
+        **kwargs,
+    )
+
+
+def create_model(*, speculative_inference: bool = True) -> ModelConfig:
+    return ModelConfig(
+        id="test-model",
+        host=ModelHost.TestBackend,
+        name="Test model",
+        description="Test model",
+        model_type=ModelType.Chat,
+        model_id_on_host="test-backend",
+        internal=True,
+        prompt_type=PromptType.TEXT_ONLY,
+        default_system_prompt="You are a helpful assistant",
+        speculative_inference=speculative_inference,
+        temperature_default=0,
+        temperature_lower=0,
+        temperature_upper=1.0,
+        temperature_step=0.1,
+        top_p_default=0,
+        top_p_lower=0,
+        top_p_upper=0,
+        top_p_step=0,
+        max_tokens_default=2048,
+        max_tokens_lower=0,
+        max_tokens_step=1,
+        max_tokens_upper=2048,
+    )
+
+
+def test_only_speculates_when_the_model_allows_it():
+    assert can_speculate(create_request(), create_model(speculative_inference=True)) is True
+    assert can_speculate(create_request(), create_model(speculative_inference=False)) is False
+
+
+def test_does_not_speculate_on_messages_with_files():
+    file = FileStorage(stream=BytesIO(b"image"), filename="image.png", content_type="image/png")
+
+    assert can_speculate(create_request(files=[file]), create_model()) is False
+
+
+@pytest.mark.usefixtures("flask_request_context")
+def test_create_new_message_streams_the_speculative_reply(sql_alchemy: Session, dbc: db.Client, mocker: MockerFixture):
+    request = create_request()
+    model = create_model()
+    client_auth = Token(client="test-client", is_anonymous_user=True, token="token")
+    message_repository = MessageRepository(sql_alchemy)
+
+    speculative_message_chain = mocker.spy(speculative_inference, "get_speculative_message_chain")
+    map_messages = mocker.spy(stream_new_message, "pydantic_map_messages")
+    model_request_stream_sync = mocker.spy(stream_new_message, "model_request_stream_sync")
+
+    speculative_stream = start_speculative_inference(request, model, message_repository, client_auth)
+    assert speculative_stream is not None
+    assert sql_alchemy.query(Message).count() == 0, "nothing should be saved before the safety checks pass"
+
+    stream_generator = stream_new_message.create_new_message(
+        request,
+        dbc,
+        storage_client=mocker.Mock(),
+        model=model,
+        start_time_ns=0,
+        client_auth=client_auth,
+        message_repository=message_repository,
+        new_message_id="test-user-message",
+        speculative_stream=speculative_stream,
+    )
+    assert not isinstance(stream_generator, Message)
+    results = list(stream_generator)
+
+    assert not any(isinstance(chunk, MessageStreamError) for chunk in results)
+    model_request_stream_sync.assert_not_called()
+
+    # The speculative request has to be the same one that would've been sent once the messages were saved
+    speculative_messages = speculative_message_chain.spy_return
+    saved_chain = map_messages.call_args.args[0]
+    assert [(message.role, message.content) for message in speculative_messages] == [
+        (message.role, message.content) for message in saved_chain
+    ]
+    assert [message.role for message in saved_chain] == [Role.System, Role.User]
+
+    saved_messages = sql_alchemy.query(Message).order_by(Message.created).all()
+    assert [message.role for message in saved_messages] == [Role.System, Role.User, Role.Assistant]
+    assert saved_messages[-1].content != ""
+
+
+def create_new_message_with_speculative_stream(
+    sql_alchemy: Session, dbc: db.Client, mocker: MockerFixture, speculative_stream: ModelRequestStream
+):
+    stream_generator = stream_new_message.create_new_message(
+        create_request(),
+        dbc,
+        storage_client=mocker.Mock(),
+        model=create_model(),
+        start_time_ns=0,
+        client_auth=Token(client="test-client", is_anonymous_user=True, token="token"),
+        message_repository=MessageRepository(sql_alchemy),
+        new_message_id="test-user-message",
+        speculative_stream=speculative_stream,
+    )
+    assert not isinstance(stream_generator, Message)
+    return stream_generator
+
+
+@pytest.mark.usefixtures("flask_request_context")
+def test_a_stream_closed_before_it_reads_the_model_closes_the_speculative_stream(
+    sql_alchemy: Session, dbc: db.Client, mocker: MockerFixture
+):
+    speculative_stream = mocker.Mock(spec=ModelRequestStream)
+    stream_generator = create_new_message_with_speculative_stream(sql_alchemy, dbc, mocker, speculative_stream)
+
+    assert isinstance(next(stream_generator), StreamStartChunk)
+    stream_generator.close()
+
+    speculative_stream.close.assert_called()
+
+
+@pytest.mark.usefixtures("flask_request_context")
+def test_a_stream_that_is_never_read_closes_the_speculative_stream(
+    sql_alchemy: Session, dbc: db.Client, mocker: MockerFixture
+):
+    speculative_stream = mocker.Mock(spec=ModelRequestStream)
+    stream_generator = create_new_message_with_speculative_stream(sql_alchemy, dbc, mocker, speculative_stream)
+
+    del stream_generator
+    gc.collect()
+
+    speculative_stream.close.assert_called_once()
@@ -1,13 +1,21 @@
+import asyncio
+import threading
+from collections.abc import AsyncIterator
+
 import pytest
 from pydantic_ai.messages import (
+    ModelMessage,
     ModelResponse,
     TextPart,
     ThinkingPart,
     ToolCallPart,
     ToolCallPartDelta,
 )
+from pydantic_ai.models.function import AgentInfo, DeltaToolCalls, FunctionModel
 from pytest_mock import MockerFixture
+from sqlalchemy import event
 from sqlalchemy.orm import Session
+from werkzeug import exceptions
 
 from core.auth.token import Token
 from db.models.message import Message
@@ -17,8 +25,10 @@ from db.models.tool_definitions import ToolDefinition, ToolSource
 from src import db
 from src.dao.message.message_models import MessageStreamError, Role
 from src.dao.message.message_repository import MessageRepository
+from src.inference.InferenceEngine import FinishReason
 from src.message.create_message_request import CreateMessageRequestWithFullMessages
 from src.message.create_message_service.stream_new_message import (
+    create_new_message,
     map_response_to_final_output,
     stream_new_message,
 )
@@ -27,9 +37,11 @@ from src.message.message_chunk import (
     ErrorChunk,
     ErrorCode,
     ErrorSeverity,
+    ModelResponseChunk,
     StreamEndChunk,
     StreamStartChunk,
 )
+from src.message.stream_cancellation import get_stream_cancellation_registry
 from src.pydantic_inference.mapping.output.map_output import (
     _pydantic_map_delta,
     _pydantic_map_part,
@@ -463,3 +475,252 @@ def test_stream_finishes_if_max_steps_not_exceeded(sql_alchemy: Session, dbc: db
 
     assert isinstance(results[-1], StreamEndChunk)
     assert results[-1].type == ChunkType.END
+
+
+@pytest.mark.usefixtures("flask_request_context")
+def test_create_new_message_commits_once_before_and_once_after_streaming(
+    sql_alchemy: Session, dbc: db.Client, mocker: MockerFixture
+):
+    request = CreateMessageRequestWithFullMessages(
+        content="test",
+        role=Role.User,
+        model="test-model",
+        client="test-client",
+        enable_tool_calling=False,
+        agent=None,
+        captcha_token=None,
+        create_tool_definitions=None,
+        selected_tools=None,
+        mcp_server_ids=None,
+    )
+
+    model = ModelConfig(
+        id="test-model",
+        host=ModelHost.TestBackend,
+        name="Test model",
+        description="Test model",
+        model_type=ModelType.Chat,
+        model_id_on_host="test-backend",
+        internal=True,
+        prompt_type=PromptType.TEXT_ONLY,
+        default_system_prompt="You are a helpful assistant",
+        temperature_default=0,
+        temperature_lower=0,
+        temperature_upper=1.0,
+        temperature_step=0.1,
+        top_p_default=0,
+        top_p_lower=0,
+        top_p_upper=0,
+        top_p_step=0,
+        max_tokens_default=2048,
+        max_tokens_lower=0,
+        max_tokens_step=1,
+        max_tokens_upper=2048,
+    )
+
+    # Counted on the engine so that session commits that don't send anything to the database aren't included
+    commit_count = 0
+
+    @event.listens_for(sql_alchemy.get_bind(), "commit")
+    def count_commit(_connection):
+        nonlocal commit_count
+        commit_count += 1
+
+    stream_generator = create_new_message(
+        request,
+        dbc,
+        storage_client=mocker.Mock(),
+        model=model,
+        start_time_ns=0,
+        client_auth=Token(client="test-client", is_anonymous_user=True, token="token"),
+        message_repository=MessageRepository(sql_alchemy),
+        new_message_id="test-user-message",
+    )
+    assert not isinstance(stream_generator, Message)
+
+    commits_when_chain_is_first_sent: int | None = None
+    results = []
+    for chunk in stream_generator:
+        if isinstance(chunk, Message) and commits_when_chain_is_first_sent is None:
+            commits_when_chain_is_first_sent = commit_count
+        results.append(chunk)
+
+    assert not any(isinstance(chunk, MessageStreamError) for chunk in results)
+    assert commits_when_chain_is_first_sent == 1, "the system, user and reply messages should be saved together"
+    assert commit_count == 2, "the reply and finalized messages should be saved together"
+
+    saved_messages = sql_alchemy.query(Message).order_by(Message.created).all()
+    assert [message.role for message in saved_messages] == [Role.System, Role.User, Role.Assistant]
+    assert all(message.final for message in saved_messages)
+
+
+def create_test_model() -> ModelConfig:
+    return ModelConfig(
+        id="test-model",
+        host=ModelHost.TestBackend,
+        name="Test model",
+        description="Test model",
+        model_type=ModelType.Chat,
+        model_id_on_host="test-backend",
+        internal=True,
+        prompt_type=PromptType.TEXT_ONLY,
+        temperature_default=0,
+        temperature_lower=0,
+        temperature_upper=1.0,
+        temperature_step=0.1,
+        top_p_default=0,
+        top_p_lower=0,
+        top_p_upper=0,
+        top_p_step=0,
+        max_tokens_default=2048,
+        max_tokens_lower=0,
+        max_tokens_step=1,
+        max_tokens_upper=2048,
+    )
+
+
+def create_test_request() -> CreateMessageRequestWithFullMessages:
+    return CreateMessageRequestWithFullMessages(
+        content="test",
+        role=Role.User,
+        model="test-model",
+        client="test-client",
+        enable_tool_calling=False,
+        agent=None,
+        captcha_token=None,
+        create_tool_definitions=None,
+        selected_tools=None,
+        mcp_server_ids=None,
+    )
+
+
+@pytest.mark.usefixtures("flask_request_context")
+def test_cancelled_stream_saves_the_reply_as_cancelled(sql_alchemy: Session, dbc: db.Client, mocker: MockerFixture):
+    stream_generator = create_new_message(
+        create_test_request(),
+        dbc,
+        storage_client=mocker.Mock(),
+        model=create_test_model(),
+        start_time_ns=0,
+        client_auth=Token(client="test-client", is_anonymous_user=True, token="token"),
+        message_repository=MessageRepository(sql_alchemy),
+        new_message_id="test-user-message",
+    )
+    assert not isinstance(stream_generator, Message)
+
+    results: list[object] = []
+    for chunk in stream_generator:
+        if isinstance(chunk, ModelResponseChunk) and not any(
+            isinstance(result, ModelResponseChunk) for result in results
+        ):
+            get_stream_cancellation_registry().cancel(chunk.message, user_id="test-client")
+        results.append(chunk)
+
+    assert not any(isinstance(chunk, MessageStreamError) for chunk in results)
+    assert isinstance(results[-1], StreamEndChunk)
+
+    reply = sql_alchemy.query(Message).filter(Message.role == Role.Assistant).one()
+    assert reply.final
+    assert reply.finish_reason == FinishReason.Cancelled
+    assert reply.content != ""
+
+
+@pytest.mark.usefixtures("flask_request_context")
+def test_closed_stream_saves_what_the_model_wrote(sql_alchemy: Session, dbc: db.Client, mocker: MockerFixture):
+    stream_generator = create_new_message(
+        create_test_request(),
+        dbc,
+        storage_client=mocker.Mock(),
+        model=create_test_model(),
+        start_time_ns=0,
+        client_auth=Token(client="test-client", is_anonymous_user=True, token="token"),
+        message_repository=MessageRepository(sql_alchemy),
+        new_message_id="test-user-message",
+    )
+    assert not isinstance(stream_generator, Message)
+
+    first_response_chunk = next(chunk for chunk in stream_generator if isinstance(chunk, ModelResponseChunk))
+    stream_generator.close()
+
+    saved_messages = sql_alchemy.query(Message).order_by(Message.created).all()
+    assert [message.role for message in saved_messages] == [Role.User, Role.Assistant]
+    assert all(message.final for message in saved_messages)
+
+    reply = saved_messages[-1]
+    assert reply.finish_reason == FinishReason.Cancelled
+    assert reply.content.startswith(first_response_chunk.content)
+
+    with pytest.raises(exceptions.NotFound):
+        get_stream_cancellation_registry().cancel(reply.id, user_id="test-client")
+
+
+async def stalled_response(_messages: list[ModelMessage], _info: AgentInfo) -> AsyncIterator[str | DeltaToolCalls]:
+    await asyncio.Event().wait()
+    yield "Murphy"
+
+
+@pytest.mark.usefixtures("flask_request_context")
+def test_stream_cancelled_before_the_model_responds_saves_an_empty_reply(
+    sql_alchemy: Session, dbc: db.Client, mocker: MockerFixture
+):
+    mocker.patch(
+        "src.message.create_message_service.stream_new_message.get_pydantic_model",
+        return_value=FunctionModel(stream_function=stalled_response),
+    )
+    stream_generator = create_new_message(
+        create_test_request(),
+        dbc,
+        storage_client=mocker.Mock(),
+        model=create_test_model(),
+        start_time_ns=0,
+        client_auth=Token(client="test-client", is_anonymous_user=True, token="token"),
+        message_repository=MessageRepository(sql_alchemy),
+        new_message_id="test-user-message",
+    )
+    assert not isinstance(stream_generator, Message)
+
+    threading.Timer(
+        0.2, get_stream_cancellation_registry().cancel, args=("test-user-message",), kwargs={"user_id": "test-client"}
+    ).start()
+    results = list(stream_generator)
+
+    assert not any(isinstance(chunk, MessageStreamError) for chunk in results)
+    assert isinstance(results[-1], StreamEndChunk)
+
+    reply = sql_alchemy.query(Message).filter(Message.role == Role.Assistant).one()
+    assert reply.final
+    assert reply.finish_reason == FinishReason.Cancelled
+    assert reply.content == ""
+
+
+@pytest.mark.usefixtures("flask_request_context")
+def test_stream_closed_before_the_model_responds_saves_an_empty_reply(
+    sql_alchemy: Session, dbc: db.Client, mocker: MockerFixture
+):
+    mocker.patch(
+        "src.message.create_message_service.stream_new_message.get_pydantic_model",
+        return_value=FunctionModel(stream_function=stalled_response),
+    )
+    stream_generator = create_new_message(
+        create_test_request(),
+        dbc,
+        storage_client=mocker.Mock(),
+        model=create_test_model(),
+        start_time_ns=0,
+        client_auth=Token(client="test-client", is_anonymous_user=True, token="token"),
+        message_repository=MessageRepository(sql_alchemy),
+        new_message_id="test-user-message",
+    )
+    assert not isinstance(stream_generator, Message)
+
+    # The chain is sent with the empty reply just before the model is asked for it
+    next(chunk for chunk in stream_generator if isinstance(chunk, Message))
+    stream_generator.close()
+
+    saved_messages = sql_alchemy.query(Message).order_by(Message.created).all()
+    assert all(message.final for message in saved_messages)
+
+    reply = saved_messages[-1]
+    assert reply.role == Role.Assistant
+    assert reply.finish_reason == FinishReason.Cancelled
+    assert reply.content == ""
@@ -1,32 +1,104 @@
-from collections.abc import Generator
+from collections.abc import Generator, Iterable, Iterator
+from dataclasses import dataclass
+from functools import cache
 from logging import getLogger
 from typing import Any
 
-from flask import json
+from pydantic import TypeAdapter
 
 import src.dao.message.message_models as message
 from core.api_interface import APIInterface
 from db.models.message import Message
-from src.message.message_chunk import Chunk
-from src.thread.thread_models import Thread
-from src.util import CustomEncoder
+from src.config.Config import StreamCoalescing
+from src.message.coalesce_chunks import coalesce_chunks
+from src.message.message_chunk import Chunk, StreamMode
+from src.thread.thread_models import FlatMessage, Thread, ThreadPatchChunk
 
 
-def format_message(obj) -> str:
-    # indent=None forces this to output without newlines which could cause issues when parsing the output
-    return json.dumps(obj=obj, cls=CustomEncoder, indent=None) + "\n"
+@cache
+def _type_adapter(model_type: type[APIInterface]) -> TypeAdapter[Any]:
+    return TypeAdapter(model_type)
+
+
+def format_message(obj: APIInterface) -> bytes:
+    # The model's compiled pydantic-core serializer writes JSON without building a dict for json.dumps first. It doesn't
+    # indent, so every message stays on one line of the stream
+    return _type_adapter(type(obj)).dump_json(obj) + b"\n"
+
+
+@dataclass
+class _SentMessage:
+    flat_message: FlatMessage
+    children: tuple[str, ...]
+
+
+def _walk_thread(message: Message) -> Iterator[Message]:
+    yield message
+    for child in message.children or []:
+        yield from _walk_thread(child)
+
+
+class ThreadPatcher:
+    """
+    Keeps track of the messages already sent in a stream so later updates to the thread only send what changed. The
+    first update sends the whole thread.
+    """
+
+    def __init__(self) -> None:
+        self._sent_messages: dict[str, _SentMessage] = {}
+
+    def update(self, thread: Message) -> Thread | ThreadPatchChunk | None:
+        is_first_update = not self._sent_messages
+        changed_messages: list[FlatMessage] = []
+
+        for thread_message in _walk_thread(thread):
+            children = tuple(child.id for child in thread_message.children or [])
+            sent_message = self._sent_messages.get(thread_message.id)
+
+            # Finished messages don't change, apart from getting replies
+            if sent_message is not None and sent_message.flat_message.final and sent_message.children == children:
+                continue
+
+            flat_message = FlatMessage.from_message(thread_message)
+            if sent_message is not None and sent_message.flat_message == flat_message:
+                continue
+
+            self._sent_messages[thread_message.id] = _SentMessage(flat_message=flat_message, children=children)
+            changed_messages.append(flat_message)
+
+        if is_first_update:
+            return Thread(id=thread.id, messages=changed_messages)
+
+        if not changed_messages:
+            return None
+
+        return ThreadPatchChunk(message=thread.id, messages=changed_messages)
 
 
 def format_messages(
     stream_generator: Generator[Message | message.MessageChunk | message.MessageStreamError | Chunk],
-) -> Generator[str, Any, None]:
+    *,
+    stream_mode: StreamMode = StreamMode.FULL,
+    coalescing: StreamCoalescing | None = None,
+) -> Generator[bytes, Any, None]:
+    thread_patcher = ThreadPatcher() if stream_mode is StreamMode.DELTA else None
+    stream: Iterable[Message | message.MessageChunk | message.MessageStreamError | Chunk] = stream_generator
+    if coalescing is not None and coalescing.enabled:
+        stream = coalesce_chunks(
+            stream_generator, max_delay_seconds=coalescing.max_delay_seconds, max_bytes=coalescing.max_bytes
+        )
+
     try:
-        for stream_message in stream_generator:
+        for stream_message in stream:
             match stream_message:
                 case Message():
-                    flat_messages = Thread.from_message(stream_message)
+                    if thread_patcher is None:
+                        yield format_message(Thread.from_message(stream_message))
+                        continue
 
-                    yield format_message(flat_messages)
+                    thread_update = thread_patcher.update(stream_message)
+                    if thread_update is not None:
+                        yield format_message(thread_update)
                 case APIInterface():
                     yield format_message(stream_message)
     except Exception:
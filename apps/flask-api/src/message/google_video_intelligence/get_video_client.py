@@ -1,13 +1,11 @@
-from functools import cache
-
 from google.cloud import videointelligence
 
+from src.util.client_registry import client_registry
+
 
-@cache
-def get_video_intelligence_client():
-    return videointelligence.VideoIntelligenceServiceClient()
+def get_video_intelligence_client() -> videointelligence.VideoIntelligenceServiceClient:
+    return client_registry.get("video_intelligence", videointelligence.VideoIntelligenceServiceClient)
 
 
-@cache
-def get_async_video_intelligence_client():
-    return videointelligence.VideoIntelligenceServiceAsyncClient()
+def get_async_video_intelligence_client() -> videointelligence.VideoIntelligenceServiceAsyncClient:
+    return client_registry.get("video_intelligence_async", videointelligence.VideoIntelligenceServiceAsyncClient)
@@ -15,6 +15,14 @@ class ChunkType(StrEnum):
     THINKING = "thinking"
     START = "start"
     END = "end"
+    THREAD_PATCH = "threadPatch"
+
+
+class StreamMode(StrEnum):
+    # Every update to the thread sends the whole thread
+    FULL = "full"
+    # The thread is sent whole once. After that, updates only have the messages that were added or changed
+    DELTA = "delta"
 
 
 class ErrorCode(StrEnum):
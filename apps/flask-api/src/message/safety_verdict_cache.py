@@ -0,0 +1,109 @@
+import hashlib
+import json
+import math
+import unicodedata
+from functools import cache
+
+import redis
+from flask import current_app
+from opentelemetry import metrics, trace
+
+from src.config.Config import SafetyVerdictCache as SafetyVerdictCacheConfig
+from src.config.get_config import get_config
+from src.message.SafetyChecker import SafetyCheckerType
+from src.util.ttl_cache import TTLCache
+
+REDIS_KEY_PREFIX = "playground_safety_verdict:"
+# Redis is only a second level of cache, so don't let a slow connection hold up the safety checks
+REDIS_TIMEOUT_SECONDS = 0.25
+
+meter = metrics.get_meter(__name__)
+lookup_counter = meter.create_counter(
+    "safety_verdict_cache.lookups", description="Text safety verdict cache lookups, by result"
+)
+
+
+def normalize_text(text: str) -> str:
+    return unicodedata.normalize("NFC", text).strip()
+
+
+def verdict_cache_key(checker_type: SafetyCheckerType, model_version: str, text: str) -> str:
+    # The thresholds are part of the key so verdicts made with old thresholds aren't used after they change
+    thresholds = (
+        get_config().google_moderate_text.model_dump(mode="json")
+        if checker_type == SafetyCheckerType.GoogleLanguage
+        else None
+    )
+    key = json.dumps([checker_type, model_version, thresholds, normalize_text(text)])
+
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+class SafetyVerdictCache:
+    """
+    Caches text safety verdicts in process, and optionally in redis so they're shared between workers.
+
+    Only definite verdicts should be cached. Redis errors are logged and treated as cache misses.
+    """
+
+    def __init__(self, config: SafetyVerdictCacheConfig, redis_client: redis.Redis | None = None):
+        self._local: TTLCache[str, bool] = TTLCache(max_entries=config.max_entries, ttl_seconds=config.ttl_seconds)
+        self._ttl_seconds = config.ttl_seconds
+        self._redis = redis_client
+
+    def get(self, key: str) -> bool | None:
+        verdict = self._local.get(key)
+        if verdict is not None:
+            self._record_lookup("hit")
+            return verdict
+
+        if self._redis is not None:
+            try:
+                stored_verdict = self._redis.get(REDIS_KEY_PREFIX + key)
+            except redis.RedisError as e:
+                current_app.logger.warning("Couldn't read safety verdict from redis: %s", repr(e))
+                stored_verdict = None
+
+            if stored_verdict is not None:
+                verdict = stored_verdict == b"1"
+                self._local.set(key, verdict)
+                self._record_lookup("redis_hit")
+                return verdict
+
+        self._record_lookup("miss")
+        return None
+
+    def set(self, key: str, verdict: bool) -> None:  # noqa: FBT001
+        self._local.set(key, verdict)
+
+        if self._redis is not None:
+            try:
+                self._redis.set(REDIS_KEY_PREFIX + key, "1" if verdict else "0", ex=math.ceil(self._ttl_seconds))
+            except redis.RedisError as e:
+                current_app.logger.warning("Couldn't write safety verdict to redis: %s", repr(e))
+
+    @staticmethod
+    def _record_lookup(result: str) -> None:
+        lookup_counter.add(1, {"result": result})
+        trace.get_current_span().set_attribute("safety_verdict_cache.result", result)
+
+
+@cache
+def get_safety_verdict_cache() -> SafetyVerdictCache | None:
+    config = get_config()
+    cache_config = config.safety_checks.verdict_cache
+
+    if not cache_config.enabled:
+        return None
+
+    redis_client = (
+        redis.Redis.from_url(
+            config.queue_url,
+            socket_timeout=REDIS_TIMEOUT_SECONDS,
+            socket_connect_timeout=REDIS_TIMEOUT_SECONDS,
+        )
+        if cache_config.use_redis
+        else None
+    )
+
+    return SafetyVerdictCache(cache_config, redis_client)
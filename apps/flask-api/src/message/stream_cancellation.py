@@ -0,0 +1,277 @@
+import asyncio
+import socket
+import ssl
+import threading
+from collections.abc import Callable, Generator
+from contextlib import contextmanager
+from enum import StrEnum
+from functools import cache
+from logging import getLogger
+from time import sleep
+from typing import Any, cast
+
+import redis
+from flask import has_request_context, request
+from opentelemetry import metrics
+from werkzeug import exceptions
+
+from src.config.get_config import get_config
+from src.message.stream_redis import get_stream_redis_client, write_to_redis
+from src.pydantic_inference.model_request_stream import ModelRequestStream
+from src.util.background_event_loop import background_event_loop
+
+REDIS_KEY_PREFIX = "playground_stream_cancellation:"
+REDIS_CHANNEL = "playground_stream_cancellations"
+# The listener waits this long for a cancel at a time. It has to be shorter than REDIS_TIMEOUT_SECONDS
+REDIS_LISTEN_SECONDS = 0.5
+# How long the listener waits to reconnect after losing redis
+REDIS_RETRY_SECONDS = 5.0
+# A stream deletes its keys when it finishes. This only cleans up after workers that stopped mid-stream
+REDIS_KEY_TTL_SECONDS = 60 * 60
+
+meter = metrics.get_meter(__name__)
+cancellation_counter = meter.create_counter(
+    "stream_cancellation.cancellations", description="Response streams stopped before they finished, by reason"
+)
+
+
+class CancelReason(StrEnum):
+    # The stream's owner asked for it to stop
+    Requested = "requested"
+    # The client closed its connection
+    Disconnected = "disconnected"
+
+
+class StreamCancellation:
+    """
+    Stops a response stream from outside of it. Cancelling closes the model request the stream is reading, which
+    cancels it upstream, and the stream finishes with what the model wrote before it stopped.
+    """
+
+    def __init__(self, owner: str):
+        self.owner = owner
+        self.message_ids: list[str] = []
+        self.reason: CancelReason | None = None
+        self._lock = threading.Lock()
+        self._model_stream: ModelRequestStream | None = None
+        self._client_socket: socket.socket | None = None
+        self._client_fd = -1
+
+    @property
+    def cancelled(self) -> bool:
+        return self.reason is not None
+
+    def cancel(self, reason: CancelReason) -> None:
+        with self._lock:
+            if self.reason is not None:
+                return
+
+            self.reason = reason
+            model_stream = self._model_stream
+
+        cancellation_counter.add(1, {"reason": reason})
+        if model_stream is not None:
+            model_stream.close()
+
+    @contextmanager
+    def stopping(self, model_stream: ModelRequestStream) -> Generator[ModelRequestStream]:
+        """Closes the model stream if the stream is cancelled while it's being read."""
+        with self._lock:
+            self._model_stream = model_stream
+            cancelled = self.reason is not None
+
+        if cancelled:
+            model_stream.close()
+
+        try:
+            yield model_stream
+        finally:
+            with self._lock:
+                self._model_stream = None
+
+    def cancel_on_disconnect(self, client_socket: socket.socket) -> None:
+        """
+        Cancels the stream as soon as the client closes its connection, instead of when the stream next writes to it.
+        stop_watching() has to be called before the connection is closed.
+        """
+        background_event_loop.run(self._watch(client_socket))
+
+    def stop_watching(self) -> None:
+        if self._client_socket is not None:
+            background_event_loop.run(self._unwatch())
+
+    async def _watch(self, client_socket: socket.socket) -> None:
+        self._client_socket = client_socket
+        # The fd is kept because the socket's fileno() changes once it's closed
+        self._client_fd = client_socket.fileno()
+        asyncio.get_running_loop().add_reader(self._client_fd, self._check_connection)
+
+    async def _unwatch(self) -> None:
+        if self._client_socket is not None:
+            asyncio.get_running_loop().remove_reader(self._client_fd)
+            self._client_socket = None
+
+    def _check_connection(self) -> None:
+        # Runs on the event loop when the client's connection can be read from. A client waiting on its response
+        # doesn't send anything, so this is normally the connection closing.
+        client_socket = self._client_socket
+        if client_socket is None:
+            return
+
+        try:
+            disconnected = not client_socket.recv(1, socket.MSG_PEEK | socket.MSG_DONTWAIT)
+        except BlockingIOError:
+            return
+        except OSError:
+            disconnected = True
+
+        # Anything the client did send is left for the server to read
+        asyncio.get_running_loop().remove_reader(self._client_fd)
+        self._client_socket = None
+
+        if disconnected:
+            self.cancel(CancelReason.Disconnected)
+
+
+def request_client_socket() -> socket.socket | None:
+    """The current request's connection, if the server makes it available and it can be watched."""
+    if not has_request_context():
+        return None
+
+    client_socket = request.environ.get("gunicorn.socket")
+    # A TLS connection can't be peeked at without reading from it
+    if not isinstance(client_socket, socket.socket) or isinstance(client_socket, ssl.SSLSocket):
+        return None
+
+    return client_socket
+
+
+class StreamCancellationRegistry:
+    """
+    The response streams running in this process, by the ids of their thread and messages, so their owners can
+    cancel them.
+
+    With redis, a stream's owner is also kept in redis under each of its ids, so a cancel for a stream running in
+    another worker can be checked and published for that worker to act on. Redis write errors are logged and otherwise
+    ignored.
+    """
+
+    def __init__(self, *, cancel_on_disconnect: bool, redis_client: redis.Redis | None = None):
+        self._cancel_on_disconnect = cancel_on_disconnect
+        self._streams: dict[str, StreamCancellation] = {}
+        self._lock = threading.Lock()
+        self._redis = redis_client
+
+        if redis_client is not None:
+            threading.Thread(target=self._listen, args=(redis_client,), name="stream-cancellation", daemon=True).start()
+
+    def start(self, owner: str, *message_ids: str) -> StreamCancellation:
+        """
+        Tracks a new stream by the given ids. A stream started in a request is also cancelled when the request's client
+        disconnects. finish() has to be called when the stream ends.
+        """
+        cancellation = StreamCancellation(owner)
+        self.add(cancellation, *message_ids)
+
+        client_socket = request_client_socket() if self._cancel_on_disconnect else None
+        if client_socket is not None:
+            cancellation.cancel_on_disconnect(client_socket)
+
+        return cancellation
+
+    def add(self, cancellation: StreamCancellation, *message_ids: str) -> None:
+        """Lets the stream be cancelled by more ids, like the ids of replies it creates."""
+        cancellation.message_ids.extend(message_ids)
+        with self._lock:
+            for message_id in message_ids:
+                self._streams[message_id] = cancellation
+
+        def set_owners(pipeline: Any) -> None:
+            for message_id in message_ids:
+                pipeline.set(REDIS_KEY_PREFIX + message_id, cancellation.owner, ex=REDIS_KEY_TTL_SECONDS)
+
+        self._write_to_redis(set_owners)
+
+    def finish(self, cancellation: StreamCancellation) -> None:
+        cancellation.stop_watching()
+
+        with self._lock:
+            # A newer stream in the same thread may have taken over the thread's id
+            message_ids = [
+                message_id
+                for message_id in set(cancellation.message_ids)
+                if self._streams.get(message_id) is cancellation
+            ]
+            for message_id in message_ids:
+                del self._streams[message_id]
+
+        if message_ids:
+            self._write_to_redis(
+                lambda pipeline: pipeline.delete(*(REDIS_KEY_PREFIX + message_id for message_id in message_ids))
+            )
+
+    def cancel(self, message_id: str, *, user_id: str) -> None:
+        """Cancels the user's stream that the message is in. Raises NotFound if there isn't one running."""
+        with self._lock:
+            cancellation = self._streams.get(message_id)
+
+        if cancellation is not None:
+            if cancellation.owner != user_id:
+                raise exceptions.NotFound
+
+            cancellation.cancel(CancelReason.Requested)
+            return
+
+        if self._redis is None:
+            raise exceptions.NotFound
+
+        try:
+            owner = cast(bytes | None, self._redis.get(REDIS_KEY_PREFIX + message_id))
+            if owner is None or owner.decode() != user_id:
+                raise exceptions.NotFound
+
+            self._redis.publish(REDIS_CHANNEL, message_id)
+        except redis.RedisError as e:
+            getLogger().warning("Couldn't send a stream cancel through redis: %s", repr(e))
+            raise exceptions.NotFound from e
+
+    def _cancel_published(self, message_id: str) -> None:
+        # The worker that published the cancel has already checked the stream's owner
+        with self._lock:
+            cancellation = self._streams.get(message_id)
+
+        if cancellation is not None:
+            cancellation.cancel(CancelReason.Requested)
+
+    def _listen(self, redis_client: redis.Redis) -> None:
+        while True:
+            pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.subscribe(REDIS_CHANNEL)
+                while True:
+                    message = pubsub.get_message(timeout=REDIS_LISTEN_SECONDS)
+                    if message is not None:
+                        self._cancel_published(cast(bytes, message["data"]).decode())
+            except redis.RedisError as e:
+                getLogger().warning("Lost the stream cancel channel in redis: %s", repr(e))
+                sleep(REDIS_RETRY_SECONDS)
+            finally:
+                pubsub.close()
+
+    def _write_to_redis(self, add_commands: Callable[[Any], None]) -> None:
+        if self._redis is not None:
+            write_to_redis(self._redis, add_commands, description="stream owners")
+
+
+@cache
+def get_stream_cancellation_registry() -> StreamCancellationRegistry:
+    config = get_config()
+    cancellation_config = config.stream_cancellation
+
+    redis_client = get_stream_redis_client() if cancellation_config.use_redis else None
+
+    return StreamCancellationRegistry(
+        # A stream that can be resumed (stream_replay) is meant to outlive its client's connection
+        cancel_on_disconnect=cancellation_config.cancel_on_disconnect and not config.stream_replay.enabled,
+        redis_client=redis_client,
+    )
@@ -0,0 +1,40 @@
+from collections.abc import Callable
+from functools import partial
+from logging import getLogger
+from typing import Any
+
+import redis
+
+from src.config.get_config import get_config
+from src.util.client_registry import client_registry
+
+REDIS_TIMEOUT_SECONDS = 1.0
+
+
+def get_stream_redis_client() -> redis.Redis:
+    """The client for the redis instance at queue_url that response streams share between workers."""
+    queue_url = get_config().queue_url
+
+    return client_registry.get(
+        "stream_redis",
+        partial(
+            redis.Redis.from_url,
+            queue_url,
+            socket_timeout=REDIS_TIMEOUT_SECONDS,
+            socket_connect_timeout=REDIS_TIMEOUT_SECONDS,
+        ),
+        version=queue_url,
+    )
+
+
+def write_to_redis(redis_client: redis.Redis, add_commands: Callable[[Any], None], *, description: str) -> None:
+    """
+    Sends the commands add_commands adds to a pipeline in one round trip. Streams keep going without redis, so errors
+    are logged and otherwise ignored.
+    """
+    try:
+        pipeline = redis_client.pipeline(transaction=False)
+        add_commands(pipeline)
+        pipeline.execute()
+    except redis.RedisError as e:
+        getLogger().warning("Couldn't write %s to redis: %s", description, repr(e))
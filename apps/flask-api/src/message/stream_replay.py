@@ -0,0 +1,372 @@
+import contextvars
+import math
+import threading
+from collections import deque
+from collections.abc import Callable, Generator
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import cache, partial
+from io import BytesIO
+from itertools import islice
+from logging import getLogger
+from time import monotonic
+from typing import Any, TypeVar, cast
+
+import redis
+from flask import current_app, request
+from flask.globals import request_ctx
+from werkzeug import exceptions
+
+from db.models.message import Message
+from src.config.Config import StreamCoalescing
+from src.config.Config import StreamReplay as StreamReplayConfig
+from src.config.get_config import get_config
+from src.message.format_messages_output import format_messages
+from src.message.message_chunk import StreamMode
+from src.message.stream_redis import get_stream_redis_client, write_to_redis
+from src.util.ttl_cache import TTLCache
+
+REDIS_KEY_PREFIX = "playground_stream_replay:"
+# Reads from redis wait this long for new lines at a time. It has to be shorter than REDIS_TIMEOUT_SECONDS
+REDIS_READ_BLOCK_MS = 500
+
+T = TypeVar("T")
+
+
+class StreamInterruptedError(Exception):
+    """Raised to a reader that can't read a stream to its end, so the client's connection is closed with an error."""
+
+
+class InMemoryUpload(BytesIO):
+    """
+    An uploaded file's content, read into memory so a stream can keep reading it after its request has ended. Werkzeug
+    closes a request's files when the request ends, so closing this doesn't discard the content.
+    """
+
+    def close(self) -> None:
+        pass
+
+
+def read_uploads_into_memory() -> None:
+    """Swaps the current request's uploaded files for in-memory copies and closes the originals."""
+    for files in request.files.listvalues():
+        for file in files:
+            content = file.stream.read()
+            file.stream.close()
+            file.stream = InMemoryUpload(content)
+
+
+class StreamReplayLog:
+    """
+    The lines a stream has written, numbered from 1. Only the last max_lines lines are kept.
+
+    read() gives a reader the lines after the ones it already has, then follows the stream until it's finished.
+    """
+
+    def __init__(self, owner: str, max_lines: int, idle_timeout_seconds: float):
+        self.owner = owner
+        self.thread_id: str | None = None
+        self._lines: deque[bytes] = deque(maxlen=max_lines)
+        self._line_count = 0
+        self._finished = False
+        self._failed = False
+        self._idle_timeout_seconds = idle_timeout_seconds
+        self._condition = threading.Condition()
+
+    @property
+    def line_count(self) -> int:
+        return self._line_count
+
+    def _has_line_or_finished(self, line_number: int) -> bool:
+        return self._line_count >= line_number or self._finished
+
+    def _first_line_number(self) -> int:
+        return self._line_count - len(self._lines) + 1
+
+    def append(self, line: bytes) -> int:
+        with self._condition:
+            self._lines.append(line)
+            self._line_count += 1
+            self._condition.notify_all()
+
+            return self._line_count
+
+    def finish(self, *, failed: bool = False) -> None:
+        with self._condition:
+            self._finished = True
+            self._failed = failed
+            self._condition.notify_all()
+
+    def numbered_lines(self) -> list[tuple[int, bytes]]:
+        with self._condition:
+            return list(enumerate(self._lines, start=self._first_line_number()))
+
+    def can_replay_after(self, after: int) -> bool:
+        with self._condition:
+            return after + 1 >= self._first_line_number()
+
+    def read(self, after: int = 0) -> Generator[bytes]:
+        next_line_number = after + 1
+
+        while True:
+            with self._condition:
+                has_news = self._condition.wait_for(
+                    partial(self._has_line_or_finished, next_line_number), timeout=self._idle_timeout_seconds
+                )
+                if not has_news:
+                    msg = "the stream stopped writing lines"
+                    raise StreamInterruptedError(msg)
+
+                first_line_number = self._first_line_number()
+                if next_line_number < first_line_number:
+                    msg = "the reader fell behind the lines kept for replay"
+                    raise StreamInterruptedError(msg)
+
+                lines = list(islice(self._lines, next_line_number - first_line_number, None))
+                is_done = self._finished and next_line_number + len(lines) > self._line_count
+                failed = self._failed
+
+            yield from lines
+            next_line_number += len(lines)
+
+            if is_done:
+                if failed:
+                    msg = "the stream failed"
+                    raise StreamInterruptedError(msg)
+                return
+
+
+class StreamReplayRegistry:
+    """
+    Runs response streams on a pool of threads and keeps what they write, by thread id. A stream keeps going if the
+    client that started it goes away, and the client can catch up on what it missed with open().
+
+    Logs are kept in process, and optionally copied to redis so a client can catch up through any worker. A thread
+    has one log at a time: a new stream in the thread replaces the last one. Redis write errors are logged and
+    otherwise ignored.
+    """
+
+    def __init__(self, config: StreamReplayConfig, redis_client: redis.Redis | None = None):
+        self._config = config
+        self._logs: TTLCache[str, StreamReplayLog] = TTLCache(
+            max_entries=config.max_streams, ttl_seconds=config.retention_seconds
+        )
+        self._redis = redis_client
+        # The pool's threads aren't daemons, so a worker that's shutting down lets its streams finish and save their
+        # replies
+        self._executor = ThreadPoolExecutor(
+            max_workers=config.max_concurrent_streams, thread_name_prefix="stream-replay"
+        )
+
+    def start(
+        self,
+        start_stream: Callable[[], T],
+        *,
+        owner: str,
+        stream_mode: StreamMode = StreamMode.FULL,
+        coalescing: StreamCoalescing | None = None,
+    ) -> T | Generator[bytes]:
+        """
+        Calls start_stream on the pool with a copy of the current request context. The stream gets its own app context,
+        and with it its own database session, so the request can end without ending the stream. The request's uploaded
+        files are read into memory first for the same reason.
+
+        If start_stream returns a stream its lines are written to a new log, and the generator returned here reads
+        them. Anything else start_stream returns or raises is passed on as it is.
+        """
+        started: Future[Any] = Future()
+        app_context = current_app.app_context()
+        request_context = request_ctx.copy()
+        read_uploads_into_memory()
+
+        def run() -> None:
+            with app_context, request_context:
+                try:
+                    stream_response = start_stream()
+                except BaseException as e:  # noqa: BLE001
+                    started.set_exception(e)
+                    return
+
+                if not isinstance(stream_response, Generator):
+                    started.set_result(stream_response)
+                    return
+
+                log = StreamReplayLog(
+                    owner,
+                    max_lines=self._config.max_lines_per_stream,
+                    idle_timeout_seconds=self._config.idle_timeout_seconds,
+                )
+                started.set_result(log)
+                self._write(log, stream_response, stream_mode=stream_mode, coalescing=coalescing)
+
+        # Copying the context vars keeps the stream's spans in the request's trace
+        self._executor.submit(contextvars.copy_context().run, run)
+
+        result = started.result()
+        return result.read() if isinstance(result, StreamReplayLog) else result
+
+    def open(self, thread_id: str, *, user_id: str, after: int) -> Generator[bytes]:
+        """Reads the lines after the first `after` lines of the thread's last stream, then follows it live."""
+        log = self._logs.get(thread_id)
+        if log is not None:
+            if log.owner != user_id:
+                raise exceptions.NotFound
+
+            if not log.can_replay_after(after):
+                raise exceptions.Gone
+
+            return log.read(after)
+
+        if self._redis is not None:
+            return self._open_from_redis(self._redis, thread_id, user_id=user_id, after=after)
+
+        raise exceptions.NotFound
+
+    def _write(
+        self,
+        log: StreamReplayLog,
+        stream_generator: Generator,
+        *,
+        stream_mode: StreamMode,
+        coalescing: StreamCoalescing | None,
+    ) -> None:
+        def publish_thread(stream: Generator) -> Generator[Any]:
+            # The thread's id is only known once the stream sends the thread
+            for item in stream:
+                if log.thread_id is None and isinstance(item, Message):
+                    self._publish(item.id, log)
+                yield item
+
+        try:
+            for line in format_messages(
+                publish_thread(stream_generator), stream_mode=stream_mode, coalescing=coalescing
+            ):
+                self._append(log, line)
+        except Exception:  # noqa: BLE001
+            # format_messages has already logged the error
+            self._finish(log, failed=True)
+        else:
+            self._finish(log)
+
+    def _publish(self, thread_id: str, log: StreamReplayLog) -> None:
+        log.thread_id = thread_id
+        # The log is kept until the stream finishes, and for retention_seconds after that
+        self._logs.set(thread_id, log, ttl_seconds=math.inf)
+
+        def copy_log(pipeline: Any) -> None:
+            pipeline.delete(REDIS_KEY_PREFIX + thread_id)
+            pipeline.set(REDIS_KEY_PREFIX + thread_id + ":owner", log.owner)
+            for line_number, line in log.numbered_lines():
+                self._add_line(pipeline, thread_id, line_number, line)
+
+        self._write_to_redis(thread_id, copy_log)
+
+    def _append(self, log: StreamReplayLog, line: bytes) -> None:
+        line_number = log.append(line)
+
+        thread_id = log.thread_id
+        # A newer stream in the same thread has replaced this one, and the thread's lines in redis are its lines now
+        if thread_id is None or self._logs.get(thread_id) is not log:
+            return
+
+        self._write_to_redis(thread_id, lambda pipeline: self._add_line(pipeline, thread_id, line_number, line))
+
+    def _finish(self, log: StreamReplayLog, *, failed: bool = False) -> None:
+        log.finish(failed=failed)
+
+        thread_id = log.thread_id
+        # A newer stream in the same thread has replaced this one
+        if thread_id is None or self._logs.get(thread_id) is not log:
+            return
+
+        self._logs.set(thread_id, log)
+        self._write_to_redis(
+            thread_id,
+            lambda pipeline: pipeline.xadd(
+                REDIS_KEY_PREFIX + thread_id, {"end": "failed" if failed else "done"}, id=f"{log.line_count}-1"
+            ),
+        )
+
+    def _add_line(self, pipeline: Any, thread_id: str, line_number: int, line: bytes) -> None:
+        # Entry ids are the line numbers, so a reader can ask for the entries after the lines it has
+        pipeline.xadd(
+            REDIS_KEY_PREFIX + thread_id,
+            {"line": line},
+            id=f"{line_number}-0",
+            maxlen=self._config.max_lines_per_stream,
+            approximate=True,
+        )
+
+    def _write_to_redis(self, thread_id: str, add_commands: Callable[[Any], None]) -> None:
+        if self._redis is None:
+            return
+
+        # Readers give up on a stream that's been quiet for idle_timeout_seconds, so a stream that stopped without
+        # finishing doesn't need to be kept longer than that
+        ttl_seconds = math.ceil(self._config.retention_seconds + self._config.idle_timeout_seconds)
+
+        def add_commands_with_expiry(pipeline: Any) -> None:
+            add_commands(pipeline)
+            pipeline.expire(REDIS_KEY_PREFIX + thread_id, ttl_seconds)
+            pipeline.expire(REDIS_KEY_PREFIX + thread_id + ":owner", ttl_seconds)
+
+        write_to_redis(self._redis, add_commands_with_expiry, description="stream lines")
+
+    def _open_from_redis(
+        self, redis_client: redis.Redis, thread_id: str, *, user_id: str, after: int
+    ) -> Generator[bytes]:
+        key = REDIS_KEY_PREFIX + thread_id
+        try:
+            owner = cast(bytes | None, redis_client.get(key + ":owner"))
+            first_entries = cast(list[tuple[bytes, dict[bytes, bytes]]], redis_client.xrange(key, count=1))
+        except redis.RedisError as e:
+            getLogger().warning("Couldn't read stream lines from redis: %s", repr(e))
+            raise exceptions.NotFound from e
+
+        if owner is None or owner.decode() != user_id or not first_entries:
+            raise exceptions.NotFound
+
+        first_entry_id, _ = first_entries[0]
+        if int(first_entry_id.split(b"-")[0]) > after + 1:
+            raise exceptions.Gone
+
+        return self._read_from_redis(redis_client, key, after)
+
+    def _read_from_redis(self, redis_client: redis.Redis, key: str, after: int) -> Generator[bytes]:
+        last_entry_id: bytes | str = f"{after}-0"
+        quiet_since = monotonic()
+
+        while True:
+            response = cast(
+                list[tuple[bytes, list[tuple[bytes, dict[bytes, bytes]]]]],
+                redis_client.xread({key: last_entry_id}, count=100, block=REDIS_READ_BLOCK_MS),
+            )
+            if not response:
+                if monotonic() - quiet_since >= self._config.idle_timeout_seconds:
+                    msg = "the stream stopped writing lines"
+                    raise StreamInterruptedError(msg)
+                continue
+
+            for entry_id, fields in response[0][1]:
+                if b"end" in fields:
+                    if fields[b"end"] == b"failed":
+                        msg = "the stream failed"
+                        raise StreamInterruptedError(msg)
+                    return
+
+                yield fields[b"line"]
+                last_entry_id = entry_id
+
+            quiet_since = monotonic()
+
+
+@cache
+def get_stream_replay_registry() -> StreamReplayRegistry | None:
+    config = get_config()
+    replay_config = config.stream_replay
+
+    if not replay_config.enabled:
+        return None
+
+    redis_client = get_stream_redis_client() if replay_config.use_redis else None
+
+    return StreamReplayRegistry(replay_config, redis_client)
@@ -0,0 +1,34 @@
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from db.models.message import Message
+from src.dao.message.message_repository import MessageRepository
+from src.message.backfill_message_snippets import backfill_message_snippets
+
+
+def test_backfills_missing_snippets(sql_alchemy: Session):
+    message_repository = MessageRepository(sql_alchemy)
+    for index in range(5):
+        message_repository.add(
+            Message(
+                id=f"msg_{index}",
+                content=f"<p>Message <b>{index}</b></p>",
+                creator="creator",
+                role="user",
+                opts={},
+                root="msg_0",
+                model_id="model_id",
+                model_host="model_host",
+                parent=None,
+                expiration_time=None,
+            ),
+            commit=False,
+        )
+    message_repository.commit()
+    sql_alchemy.execute(update(Message).where(Message.id != "msg_4").values(snippet=None))
+    sql_alchemy.commit()
+
+    assert backfill_message_snippets(sql_alchemy.get_bind().engine, batch_size=2) == 4
+
+    snippets = sql_alchemy.execute(select(Message.id, Message.snippet).order_by(Message.id)).all()
+    assert [tuple(row) for row in snippets] == [(f"msg_{index}", f"Message {index}") for index in range(5)]
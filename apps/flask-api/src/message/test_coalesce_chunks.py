@@ -0,0 +1,95 @@
+from collections.abc import Iterable
+
+import pytest
+
+from src.message.coalesce_chunks import coalesce_chunks
+from src.message.message_chunk import Chunk, ModelResponseChunk, StreamEndChunk, ThinkingChunk
+from src.util.fake_timer import FakeTimer
+
+
+def coalesce(chunks: Iterable[Chunk], clock: FakeTimer | None = None, *, max_bytes: int = 256) -> list[Chunk]:
+    return list(coalesce_chunks(chunks, max_delay_seconds=0.02, max_bytes=max_bytes, clock=clock or FakeTimer()))
+
+
+def test_sends_the_first_delta_right_away():
+    stream = coalesce_chunks(
+        [
+            ModelResponseChunk(message="msg_reply", content="Hello"),
+            ModelResponseChunk(message="msg_reply", content="!"),
+        ],
+        max_delay_seconds=0.02,
+        max_bytes=256,
+    )
+
+    assert next(stream) == ModelResponseChunk(message="msg_reply", content="Hello")
+
+
+def test_merges_deltas_for_the_same_message():
+    chunks = coalesce([
+        ModelResponseChunk(message="msg_reply", content="Hello"),
+        ModelResponseChunk(message="msg_reply", content=","),
+        ModelResponseChunk(message="msg_reply", content=" world"),
+        StreamEndChunk(message="msg_reply"),
+    ])
+
+    assert chunks == [
+        ModelResponseChunk(message="msg_reply", content="Hello"),
+        ModelResponseChunk(message="msg_reply", content=", world"),
+        StreamEndChunk(message="msg_reply"),
+    ]
+
+
+def test_doesnt_merge_different_kinds_of_deltas():
+    chunks = coalesce([
+        ThinkingChunk(message="msg_reply", content="Hmm", id="thinking_1"),
+        ThinkingChunk(message="msg_reply", content="...", id="thinking_1"),
+        ThinkingChunk(message="msg_reply", content="Aha", id="thinking_2"),
+        ModelResponseChunk(message="msg_reply", content="The"),
+        ModelResponseChunk(message="msg_reply", content=" answer"),
+        ModelResponseChunk(message="msg_other_reply", content="Other"),
+    ])
+
+    assert chunks == [
+        ThinkingChunk(message="msg_reply", content="Hmm", id="thinking_1"),
+        ThinkingChunk(message="msg_reply", content="...", id="thinking_1"),
+        ThinkingChunk(message="msg_reply", content="Aha", id="thinking_2"),
+        ModelResponseChunk(message="msg_reply", content="The"),
+        ModelResponseChunk(message="msg_reply", content=" answer"),
+        ModelResponseChunk(message="msg_other_reply", content="Other"),
+    ]
+
+
+def test_sends_held_deltas_once_the_window_passes():
+    clock = FakeTimer()
+
+    def stream() -> Iterable[Chunk]:
+        for index in range(10):
+            clock.now = index * 0.005
+            yield ModelResponseChunk(message="msg_reply", content=str(index))
+
+    chunks = coalesce(stream(), clock)
+
+    assert [chunk.content for chunk in chunks if isinstance(chunk, ModelResponseChunk)] == ["0", "1234", "5678", "9"]
+
+
+def test_sends_held_deltas_once_they_reach_max_bytes():
+    chunks = coalesce([ModelResponseChunk(message="msg_reply", content="ab") for _ in range(6)], max_bytes=4)
+
+    assert [chunk.content for chunk in chunks if isinstance(chunk, ModelResponseChunk)] == ["ab", "abab", "abab", "ab"]
+
+
+def test_sends_held_deltas_before_an_error():
+    def stream() -> Iterable[Chunk]:
+        yield ModelResponseChunk(message="msg_reply", content="Hello")
+        yield ModelResponseChunk(message="msg_reply", content=" world")
+        msg = "model went away"
+        raise RuntimeError(msg)
+
+    chunks: list[Chunk] = []
+    with pytest.raises(RuntimeError, match="model went away"):
+        chunks.extend(coalesce_chunks(stream(), max_delay_seconds=0.02, max_bytes=256, clock=FakeTimer()))
+
+    assert chunks == [
+        ModelResponseChunk(message="msg_reply", content="Hello"),
+        ModelResponseChunk(message="msg_reply", content=" world"),
+    ]
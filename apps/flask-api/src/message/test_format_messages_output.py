@@ -0,0 +1,135 @@
+import json
+from collections.abc import Generator
+from datetime import UTC, datetime
+
+import pytest
+from sqlalchemy.orm.attributes import set_committed_value
+
+from db.models.message import Message
+from db.models.tool_definitions import ToolSource
+from src.config.Config import StreamCoalescing
+from src.message.format_messages_output import format_message, format_messages
+from src.message.message_chunk import (
+    Chunk,
+    ErrorChunk,
+    ErrorCode,
+    ModelResponseChunk,
+    StreamEndChunk,
+    StreamMode,
+    StreamStartChunk,
+    ThinkingChunk,
+    ToolCallChunk,
+)
+from src.thread.thread_models import Thread
+from src.util import CustomEncoder
+
+
+def create_message(message_id: str, parent: Message | None, *, final: bool = True) -> Message:
+    message = Message(
+        id=message_id,
+        content=message_id,
+        creator="creator",
+        role="user",
+        opts={},
+        root=parent.root if parent is not None else message_id,
+        model_id="model_id",
+        model_host="model_host",
+        parent=parent.id if parent is not None else None,
+        final=final,
+        expiration_time=None,
+    )
+    message.created = datetime.now(UTC)
+    set_committed_value(message, "children", [])
+    set_committed_value(message, "labels", [])
+
+    if parent is not None:
+        set_committed_value(parent, "children", [*(parent.children or []), message])
+
+    return message
+
+
+def stream_thread() -> Generator[Message | StreamEndChunk]:
+    root = create_message("msg_root", None)
+    user_message = create_message("msg_user", root)
+    reply = create_message("msg_reply", user_message, final=False)
+    yield root
+
+    # Nothing changed
+    yield root
+
+    reply.content = "The reply"
+    reply.final = True
+    yield root
+
+    create_message("msg_tool_response", reply)
+    yield root
+
+    yield StreamEndChunk(message=root.id)
+
+
+def test_streams_the_whole_thread_each_time_by_default():
+    lines = [json.loads(line) for line in format_messages(stream_thread())]
+
+    assert [len(line["messages"]) for line in lines[:-1]] == [3, 3, 3, 4]
+
+
+def test_streams_only_changed_messages_in_delta_mode():
+    lines = [json.loads(line) for line in format_messages(stream_thread(), stream_mode=StreamMode.DELTA)]
+
+    assert [message["id"] for message in lines[0]["messages"]] == ["msg_root", "msg_user", "msg_reply"]
+
+    assert lines[1]["type"] == "threadPatch"
+    assert lines[1]["message"] == "msg_root"
+    assert [(message["id"], message["content"]) for message in lines[1]["messages"]] == [("msg_reply", "The reply")]
+
+    assert [(message["id"], message["children"]) for message in lines[2]["messages"]] == [
+        ("msg_reply", ["msg_tool_response"]),
+        ("msg_tool_response", []),
+    ]
+
+    assert lines[3]["type"] == "end"
+    assert len(lines) == 4
+
+
+def test_coalesces_model_response_deltas_when_enabled():
+    deltas = [ModelResponseChunk(message="msg_reply", content=f"{index} ") for index in range(10)]
+
+    lines = [json.loads(line) for line in format_messages(iter(deltas), coalescing=StreamCoalescing(enabled=True))]
+
+    assert [line["content"] for line in lines] == ["0 ", "1 2 3 4 5 6 7 8 9 "]
+    assert len(list(format_messages(iter(deltas), coalescing=StreamCoalescing()))) == 10, "coalescing is opt-in"
+
+
+@pytest.mark.parametrize(
+    "chunk",
+    [
+        StreamStartChunk(message="msg_reply"),
+        ModelResponseChunk(message="msg_reply", content='Ünïcode ✨ and "quotes"\n'),
+        ThinkingChunk(message="msg_reply", content="Hmm", id="thinking_1"),
+        ToolCallChunk(
+            message="msg_reply", tool_call_id="call_1", tool_name="search", args={"q": 1}, tool_source=ToolSource.MCP
+        ),
+        ErrorChunk(message="msg_reply", error_code=ErrorCode.TOOL_CALL_ERROR, error_description="Oops"),
+        StreamEndChunk(message="msg_reply"),
+    ],
+)
+def test_formats_chunks_the_same_as_the_json_encoder(chunk: Chunk):
+    line = format_message(chunk)
+
+    assert line.endswith(b"\n")
+    assert b"\n" not in line[:-1]
+    assert json.loads(line) == json.loads(json.dumps(chunk, cls=CustomEncoder))
+
+
+def test_formats_threads_the_same_as_the_json_encoder():
+    thread = Thread.from_message(next(stream_thread()))
+
+    formatted = json.loads(format_message(thread))
+    encoded = json.loads(json.dumps(thread, cls=CustomEncoder))
+
+    # Dates are written as ISO 8601 either way, but pydantic writes UTC as Z instead of +00:00
+    for formatted_message, encoded_message in zip(formatted["messages"], encoded["messages"], strict=True):
+        assert datetime.fromisoformat(formatted_message.pop("created")) == datetime.fromisoformat(
+            encoded_message.pop("created")
+        )
+    assert formatted == encoded
@@ -0,0 +1,111 @@
+from collections.abc import Iterator
+
+import pytest
+import redis
+from pytest_mock import MockerFixture
+
+from src.config.Config import SafetyVerdictCache as SafetyVerdictCacheConfig
+from src.config.get_config import get_config
+from src.message.create_message_service.safety import check_message_safety
+from src.message.safety_verdict_cache import (
+    REDIS_KEY_PREFIX,
+    SafetyVerdictCache,
+    get_safety_verdict_cache,
+    verdict_cache_key,
+)
+from src.message.SafetyChecker import SafetyCheckerType
+
+
+@pytest.fixture(autouse=True)
+def clear_verdict_cache() -> Iterator[None]:
+    get_safety_verdict_cache.cache_clear()
+    yield
+    get_safety_verdict_cache.cache_clear()
+
+
+@pytest.mark.usefixtures("flask_request_context")
+def test_identical_text_is_only_checked_once(mocker: MockerFixture):
+    moderate_text = mocker.patch("src.message.create_message_service.safety.GoogleModerateText")
+    moderate_text.model_version = "MODEL_VERSION_2"
+    moderate_text.return_value.check_request.return_value.is_safe.return_value = False
+
+    assert check_message_safety("Some unsafe text") is False
+    assert check_message_safety("  Some unsafe text\n") is False
+
+    moderate_text.return_value.check_request.assert_called_once()
+
+
+@pytest.mark.usefixtures("flask_request_context")
+def test_errors_are_not_cached(mocker: MockerFixture):
+    moderate_text = mocker.patch("src.message.create_message_service.safety.GoogleModerateText")
+    moderate_text.model_version = "MODEL_VERSION_2"
+    moderate_text.return_value.check_request.side_effect = [RuntimeError("unavailable"), mocker.DEFAULT]
+    moderate_text.return_value.check_request.return_value.is_safe.return_value = True
+
+    assert check_message_safety("Some text") is None
+    assert check_message_safety("Some text") is True
+
+
+@pytest.mark.usefixtures("flask_request_context")
+def test_wildguard_verdicts_are_cached_by_the_configured_model_version(
+    mocker: MockerFixture, monkeypatch: pytest.MonkeyPatch
+):
+    wildguard = mocker.patch("src.message.create_message_service.safety.WildGuard")
+    wildguard.return_value.check_request.return_value.is_safe.return_value = True
+
+    monkeypatch.setattr(get_config().wildguard, "model_version", None)
+    assert check_message_safety("Some text", checker_type=SafetyCheckerType.WildGuard) is True
+    assert check_message_safety("Some text", checker_type=SafetyCheckerType.WildGuard) is True
+    assert wildguard.return_value.check_request.call_count == 2
+
+    monkeypatch.setattr(get_config().wildguard, "model_version", "wildguard-1")
+    assert check_message_safety("Some text", checker_type=SafetyCheckerType.WildGuard) is True
+    assert check_message_safety("Some text", checker_type=SafetyCheckerType.WildGuard) is True
+    assert wildguard.return_value.check_request.call_count == 3
+
+    monkeypatch.setattr(get_config().wildguard, "model_version", "wildguard-2")
+    assert check_message_safety("Some text", checker_type=SafetyCheckerType.WildGuard) is True
+    assert wildguard.return_value.check_request.call_count == 4
+
+
+def test_key_changes_when_thresholds_change(monkeypatch: pytest.MonkeyPatch):
+    key = verdict_cache_key(SafetyCheckerType.GoogleLanguage, "MODEL_VERSION_2", "Some text")
+
+    monkeypatch.setattr(get_config().google_moderate_text, "default_confidence_threshold", 0.1)
+
+    assert verdict_cache_key(SafetyCheckerType.GoogleLanguage, "MODEL_VERSION_2", "Some text") != key
+
+
+def test_key_changes_with_checker_and_model_version():
+    keys = {
+        verdict_cache_key(SafetyCheckerType.GoogleLanguage, "MODEL_VERSION_2", "Some text"),
+        verdict_cache_key(SafetyCheckerType.GoogleLanguage, "MODEL_VERSION_3", "Some text"),
+        verdict_cache_key(SafetyCheckerType.WildGuard, "MODEL_VERSION_2", "Some text"),
+    }
+
+    assert len(keys) == 3
+
+
+@pytest.mark.usefixtures("flask_request_context")
+def test_reads_verdicts_from_redis(mocker: MockerFixture):
+    redis_client = mocker.Mock()
+    redis_client.get.return_value = b"0"
+    verdict_cache = SafetyVerdictCache(SafetyVerdictCacheConfig(use_redis=True), redis_client)
+
+    assert verdict_cache.get("key") is False
+    assert verdict_cache.get("key") is False
+
+    redis_client.get.assert_called_once_with(REDIS_KEY_PREFIX + "key")
+
+
+@pytest.mark.usefixtures("flask_request_context")
+def test_redis_errors_are_cache_misses(mocker: MockerFixture):
+    redis_client = mocker.Mock()
+    redis_client.get.side_effect = redis.ConnectionError
+    redis_client.set.side_effect = redis.ConnectionError
+    verdict_cache = SafetyVerdictCache(SafetyVerdictCacheConfig(use_redis=True), redis_client)
+
+    assert verdict_cache.get("key") is None
+
+    verdict_cache.set("key", True)
+    assert verdict_cache.get("key") is True
@@ -0,0 +1,114 @@
+import asyncio
+import socket
+import threading
+from collections.abc import AsyncIterator
+
+import pytest
+from pydantic_ai.messages import ModelMessage
+from pydantic_ai.models.function import AgentInfo, DeltaToolCalls, FunctionModel
+from werkzeug import exceptions
+
+from src.message.stream_cancellation import CancelReason, StreamCancellation, StreamCancellationRegistry
+from src.pydantic_inference.model_request_stream import model_request_stream_sync
+
+
+async def stalled_response(_messages: list[ModelMessage], _info: AgentInfo) -> AsyncIterator[str | DeltaToolCalls]:
+    yield "Murphy"
+    await asyncio.Event().wait()
+
+
+def test_cancel_stops_the_model_stream_being_read():
+    cancellation = StreamCancellation("creator")
+
+    with (
+        model_request_stream_sync(FunctionModel(stream_function=stalled_response), []) as stream,
+        cancellation.stopping(stream),
+    ):
+        threading.Timer(0.05, cancellation.cancel, args=(CancelReason.Requested,)).start()
+        events = list(stream)
+
+    assert cancellation.reason == CancelReason.Requested
+    assert len(events) > 0
+    assert stream.get().text == "Murphy"
+
+
+def test_a_stream_cancelled_before_it_starts_stops_right_away():
+    cancellation = StreamCancellation("creator")
+    cancellation.cancel(CancelReason.Requested)
+
+    with (
+        model_request_stream_sync(FunctionModel(stream_function=stalled_response), []) as stream,
+        cancellation.stopping(stream),
+    ):
+        list(stream)
+
+
+def test_cancel_only_counts_the_first_reason():
+    cancellation = StreamCancellation("creator")
+    cancellation.cancel(CancelReason.Requested)
+    cancellation.cancel(CancelReason.Disconnected)
+
+    assert cancellation.reason == CancelReason.Requested
+
+
+def test_cancels_when_the_client_disconnects():
+    server_socket, client_socket = socket.socketpair()
+    cancellation = StreamCancellation("creator")
+    try:
+        cancellation.cancel_on_disconnect(server_socket)
+        client_socket.close()
+
+        for _ in range(100):
+            if cancellation.cancelled:
+                break
+            threading.Event().wait(0.01)
+
+        assert cancellation.reason == CancelReason.Disconnected
+    finally:
+        cancellation.stop_watching()
+        server_socket.close()
+
+
+def test_doesnt_cancel_when_the_client_sends_more():
+    server_socket, client_socket = socket.socketpair()
+    cancellation = StreamCancellation("creator")
+    try:
+        cancellation.cancel_on_disconnect(server_socket)
+        client_socket.send(b"GET / HTTP/1.1\r\n")
+        threading.Event().wait(0.05)
+
+        assert not cancellation.cancelled
+        assert server_socket.recv(100) == b"GET / HTTP/1.1\r\n"
+    finally:
+        cancellation.stop_watching()
+        server_socket.close()
+        client_socket.close()
+
+
+def test_registry_cancels_the_owners_streams_by_any_of_their_ids():
+    registry = StreamCancellationRegistry(cancel_on_disconnect=False)
+    cancellation = registry.start("creator", "msg_thread", "msg_user")
+    registry.add(cancellation, "msg_reply")
+
+    with pytest.raises(exceptions.NotFound):
+        registry.cancel("msg_reply", user_id="someone else")
+    assert not cancellation.cancelled
+
+    registry.cancel("msg_reply", user_id="creator")
+    assert cancellation.reason == CancelReason.Requested
+
+
+def test_registry_forgets_finished_streams():
+    registry = StreamCancellationRegistry(cancel_on_disconnect=False)
+    first_stream = registry.start("creator", "msg_thread", "msg_first_user")
+    second_stream = registry.start("creator", "msg_thread", "msg_second_user")
+
+    registry.finish(first_stream)
+
+    with pytest.raises(exceptions.NotFound):
+        registry.cancel("msg_first_user", user_id="creator")
+
+    # The thread's id belongs to the newer stream
+    registry.cancel("msg_thread", user_id="creator")
+    assert second_stream.cancelled
+    assert not first_stream.cancelled
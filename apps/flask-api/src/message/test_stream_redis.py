@@ -0,0 +1,21 @@
+import redis
+from pytest_mock import MockerFixture
+
+from src.message.stream_redis import write_to_redis
+
+
+def test_writes_the_commands_in_one_pipeline(mocker: MockerFixture):
+    redis_client = mocker.Mock()
+    pipeline = redis_client.pipeline.return_value
+
+    write_to_redis(redis_client, lambda pipeline: pipeline.set("key", "value"), description="values")
+
+    pipeline.set.assert_called_once_with("key", "value")
+    pipeline.execute.assert_called_once_with()
+
+
+def test_redis_errors_are_ignored(mocker: MockerFixture):
+    redis_client = mocker.Mock()
+    redis_client.pipeline.return_value.execute.side_effect = redis.ConnectionError
+
+    write_to_redis(redis_client, lambda pipeline: pipeline.set("key", "value"), description="values")
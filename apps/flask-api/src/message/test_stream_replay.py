@@ -0,0 +1,211 @@
+import json
+import threading
+import time
+from collections.abc import Generator
+from datetime import UTC, datetime
+from io import BytesIO
+from unittest.mock import Mock
+
+import pytest
+from sqlalchemy.orm.attributes import set_committed_value
+from flask import Flask, request
+from werkzeug import exceptions
+
+from db.models.message import Message
+from src.config.Config import StreamReplay as StreamReplayConfig
+from src.message.message_chunk import ModelResponseChunk, StreamEndChunk
+from src.message.stream_replay import StreamInterruptedError, StreamReplayLog, StreamReplayRegistry
+
+
+def create_thread(thread_id: str) -> Message:
+    message = Message(
+        id=thread_id,
+        content="Write a poem about a labrador named Murphy",
+        creator="creator",
+        role="user",
+        opts={},
+        root=thread_id,
+        model_id="model_id",
+        model_host="model_host",
+        parent=None,
+        final=True,
+        expiration_time=None,
+    )
+    message.created = datetime.now(UTC)
+    set_committed_value(message, "children", [])
+    set_committed_value(message, "labels", [])
+
+    return message
+
+
+def test_log_replays_missed_lines_then_follows_the_stream():
+    log = StreamReplayLog("creator", max_lines=10, idle_timeout_seconds=5)
+    log.append(b"1\n")
+    log.append(b"2\n")
+
+    reader = log.read(after=1)
+    assert next(reader) == b"2\n"
+
+    writer = threading.Timer(0.05, lambda: (log.append(b"3\n"), log.finish()))
+    writer.start()
+
+    assert list(reader) == [b"3\n"]
+    writer.join()
+
+
+def test_log_only_keeps_the_last_lines():
+    log = StreamReplayLog("creator", max_lines=2, idle_timeout_seconds=5)
+    for line in [b"1\n", b"2\n", b"3\n"]:
+        log.append(line)
+    log.finish()
+
+    assert log.can_replay_after(1)
+    assert not log.can_replay_after(0)
+    assert list(log.read(after=1)) == [b"2\n", b"3\n"]
+    with pytest.raises(StreamInterruptedError):
+        list(log.read(after=0))
+
+
+def test_log_interrupts_readers_when_the_stream_fails_or_goes_quiet():
+    log = StreamReplayLog("creator", max_lines=10, idle_timeout_seconds=0.01)
+    log.append(b"1\n")
+
+    with pytest.raises(StreamInterruptedError, match="stopped writing"):
+        list(log.read())
+
+    log.finish(failed=True)
+    reader = log.read()
+    assert next(reader) == b"1\n"
+    with pytest.raises(StreamInterruptedError, match="failed"):
+        next(reader)
+
+
+@pytest.mark.usefixtures("flask_request_context")
+def test_stream_keeps_going_after_its_reader_leaves():
+    registry = StreamReplayRegistry(StreamReplayConfig(enabled=True))
+    reader_left = threading.Event()
+
+    def stream_thread() -> Generator[Message | ModelResponseChunk | StreamEndChunk]:
+        yield create_thread("msg_thread")
+        yield ModelResponseChunk(message="msg_reply", content="Murphy")
+        reader_left.wait(timeout=5)
+        yield ModelResponseChunk(message="msg_reply", content=" is a good dog")
+        yield StreamEndChunk(message="msg_reply")
+
+    lines = registry.start(stream_thread, owner="creator")
+    assert isinstance(lines, Generator)
+
+    assert json.loads(next(lines))["id"] == "msg_thread"
+    lines.close()
+    reader_left.set()
+
+    resumed_lines = [json.loads(line) for line in registry.open("msg_thread", user_id="creator", after=2)]
+    assert resumed_lines == [
+        {"message": "msg_reply", "content": " is a good dog", "type": "modelResponse"},
+        {"message": "msg_reply", "type": "end"},
+    ]
+
+
+@pytest.mark.usefixtures("flask_request_context")
+def test_open_only_finds_the_owners_streams():
+    registry = StreamReplayRegistry(StreamReplayConfig(enabled=True))
+    list(registry.start(lambda: (item for item in [create_thread("msg_thread")]), owner="creator"))
+
+    with pytest.raises(exceptions.NotFound):
+        registry.open("msg_thread", user_id="someone else", after=0)
+
+    with pytest.raises(exceptions.NotFound):
+        registry.open("msg_other_thread", user_id="creator", after=0)
+
+
+@pytest.mark.usefixtures("flask_request_context")
+def test_start_passes_on_anything_that_isnt_a_stream():
+    registry = StreamReplayRegistry(StreamReplayConfig(enabled=True))
+
+    assert registry.start(lambda: {"id": "msg_assistant"}, owner="creator") == {"id": "msg_assistant"}
+
+    def fail() -> None:
+        raise exceptions.BadRequest
+
+    with pytest.raises(exceptions.BadRequest):
+        registry.start(fail, owner="creator")
+
+
+@pytest.mark.usefixtures("flask_request_context")
+def test_streams_beyond_the_limit_wait_for_a_thread():
+    registry = StreamReplayRegistry(StreamReplayConfig(enabled=True, max_concurrent_streams=1))
+    first_stream_finished = threading.Event()
+
+    def first_stream() -> Generator[Message]:
+        yield create_thread("msg_first_thread")
+        time.sleep(0.1)
+        first_stream_finished.set()
+
+    def second_stream() -> Generator[Message]:
+        assert first_stream_finished.is_set()
+        yield create_thread("msg_second_thread")
+
+    first_lines = registry.start(first_stream, owner="creator")
+    second_lines = registry.start(second_stream, owner="creator")
+    assert isinstance(first_lines, Generator)
+    assert isinstance(second_lines, Generator)
+
+    assert [json.loads(line)["id"] for line in second_lines] == ["msg_second_thread"]
+    list(first_lines)
+
+
+@pytest.mark.usefixtures("flask_request_context")
+def test_a_replaced_stream_stops_writing_to_the_threads_lines_in_redis():
+    redis_client = Mock()
+    pipeline = redis_client.pipeline.return_value
+    registry = StreamReplayRegistry(StreamReplayConfig(enabled=True, use_redis=True), redis_client)
+    first_reply_written = threading.Event()
+    second_stream_started = threading.Event()
+
+    def first_stream() -> Generator[Message | ModelResponseChunk | StreamEndChunk]:
+        yield create_thread("msg_thread")
+        yield ModelResponseChunk(message="msg_first_reply", content="Murphy")
+        first_reply_written.set()
+        second_stream_started.wait(timeout=5)
+        yield ModelResponseChunk(message="msg_first_reply", content=" is a good dog")
+        yield StreamEndChunk(message="msg_first_reply")
+
+    def second_stream() -> Generator[Message]:
+        yield create_thread("msg_thread")
+
+    first_lines = registry.start(first_stream, owner="creator")
+    assert isinstance(first_lines, Generator)
+    first_reply_written.wait(timeout=5)
+
+    second_lines = registry.start(second_stream, owner="creator")
+    assert isinstance(second_lines, Generator)
+    list(second_lines)
+
+    pipeline.reset_mock()
+    second_stream_started.set()
+    list(first_lines)
+
+    pipeline.xadd.assert_not_called()
+    assert [json.loads(line)["id"] for line in registry.open("msg_thread", user_id="creator", after=0)] == [
+        "msg_thread"
+    ]
+
+
+def test_stream_reads_uploaded_files_after_the_request_ends():
+    registry = StreamReplayRegistry(StreamReplayConfig(enabled=True))
+    app = Flask(__name__)
+    request_ended = threading.Event()
+
+    def read_upload() -> Generator[Message]:
+        file = request.files["files"]
+        yield create_thread("msg_thread")
+        request_ended.wait(timeout=5)
+        yield create_thread(file.stream.read().decode())
+
+    with app.test_request_context("/", method="POST", data={"files": (BytesIO(b"msg_upload"), "upload.txt")}):
+        lines = registry.start(read_upload, owner="creator")
+        assert isinstance(lines, Generator)
+        assert json.loads(next(lines))["id"] == "msg_thread"
+
+    request_ended.set()
+    assert [json.loads(line)["id"] for line in lines] == ["msg_upload"]
@@ -48,6 +48,7 @@ class BaseModelConfigRequest(APIInterface):
     deprecation_time: AwareDatetime | None = Field(default=None)
     can_call_tools: bool = Field(default=False)
     can_think: bool = Field(default=False)
+    speculative_inference: bool = Field(default=False)
     infini_gram_index: AvailableInfiniGramIndexId | None = Field(default=None)
 
     temperature_default: float | None = None
@@ -5,7 +5,6 @@ from sqlalchemy import select
 from sqlalchemy.orm import Session, selectin_polymorphic, sessionmaker
 
 from db.models.model_config import (
-    FilesOnlyModelConfig,
     ModelConfig,
     MultiModalModelConfig,
 )
@@ -15,6 +14,7 @@ from src.config.Model import (
     ModelValidationContext,
     MultiModalModel,
 )
+from src.model_config.model_catalog import get_model_catalog
 from src.model_config.response_model import ResponseModel
 from src.tools.tools_service import get_available_tools
 
@@ -23,31 +23,31 @@ class ModelResponse(RootModel):
     root: list[Annotated[(Model | MultiModalModel), Field(discriminator="prompt_type")]]
 
 
-def get_model_configs(session_maker: sessionmaker[Session], *, include_internal_models: bool = False) -> ModelResponse:
-    with session_maker.begin() as session:
-        polymorphic_loader_opt = selectin_polymorphic(
-            ModelConfig, [ModelConfig, MultiModalModelConfig, FilesOnlyModelConfig]
-        )
-
-        stmt = select(ModelConfig).options(polymorphic_loader_opt).order_by(ModelConfig.order.asc())
+available_tool_list_type_adapter = TypeAdapter(list[AvailableTool])
 
-        if not include_internal_models:
-            stmt = stmt.filter_by(internal=False)
 
-        results = session.scalars(stmt).all()
+def get_model_configs(session_maker: sessionmaker[Session], *, include_internal_models: bool = False) -> ModelResponse:
+    snapshot = get_model_catalog().get_snapshot(session_maker)
 
+    # The mapped models only change when the catalog does, so they're built once per snapshot
+    cache_key = ("model_response", include_internal_models)
+    mapped_models = snapshot.derived.get(cache_key)
+    if not isinstance(mapped_models, ModelResponse):
+        results = [model for model in snapshot.models if include_internal_models or not model.internal]
         model_validation_context = ModelValidationContext(should_show_internal_models=include_internal_models)
 
         mapped_models = ModelResponse.model_validate(results, from_attributes=True, context=model_validation_context)
-
-        # Mutating the mapped models list here, would love to have a more elegant way of doing this
-        available_tool_list_type_adapter = TypeAdapter(list[AvailableTool])
-        for mapped_model in mapped_models.root:
-            mapped_model.available_tools = available_tool_list_type_adapter.validate_python(
-                get_available_tools(mapped_model)
-            )
-
-        return mapped_models
+        snapshot.derived[cache_key] = mapped_models
+
+    # Available tools can change without the models changing, so they're added to a copy for every request
+    return ModelResponse([
+        mapped_model.model_copy(
+            update={
+                "available_tools": available_tool_list_type_adapter.validate_python(get_available_tools(mapped_model))
+            }
+        )
+        for mapped_model in mapped_models.root
+    ])
 
 
 class AdminModelResponse(RootModel):
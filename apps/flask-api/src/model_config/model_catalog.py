@@ -0,0 +1,141 @@
+import logging
+import os
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from functools import cache
+from time import monotonic
+
+import psycopg
+from sqlalchemy import select
+from sqlalchemy.orm import Session, selectin_polymorphic
+
+from db.models.model_config import FilesOnlyModelConfig, ModelConfig, MultiModalModelConfig
+from src.config.get_config import get_config
+from src.otel.default_tracer import get_default_tracer
+
+# Set up in the model_config triggers. Postgres sends a notification on this channel when a change to either
+# model config table commits, no matter which app made it
+MODEL_CONFIG_CHANGED_CHANNEL = "model_config_changed"
+LISTENER_RECONNECT_SECONDS = 5
+
+tracer = get_default_tracer()
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ModelCatalogSnapshot:
+    version: int
+    loaded_at: float
+    models: list[ModelConfig]
+    models_by_id: dict[str, ModelConfig] = field(init=False)
+    # Anything derived from the models that's expensive to build can be kept here so it's rebuilt with them
+    derived: dict[object, object] = field(default_factory=dict)
+
+    def __post_init__(self) -> None:
+        self.models_by_id = {model.id: model for model in self.models}
+
+
+@tracer.start_as_current_span("load_model_configs")
+def load_model_configs(session: Session) -> list[ModelConfig]:
+    polymorphic_loader_opt = selectin_polymorphic(
+        ModelConfig, [ModelConfig, MultiModalModelConfig, FilesOnlyModelConfig]
+    )
+    stmt = select(ModelConfig).options(polymorphic_loader_opt).order_by(ModelConfig.order.asc())
+
+    return list(session.scalars(stmt).all())
+
+
+class ModelCatalog:
+    """
+    An in-process copy of every model config, so looking a model up doesn't need a database query.
+
+    The catalog is reloaded after Postgres notifies the worker that a model config changed, and also once it's older
+    than max_age_seconds in case a notification was missed while the listener was reconnecting.
+
+    The model configs are loaded in their own session and detached from it, and are shared between requests. Treat them
+    as read-only.
+    """
+
+    def __init__(self, conninfo: str | None, max_age_seconds: float, timer: Callable[[], float] = monotonic):
+        self._conninfo = conninfo
+        self._max_age_seconds = max_age_seconds
+        self._timer = timer
+        self._version = 0
+        self._snapshot: ModelCatalogSnapshot | None = None
+        self._lock = threading.Lock()
+        self._listener: threading.Thread | None = None
+
+        # Threads don't survive a fork, so a forked worker needs to start its own listener
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self) -> None:
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._listener = None
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._version += 1
+
+    def get_snapshot(self, create_session: Callable[[], Session]) -> ModelCatalogSnapshot:
+        self._start_listening()
+
+        snapshot = self._snapshot
+        if (
+            snapshot is not None
+            and snapshot.version == self._version
+            and self._timer() - snapshot.loaded_at < self._max_age_seconds
+        ):
+            return snapshot
+
+        # Read the version before loading so a change that lands during the load causes another one
+        version = self._version
+        with create_session() as session:
+            models = load_model_configs(session)
+
+        snapshot = ModelCatalogSnapshot(version=version, loaded_at=self._timer(), models=models)
+        self._snapshot = snapshot
+
+        return snapshot
+
+    def get_model(self, create_session: Callable[[], Session], model_id: str) -> ModelConfig | None:
+        return self.get_snapshot(create_session).models_by_id.get(model_id)
+
+    def _start_listening(self) -> None:
+        if self._conninfo is None or self._listener is not None:
+            return
+
+        with self._lock:
+            if self._listener is None:
+                listener = threading.Thread(
+                    target=self._listen, args=(self._conninfo,), name="model-catalog-listener", daemon=True
+                )
+                listener.start()
+                self._listener = listener
+
+    def _listen(self, conninfo: str) -> None:
+        while True:
+            try:
+                with psycopg.connect(conninfo, autocommit=True) as connection:
+                    connection.execute(f"LISTEN {MODEL_CONFIG_CHANGED_CHANNEL}")
+                    # Changes could have been missed while this wasn't listening
+                    self.invalidate()
+
+                    for _notification in connection.notifies():
+                        self.invalidate()
+            except psycopg.Error:
+                logger.warning("Lost connection listening for model config changes, reconnecting", exc_info=True)
+
+            time.sleep(LISTENER_RECONNECT_SECONDS)
+
+
+@cache
+def get_model_catalog() -> ModelCatalog:
+    config = get_config()
+
+    return ModelCatalog(
+        conninfo=config.db.conninfo if config.model_catalog.listen_for_changes else None,
+        max_age_seconds=config.model_catalog.max_age_seconds,
+    )
@@ -18,6 +18,7 @@ from src.model_config.get_model_config_service import (
     AdminModelResponse,
     get_model_configs_admin,
 )
+from src.model_config.model_catalog import get_model_catalog
 from src.model_config.reorder_model_config_service import (
     ReorderModelConfigRequest,
     reorder_model_config,
@@ -50,6 +51,8 @@ def create_model_config_admin_blueprint(session_maker: sessionmaker[Session]) ->
     )
     def add_model(request: RootCreateModelConfigRequest) -> ResponseModel:
         new_model = create_model_config(request, session_maker)
+        # Other workers find out about the change from Postgres, this one shouldn't have to wait for that
+        get_model_catalog().invalidate()
         token = required_auth_protector.acquire_token()
         current_app.logger.info({
             "event": "model_config.create",
@@ -71,6 +74,7 @@ def create_model_config_admin_blueprint(session_maker: sessionmaker[Session]) ->
         token = required_auth_protector.acquire_token()
         try:
             delete_model_config(model_id, session_maker)
+            get_model_catalog().invalidate()
             current_app.logger.info({
                 "event": "model_config.delete",
                 "user": token.sub,
@@ -93,6 +97,7 @@ def create_model_config_admin_blueprint(session_maker: sessionmaker[Session]) ->
         token = required_auth_protector.acquire_token()
         try:
             reorder_model_config(request, session_maker)
+            get_model_catalog().invalidate()
             current_app.logger.info({
                 "event": "model_config.reorder",
                 "user": token.sub,
@@ -116,6 +121,7 @@ def create_model_config_admin_blueprint(session_maker: sessionmaker[Session]) ->
     ) -> ResponseModel:
         token = required_auth_protector.acquire_token()
         updated_model = update_model_config(model_id, request, session_maker)
+        get_model_catalog().invalidate()
 
         if updated_model is None:
             not_found_message = f"No model found with ID {model_id}"
@@ -0,0 +1,98 @@
+import time
+from collections.abc import Callable
+
+from psycopg import Connection
+from sqlalchemy import event, update
+from sqlalchemy.orm import Session
+
+from db.models.model_config import ModelConfig
+from src.model_config.model_catalog import ModelCatalog
+from src.util.fake_timer import FakeTimer
+
+MODEL_ID = "cs-OLMo-2-0325-32B-Instruct"
+
+
+def create_session_factory(sql_alchemy: Session) -> Callable[[], Session]:
+    return lambda: Session(sql_alchemy.get_bind())
+
+
+def rename_model(sql_alchemy: Session, name: str) -> None:
+    sql_alchemy.execute(update(ModelConfig).where(ModelConfig.id == MODEL_ID).values(name=name))
+    sql_alchemy.commit()
+
+
+def test_looks_up_models_without_querying_again(sql_alchemy: Session):
+    model_catalog = ModelCatalog(conninfo=None, max_age_seconds=60)
+    create_session = create_session_factory(sql_alchemy)
+
+    model = model_catalog.get_model(create_session, MODEL_ID)
+    assert model is not None
+    assert model.name == "OLMo 2 32B Instruct"
+
+    statement_count = 0
+
+    def count_statement(*_args):
+        nonlocal statement_count
+        statement_count += 1
+
+    event.listen(sql_alchemy.get_bind(), "before_cursor_execute", count_statement)
+    try:
+        assert model_catalog.get_model(create_session, MODEL_ID) is model
+        assert model_catalog.get_model(create_session, "not-a-model") is None
+    finally:
+        event.remove(sql_alchemy.get_bind(), "before_cursor_execute", count_statement)
+
+    assert statement_count == 0
+
+
+def test_reloads_when_invalidated(sql_alchemy: Session):
+    model_catalog = ModelCatalog(conninfo=None, max_age_seconds=60)
+    create_session = create_session_factory(sql_alchemy)
+    model_catalog.get_snapshot(create_session)
+
+    rename_model(sql_alchemy, "Renamed model")
+    model = model_catalog.get_model(create_session, MODEL_ID)
+    assert model is not None
+    assert model.name == "OLMo 2 32B Instruct", "the catalog shouldn't reload until it's invalidated"
+
+    model_catalog.invalidate()
+    model = model_catalog.get_model(create_session, MODEL_ID)
+    assert model is not None
+    assert model.name == "Renamed model"
+
+
+def test_reloads_after_max_age(sql_alchemy: Session):
+    timer = FakeTimer()
+    model_catalog = ModelCatalog(conninfo=None, max_age_seconds=60, timer=timer)
+    create_session = create_session_factory(sql_alchemy)
+    first_snapshot = model_catalog.get_snapshot(create_session)
+
+    timer.now = 59
+    assert model_catalog.get_snapshot(create_session) is first_snapshot
+
+    timer.now = 60
+    assert model_catalog.get_snapshot(create_session) is not first_snapshot
+
+
+def test_reloads_when_postgres_notifies_of_a_change(sql_alchemy: Session, postgresql: Connection):
+    conninfo = (
+        f"postgresql://{postgresql.info.user}:@{postgresql.info.host}:{postgresql.info.port}/{postgresql.info.dbname}"
+    )
+    model_catalog = ModelCatalog(conninfo=conninfo, max_age_seconds=60)
+    create_session = create_session_factory(sql_alchemy)
+
+    # The listener invalidates the catalog once it's connected, so wait for that before making a change
+    first_snapshot = model_catalog.get_snapshot(create_session)
+    deadline = time.monotonic() + 5
+    while model_catalog.get_snapshot(create_session) is first_snapshot and time.monotonic() < deadline:
+        time.sleep(0.05)
+
+    rename_model(sql_alchemy, "Renamed model")
+
+    model = model_catalog.get_model(create_session, MODEL_ID)
+    while model is not None and model.name != "Renamed model" and time.monotonic() < deadline:
+        time.sleep(0.05)
+        model = model_catalog.get_model(create_session, MODEL_ID)
+
+    assert model is not None
+    assert model.name == "Renamed model"
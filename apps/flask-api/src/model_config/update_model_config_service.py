@@ -50,6 +50,7 @@ def update_model_config(
         model_to_update.prompt_type = request.root.prompt_type
         model_to_update.can_call_tools = request.root.can_call_tools
         model_to_update.can_think = request.root.can_think
+        model_to_update.speculative_inference = request.root.speculative_inference
         model_to_update.infini_gram_index = request.root.infini_gram_index
 
         if request.root.temperature_default is not None:
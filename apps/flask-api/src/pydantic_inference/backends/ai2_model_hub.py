@@ -3,6 +3,7 @@ from pydantic_ai.providers.openai import OpenAIProvider
 
 from db.models.model_config import ModelConfig
 from src.config.get_config import get_config
+from src.pydantic_inference.http_client import get_inference_http_client
 from src.pydantic_inference.models.open_ai_chat_model_video import OpenAIChatModelVideo
 
 
@@ -14,5 +15,6 @@ def get_ai2_model_hub_model(model_config: ModelConfig) -> Model:
         provider=OpenAIProvider(
             base_url=f"{cfg.ai2_model_hub.base_url}",
             api_key=cfg.ai2_model_hub.api_key.get_secret_value(),
+            http_client=get_inference_http_client(),
         ),
     )
@@ -1,11 +1,14 @@
+import asyncio
 import base64
-from collections.abc import AsyncIterable, AsyncIterator
-from contextlib import asynccontextmanager
+import threading
+from collections.abc import AsyncGenerator, AsyncIterable, AsyncIterator, Generator, Iterable
+from contextlib import aclosing, asynccontextmanager
 from dataclasses import dataclass, field
 from datetime import UTC, datetime
 from typing import Any, assert_never, cast
 
-from beaker import Beaker
+from beaker import Beaker, BeakerQueue
+from beaker.beaker_pb2 import CreateQueueEntryResponse
 from beaker.config import Config as BeakerConfig
 from google.protobuf import json_format
 from openai.types.chat import ChatCompletionChunk
@@ -48,11 +51,52 @@ def get_beaker_queues_model(model_config: ModelConfig) -> Model:
     return BeakerQueuesModel(model_config=model_config)
 
 
+async def read_entry_responses(
+    entry: Iterable[CreateQueueEntryResponse],
+) -> AsyncGenerator[CreateQueueEntryResponse]:
+    """
+    Reads a queue entry's responses on their own thread. Waiting for them on the event loop would hold up every other
+    request running on it, and a cancelled request wouldn't stop until its entry's next response.
+
+    If the reader stops early, the entry's stream is only closed once its next response arrives, because the thread
+    can't close it while it's waiting. Closing it drops the client's gRPC call. That doesn't cancel the entry in
+    Beaker: the SDK has no call for that. An entry still waiting in the queue is left to be picked up by a worker.
+    """
+    loop = asyncio.get_running_loop()
+    responses: asyncio.Queue[CreateQueueEntryResponse | Exception | None] = asyncio.Queue()
+    stopped = threading.Event()
+
+    def read() -> None:
+        try:
+            for response in entry:
+                loop.call_soon_threadsafe(responses.put_nowait, response)
+                if stopped.is_set():
+                    break
+        except Exception as e:  # noqa: BLE001
+            loop.call_soon_threadsafe(responses.put_nowait, e)
+        finally:
+            # Closing the entry's generator lets go of its gRPC call, which cancels it
+            if isinstance(entry, Generator):
+                entry.close()
+            loop.call_soon_threadsafe(responses.put_nowait, None)
+
+    threading.Thread(target=read, name="beaker-queue-entry", daemon=True).start()
+
+    try:
+        while (response := await responses.get()) is not None:
+            if isinstance(response, Exception):
+                raise response
+            yield response
+    finally:
+        stopped.set()
+
+
 @dataclass(init=False)
 class BeakerQueuesModel(Model):
     """Beaker Queues Model for Pydantic AI."""
 
     beaker_client: Beaker
+    _queue: BeakerQueue | None
     _model_profile: ModelProfile
     _model_name: str = field(init=False)
     _system: str = field(default="ai2", init=False)
@@ -66,6 +110,7 @@ class BeakerQueuesModel(Model):
         self._model_name = model_config.model_id_on_host
         self._model_profile = ModelProfile(supports_tools=model_config.can_call_tools)
         self.beaker_client = Beaker(beaker_config)
+        self._queue = None
 
     @property
     def model_name(self) -> str:
@@ -121,7 +166,7 @@ class BeakerQueuesModel(Model):
 
         new_messages = self._map_messages(messages)
 
-        q = self.beaker_client.queue.get(self._model_name)
+        q = self._get_queue()
 
         queue_input = {
             "model": q.id,
@@ -133,22 +178,30 @@ class BeakerQueuesModel(Model):
 
         entry = self.beaker_client.queue.create_entry(q, input=queue_input, expires_in_sec=EXPIRES_IN)
 
-        for resp in entry:
-            if resp.HasField("pending_entry"):
-                # TODO: handle this
-                continue
-            elif resp.HasField("result"):
-                result = json_format.MessageToDict(resp.result)
-                yield ChatCompletionChunk(
-                    id=result["id"],
-                    choices=result["choices"],
-                    created=result["created"],
-                    model=result["model"],
-                    object=result["object"],
-                )
-            elif resp.HasField("finalized_entry"):
-                # TODO: maybe handle this?
-                continue
+        async with aclosing(read_entry_responses(entry)) as responses:
+            async for resp in responses:
+                if resp.HasField("pending_entry"):
+                    # TODO: handle this
+                    continue
+                elif resp.HasField("result"):
+                    result = json_format.MessageToDict(resp.result)
+                    yield ChatCompletionChunk(
+                        id=result["id"],
+                        choices=result["choices"],
+                        created=result["created"],
+                        model=result["model"],
+                        object=result["object"],
+                    )
+                elif resp.HasField("finalized_entry"):
+                    # TODO: maybe handle this?
+                    continue
+
+    def _get_queue(self) -> BeakerQueue:
+        # The queue is looked up once per model instead of on every request
+        if self._queue is None:
+            self._queue = self.beaker_client.queue.get(self._model_name)
+
+        return self._queue
 
     def _map_messages(self, model_messages: list[ModelMessage]) -> list[dict]:
         messages: list[dict] = []
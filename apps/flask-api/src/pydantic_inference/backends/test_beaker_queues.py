@@ -0,0 +1,47 @@
+import threading
+from collections.abc import Generator
+from contextlib import aclosing
+
+import pytest
+from beaker.beaker_pb2 import CreateQueueEntryResponse, QueueEntry
+
+from src.pydantic_inference.backends.beaker_queues import read_entry_responses
+from src.util.background_event_loop import background_event_loop
+
+
+def test_read_entry_responses_closes_the_entry_once_the_reader_stops():
+    entry_closed = threading.Event()
+    worker_replied = threading.Event()
+
+    def entry() -> Generator[CreateQueueEntryResponse]:
+        try:
+            yield CreateQueueEntryResponse(pending_entry=QueueEntry(id="entry_1"))
+            worker_replied.wait(timeout=5)
+            yield CreateQueueEntryResponse(finalized_entry=QueueEntry(id="entry_1"))
+        finally:
+            entry_closed.set()
+
+    async def read_first_response() -> CreateQueueEntryResponse:
+        async with aclosing(read_entry_responses(entry())) as responses:
+            return await anext(responses)
+
+    first_response = background_event_loop.run(read_first_response(), timeout=5)
+
+    assert first_response.pending_entry.id == "entry_1"
+
+    # The entry can only be closed once it's done waiting on the worker
+    worker_replied.set()
+    assert entry_closed.wait(timeout=5)
+
+
+def test_read_entry_responses_passes_on_errors():
+    def entry() -> Generator[CreateQueueEntryResponse]:
+        yield CreateQueueEntryResponse(pending_entry=QueueEntry(id="entry_1"))
+        msg = "queue went away"
+        raise RuntimeError(msg)
+
+    async def read_all_responses() -> list[CreateQueueEntryResponse]:
+        return [response async for response in read_entry_responses(entry())]
+
+    with pytest.raises(RuntimeError, match="queue went away"):
+        background_event_loop.run(read_all_responses(), timeout=5)
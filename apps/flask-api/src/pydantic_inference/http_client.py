@@ -0,0 +1,29 @@
+import httpx
+from pydantic_ai.models import get_user_agent
+
+from src.config.get_config import get_config
+from src.util.client_registry import client_registry
+
+
+def create_inference_http_client() -> httpx.AsyncClient:
+    config = get_config().inference_http_client
+
+    return httpx.AsyncClient(
+        timeout=httpx.Timeout(timeout=config.timeout_seconds, connect=config.connect_timeout_seconds),
+        limits=httpx.Limits(
+            max_connections=config.max_connections,
+            max_keepalive_connections=config.max_keepalive_connections,
+            keepalive_expiry=config.keepalive_expiry_seconds,
+        ),
+        headers={"User-Agent": get_user_agent()},
+    )
+
+
+def get_inference_http_client() -> httpx.AsyncClient:
+    """
+    The HTTP client OpenAI-compatible providers send inference requests through. Connections are kept alive between
+    requests, so steps after the first don't pay for a new connection and TLS handshake.
+
+    The client belongs to the worker's background event loop, which all inference runs on.
+    """
+    return client_registry.get("inference_http", create_inference_http_client)
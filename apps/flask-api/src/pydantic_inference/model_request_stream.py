@@ -0,0 +1,95 @@
+from collections.abc import AsyncIterator, Generator, Sequence
+from contextlib import AbstractAsyncContextManager
+from types import TracebackType
+
+from pydantic_ai.agent import InstrumentationSettings
+from pydantic_ai.direct import model_request_stream
+from pydantic_ai.messages import ModelMessage, ModelResponse, ModelResponseStreamEvent
+from pydantic_ai.models import Model, ModelRequestParameters, StreamedResponse
+from pydantic_ai.settings import ModelSettings
+
+from src.util.background_event_loop import BackgroundIterator, background_event_loop
+
+
+class ModelRequestStream:
+    """
+    Sync wrapper around a pydantic-ai streamed model request, driven on the worker's background event loop.
+
+    This has the same interface as pydantic-ai's StreamedResponseSync, but doesn't start a new thread and event loop
+    for every request. Leaving the context early cancels the request instead of waiting for the model to finish.
+
+    The request is sent as soon as the stream is started, and events are buffered until they're read. start() can be
+    called before entering the context to get the model going while other work happens.
+    """
+
+    def __init__(self, async_stream_cm: AbstractAsyncContextManager[StreamedResponse]):
+        self._async_stream_cm = async_stream_cm
+        self._stream_response: StreamedResponse | None = None
+        self._events: BackgroundIterator[ModelResponseStreamEvent] | None = None
+
+    async def _consume_async_stream(self) -> AsyncIterator[ModelResponseStreamEvent]:
+        async with self._async_stream_cm as stream:
+            self._stream_response = stream
+            async for event in stream:
+                yield event
+
+    def start(self) -> "ModelRequestStream":
+        if self._events is None:
+            self._events = background_event_loop.start_iterating(self._consume_async_stream())
+
+        return self
+
+    def close(self) -> None:
+        """Cancels the request if it's still running. Can be called from any thread to stop the stream early."""
+        if self._events is not None:
+            self._events.close()
+
+    def __enter__(self) -> "ModelRequestStream":
+        return self.start()
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_val: BaseException | None,
+        exc_tb: TracebackType | None,
+    ) -> None:
+        self.close()
+
+    def __iter__(self) -> Generator[ModelResponseStreamEvent]:
+        if self._events is None:
+            msg = "ModelRequestStream must be used as a context manager"
+            raise RuntimeError(msg)
+
+        yield from self._events
+
+    @property
+    def has_response(self) -> bool:
+        """Whether the model has started responding, so there's something to get()."""
+        return self._stream_response is not None
+
+    def get(self) -> ModelResponse:
+        """Build a ModelResponse from the data received from the stream so far."""
+        if self._stream_response is None:
+            msg = "Stream has not started"
+            raise RuntimeError(msg)
+
+        return self._stream_response.get()
+
+
+def model_request_stream_sync(
+    model: Model,
+    messages: Sequence[ModelMessage],
+    *,
+    model_settings: ModelSettings | None = None,
+    model_request_parameters: ModelRequestParameters | None = None,
+    instrument: InstrumentationSettings | bool | None = None,
+) -> ModelRequestStream:
+    return ModelRequestStream(
+        model_request_stream(
+            model=model,
+            messages=list(messages),
+            model_settings=model_settings,
+            model_request_parameters=model_request_parameters,
+            instrument=instrument,
+        )
+    )
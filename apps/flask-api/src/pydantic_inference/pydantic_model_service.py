@@ -1,6 +1,7 @@
 from pydantic_ai.models import Model
 
 from db.models.model_config import ModelConfig, ModelHost
+from src.util.client_registry import client_registry
 
 from .backends.ai2_model_hub import get_ai2_model_hub_model
 from .backends.beaker_queues import get_beaker_queues_model
@@ -11,6 +12,20 @@ from .backends.pydantic_ai_test import get_test_model
 
 
 def get_pydantic_model(model: ModelConfig) -> Model:
+    """
+    Returns the pydantic-ai model for this config, shared by every request the worker handles for it. Providers hold
+    on to their clients and connections, so only the first request for a model pays to set them up.
+
+    The model is rebuilt when its config row is updated.
+    """
+    return client_registry.get(
+        f"pydantic_model.{model.id}",
+        lambda: create_pydantic_model(model),
+        version=(model.host, model.model_id_on_host, model.can_call_tools, model.updated_time),
+    )
+
+
+def create_pydantic_model(model: ModelConfig) -> Model:
     match model.host:
         case ModelHost.Cirrascale:
             return get_cirrascale_model(model)
@@ -0,0 +1,59 @@
+from datetime import UTC, datetime
+
+from db.models.model_config import ModelConfig, ModelHost, ModelType, PromptType
+from src.pydantic_inference.models.open_ai_chat_model_video import OpenAIChatModelVideo
+from src.pydantic_inference.pydantic_model_service import get_pydantic_model
+
+
+def create_model_config(model_id: str, model_id_on_host: str = "https://modal.example.com/v1") -> ModelConfig:
+    return ModelConfig(
+        id=model_id,
+        host=ModelHost.ModalOpenAI,
+        name="Test model",
+        description="Test model",
+        model_type=ModelType.Chat,
+        model_id_on_host=model_id_on_host,
+        internal=True,
+        prompt_type=PromptType.TEXT_ONLY,
+        temperature_default=0,
+        temperature_lower=0,
+        temperature_upper=1.0,
+        temperature_step=0.1,
+        top_p_default=0,
+        top_p_lower=0,
+        top_p_upper=0,
+        top_p_step=0,
+        max_tokens_default=2048,
+        max_tokens_lower=0,
+        max_tokens_step=1,
+        max_tokens_upper=2048,
+    )
+
+
+def test_reuses_the_model_for_the_same_config():
+    first = get_pydantic_model(create_model_config("reused-model"))
+    second = get_pydantic_model(create_model_config("reused-model"))
+
+    assert first is second
+    assert get_pydantic_model(create_model_config("other-model")) is not first
+
+
+def test_rebuilds_the_model_when_its_config_changes():
+    model_config = create_model_config("changed-model")
+    first = get_pydantic_model(model_config)
+
+    model_config.model_id_on_host = "https://modal.example.com/v2"
+    second = get_pydantic_model(model_config)
+    assert second is not first
+
+    model_config.updated_time = datetime.now(UTC)
+    assert get_pydantic_model(model_config) is not second
+
+
+def test_providers_share_one_http_client():
+    first = get_pydantic_model(create_model_config("first-shared-client-model"))
+    second = get_pydantic_model(create_model_config("second-shared-client-model", "https://modal.example.com/v3"))
+
+    assert isinstance(first, OpenAIChatModelVideo)
+    assert isinstance(second, OpenAIChatModelVideo)
+    assert first.client._client is second.client._client  # noqa: SLF001
@@ -0,0 +1,9 @@
+from src.message.stream_cancellation import get_stream_cancellation_registry
+
+
+def cancel_stream(message_id: str, user_id: str) -> None:
+    """
+    Stops the user's running response stream that the thread or message is in. The stream saves what the model wrote
+    before it stopped, with a cancelled finish reason.
+    """
+    get_stream_cancellation_registry().cancel(message_id, user_id=user_id)
@@ -1,20 +1,34 @@
-from pydantic import Field
+from pydantic import Field, field_validator
 
 from core.api_interface import APIInterface
 from src.auth.auth_service import authn
 from src.dao.message.message_repository import BaseMessageRepository, ThreadList
-from src.dao.paged import ListMeta, Opts, SortOptions
-from src.thread.thread_models import Thread
+from src.dao.paged import Cursor, ListMeta, Opts, SortOptions
+from src.thread.thread_models import Thread, ThreadSummary
 
 
 class GetThreadsRequest(SortOptions, APIInterface):
     creator: str | None = Field(default=None)
     deleted: bool = Field(default=False)
+    # The next_cursor from the previous page. offset is ignored when this is set
+    cursor: str | None = Field(default=None)
+    # Only list each thread's summary instead of all of its messages
+    summary: bool = Field(default=False)
+
+    @field_validator("cursor", mode="after")
+    @classmethod
+    def validate_cursor(cls, value: str | None) -> str | None:
+        if value is not None:
+            Cursor.decode(value)
+
+        return value
 
 
 class GetThreadsResponse(APIInterface):
-    threads: list[Thread]
+    threads: list[Thread] | list[ThreadSummary]
     meta: ListMeta
+    # Pass this as the cursor to get the next page. It's None on the last page
+    next_cursor: str | None = Field(default=None)
 
 
 def get_threads(request: GetThreadsRequest, message_repository: BaseMessageRepository) -> GetThreadsResponse:
@@ -22,8 +36,21 @@ def get_threads(request: GetThreadsRequest, message_repository: BaseMessageRepos
 
     thread_list: ThreadList
 
-    thread_list = message_repository.get_threads_for_user(agent.client, Opts.from_sort_options(request))
+    opts = Opts.from_sort_options(request)
+    if request.cursor is not None:
+        opts.cursor = Cursor.decode(request.cursor)
+
+    if request.summary:
+        summary_list = message_repository.get_thread_summaries_for_user(agent.client, opts)
+        return GetThreadsResponse(
+            threads=[ThreadSummary.from_row(row) for row in summary_list.threads],
+            meta=summary_list.meta,
+            next_cursor=summary_list.next_cursor,
+        )
+
+    thread_list = message_repository.get_threads_for_user(agent.client, opts)
     return GetThreadsResponse(
         threads=[Thread.from_message(message) for message in thread_list.threads],
         meta=thread_list.meta,
+        next_cursor=thread_list.next_cursor,
     )
@@ -0,0 +1,20 @@
+from collections.abc import Generator
+
+from pydantic import Field
+from werkzeug import exceptions
+
+from core.api_interface import APIInterface
+from src.message.stream_replay import get_stream_replay_registry
+
+
+class ResumeStreamRequest(APIInterface):
+    # How many lines of the stream the client already has
+    after: int = Field(default=0, ge=0)
+
+
+def resume_stream(thread_id: str, request: ResumeStreamRequest, user_id: str) -> Generator[bytes]:
+    stream_replay = get_stream_replay_registry()
+    if stream_replay is None:
+        raise exceptions.NotFound
+
+    return stream_replay.open(thread_id, user_id=user_id, after=request.after)
@@ -1,6 +1,6 @@
 from collections.abc import Sequence
 from datetime import datetime
-from typing import Any, cast
+from typing import Any, Literal, cast
 
 from pydantic import (
     AwareDatetime,
@@ -11,15 +11,15 @@ from pydantic import (
 )
 
 from core.api_interface import APIInterface
+from core.text_snippet import text_snippet
 from db.models.input_parts import InputPart
 from db.models.message import Message as SQLAMessage
 from db.models.model_config import ModelType
 from db.models.tool_definitions import ToolSource
 from src.dao.label import Rating
-from src.dao.message.message_models import InferenceOpts, Message, Role
+from src.dao.message.message_models import InferenceOpts, Message, Role, ThreadSummaryRow
 from src.inference.InferenceEngine import FinishReason
-from src.message.map_text_snippet import text_snippet
-from src.message.message_chunk import ErrorCode, ErrorSeverity
+from src.message.message_chunk import BaseChunk, ChunkType, ErrorCode, ErrorSeverity
 
 
 class LabelResponse(APIInterface):
@@ -95,6 +95,9 @@ class FlatMessage(APIInterface):
     error_code: ErrorCode | None = Field(default=None)
     error_description: str | None = Field(default=None)
     error_severity: ErrorSeverity | None = Field(default=None)
+    tool_result_cache_hit: bool | None = Field(default=None)
+    # Read from the message's stored snippet. Messages written before snippets were stored don't have one
+    stored_snippet: str | None = Field(default=None, validation_alias="snippet", exclude=True)
 
     @field_validator("children", mode="before")
     @classmethod
@@ -112,7 +115,7 @@ class FlatMessage(APIInterface):
     @computed_field  # type:ignore
     @property
     def snippet(self) -> str:
-        return text_snippet(self.content)
+        return self.stored_snippet if self.stored_snippet is not None else text_snippet(self.content)
 
     @computed_field  # type:ignore
     @property
@@ -177,3 +180,35 @@ class Thread(APIInterface):
         mapped_messages = [FlatMessage.from_message(message) for message in messages]
 
         return Thread(id=mapped_messages[0].id, messages=mapped_messages)
+
+
+class ThreadPatchChunk(BaseChunk):
+    """The messages in a streamed thread that were added or changed since it was last sent. message is the thread's id."""
+
+    # HACK: This lets us make `type` required in the schema while also not requiring it in the init
+    @computed_field  # type: ignore
+    @property
+    def type(self) -> Literal[ChunkType.THREAD_PATCH]:
+        return ChunkType.THREAD_PATCH
+
+    messages: list[FlatMessage]
+
+
+class ThreadSummary(APIInterface):
+    """The parts of a thread shown in a thread list, without the thread's messages."""
+
+    id: str
+    snippet: str
+    model_id: str
+    created: AwareDatetime
+    message_count: int
+
+    @staticmethod
+    def from_row(row: ThreadSummaryRow) -> "ThreadSummary":
+        return ThreadSummary(
+            id=row.id,
+            snippet=row.snippet,
+            model_id=row.model_id,
+            created=row.created,
+            message_count=row.message_count,
+        )
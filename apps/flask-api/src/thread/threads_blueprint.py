@@ -7,6 +7,7 @@ from pydantic import ValidationError
 from src import db
 from src.auth.auth_service import authn
 from src.auth.resource_protectors import anonymous_auth_protector
+from src.config.get_config import get_config
 from src.dao.flask_sqlalchemy_session import current_session
 from src.dao.message.message_repository import MessageRepository
 from src.error import handle_validation_error
@@ -18,8 +19,11 @@ from src.message.create_message_service.endpoint import (
 )
 from src.message.format_messages_output import format_messages
 from src.message.GoogleCloudStorage import GoogleCloudStorage
+from src.message.stream_replay import get_stream_replay_registry
+from src.thread.cancel_stream_service import cancel_stream
 from src.thread.get_thread_service import get_thread
 from src.thread.get_threads_service import GetThreadsRequest, GetThreadsResponse, get_threads
+from src.thread.resume_stream_service import ResumeStreamRequest, resume_stream
 from src.thread.thread_models import Thread
 
 
@@ -48,18 +52,59 @@ def create_threads_blueprint(dbc: db.Client, storage_client: GoogleCloudStorage)
     ) -> ResponseReturnValue:
         model_message_stream_input = ModelMessageStreamInput.from_model_create_message_request(create_message_request)
 
-        try:
-            stream_response = stream_message_from_model(
+        def start_stream():
+            return stream_message_from_model(
                 model_message_stream_input,
                 dbc,
                 storage_client=storage_client,
                 message_repository=MessageRepository(current_session),
             )
+
+        try:
+            stream_replay = get_stream_replay_registry()
+            if stream_replay is not None:
+                stream_lines = stream_replay.start(
+                    start_stream,
+                    owner=authn().client,
+                    stream_mode=create_message_request.stream_mode,
+                    coalescing=get_config().stream_coalescing,
+                )
+                if isinstance(stream_lines, Generator):
+                    return Response(stream_lines, mimetype="application/jsonl")
+                return jsonify(stream_lines)
+
+            stream_response = start_stream()
             if isinstance(stream_response, Generator):
-                return Response(stream_with_context(format_messages(stream_response)), mimetype="application/jsonl")
+                return Response(
+                    stream_with_context(
+                        format_messages(
+                            stream_response,
+                            stream_mode=create_message_request.stream_mode,
+                            coalescing=get_config().stream_coalescing,
+                        )
+                    ),
+                    mimetype="application/jsonl",
+                )
             return jsonify(stream_response)
 
         except ValidationError as e:
             return handle_validation_error(e)
 
+    @threads_blueprint.get("/<thread_id>/stream")
+    @anonymous_auth_protector()
+    @pydantic_api(
+        name="Resume a prompt response stream", tags=["v4", "threads"], get_request_model_from_query_string=True
+    )
+    def resume_thread_stream(thread_id: str, request: ResumeStreamRequest) -> ResponseReturnValue:
+        agent = authn()
+        return Response(resume_stream(thread_id, request, user_id=agent.client), mimetype="application/jsonl")
+
+    @threads_blueprint.post("/<message_id>/cancel")
+    @anonymous_auth_protector()
+    @pydantic_api(name="Cancel a prompt response stream", tags=["v4", "threads"])
+    def cancel_thread_stream(message_id: str) -> ResponseReturnValue:
+        agent = authn()
+        cancel_stream(message_id, user_id=agent.client)
+        return "", 204
+
     return threads_blueprint
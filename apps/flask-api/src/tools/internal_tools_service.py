@@ -9,6 +9,7 @@ from db.models.tool_definitions import ToolDefinition as Ai2ToolDefinition
 from db.models.tool_definitions import ToolSource
 
 from .internal_tools import CreateRandomNumber
+from .tool_call_error import ToolCallError
 
 TOOL_REGISTRY: list[Tool[Any]] = [CreateRandomNumber]
 
@@ -29,7 +30,8 @@ def call_internal_tool(tool_call: ToolCall) -> str:
     found_tool = next((tool for tool in TOOL_REGISTRY if tool_call.tool_name == tool.name), None)
 
     if found_tool is None:
-        return "Could not find tool"
+        msg = "Could not find tool"
+        raise ToolCallError(msg)
 
     try:
         if found_tool.takes_ctx is False:
@@ -40,11 +42,13 @@ def call_internal_tool(tool_call: ToolCall) -> str:
                 return str(found_tool.function())  # type: ignore
 
             return str(found_tool.function(parsed_args))  # type: ignore
-        return "Tool setup incorrect"
 
     except Exception as e:
         logging.exception("Tool call failed")
-        return str(e)  # This returns the error to LLM
+        raise ToolCallError(str(e)) from e  # This returns the error to LLM
+
+    msg = "Tool setup incorrect"
+    raise ToolCallError(msg)
 
 
 def arg_parse_helper(args: str | dict[str, Any] | None) -> str | dict[str, Any] | None:
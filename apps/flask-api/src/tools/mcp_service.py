@@ -1,26 +1,22 @@
-import asyncio
 from logging import getLogger
 from typing import TYPE_CHECKING
 
-from pydantic_ai.mcp import MCPServerStreamableHTTP
-
 from db.models.tool_call import ToolCall
 from db.models.tool_definitions import ToolDefinition as Ai2ToolDefinition
 from db.models.tool_definitions import ToolSource
 from src.config.Config import McpServer
 from src.config.get_config import cfg
+from src.tools.mcp_session_pool import get_mcp_session_pool
+from src.tools.mcp_tool_catalog import get_mcp_tool_catalog
+from src.tools.tool_call_error import ToolCallError
+from src.util.background_event_loop import background_event_loop
 
 if TYPE_CHECKING:
     from mcp import Tool as MCPTool
 
 
-def list_mcp_server_tools(mcp_server_config: McpServer) -> list[Ai2ToolDefinition]:
-    mcp_server = MCPServerStreamableHTTP(
-        url=mcp_server_config.url,
-        headers=mcp_server_config.headers,
-    )
-
-    tool_list: list[MCPTool] = asyncio.run(mcp_server.list_tools())
+def map_mcp_tools(mcp_server_config: McpServer, tool_list: list["MCPTool"]) -> list[Ai2ToolDefinition]:
+    # Tool definitions get saved with the messages that use them, so each caller needs its own copies
     mapped_tools = [
         Ai2ToolDefinition(
             name=tool.name,
@@ -35,31 +31,24 @@ def list_mcp_server_tools(mcp_server_config: McpServer) -> list[Ai2ToolDefinitio
     return mapped_tools
 
 
+def list_tools_from_mcp_servers(mcp_servers: list[McpServer]) -> list[Ai2ToolDefinition]:
+    tools_by_server = get_mcp_tool_catalog().get_tools(mcp_servers)
+
+    return [tool for server in mcp_servers for tool in map_mcp_tools(server, tools_by_server[server.id])]
+
+
 def _is_mcp_server_for_general_use(mcp_server: McpServer) -> bool:
     return mcp_server.enabled and mcp_server.available_for_all_models
 
 
 def get_general_mcp_tools() -> list[Ai2ToolDefinition]:
-    mcp_tools: list[Ai2ToolDefinition] = []
-
     # TODO: There's probably a way to share this logic with get_tools_from_mcp_servers
     # It may be nice to pass in a condition for the mcp servers?
-    mcp_tools = [
-        tool
-        for server in cfg.mcp.servers
-        if _is_mcp_server_for_general_use(server)
-        for tool in list_mcp_server_tools(server)
-    ]
-
-    return mcp_tools
+    return list_tools_from_mcp_servers([server for server in cfg.mcp.servers if _is_mcp_server_for_general_use(server)])
 
 
 def get_tools_from_mcp_servers(mcp_server_ids: set[str]) -> list[Ai2ToolDefinition]:
-    mcp_tools = [
-        tool for server in cfg.mcp.servers if server.id in mcp_server_ids for tool in list_mcp_server_tools(server)
-    ]
-
-    return mcp_tools
+    return list_tools_from_mcp_servers([server for server in cfg.mcp.servers if server.id in mcp_server_ids])
 
 
 def find_mcp_config_by_id(mcp_id: str | None) -> McpServer | None:
@@ -69,7 +58,7 @@ def find_mcp_config_by_id(mcp_id: str | None) -> McpServer | None:
     return next((config for config in cfg.mcp.servers if config.id == mcp_id), None)
 
 
-def call_mcp_tool(tool_call: ToolCall, tool_definition: Ai2ToolDefinition):
+def call_mcp_tool(tool_call: ToolCall, tool_definition: Ai2ToolDefinition) -> str:
     mcp_config = find_mcp_config_by_id(tool_definition.mcp_server_id)
 
     if mcp_config is None:
@@ -80,12 +69,23 @@ def call_mcp_tool(tool_call: ToolCall, tool_definition: Ai2ToolDefinition):
         msg = "the selected mcp server is not enabled"
         raise RuntimeError(msg)
 
+    timeout_seconds = cfg.tool_calls.timeout_seconds
     try:
-        server = MCPServerStreamableHTTP(
-            url=mcp_config.url,
-            headers=mcp_config.headers,
+        result = str(
+            background_event_loop.run(
+                get_mcp_session_pool().call_tool(mcp_config, name=tool_call.tool_name, args=tool_call.args or {}),
+                timeout=timeout_seconds,
+            )
+        )
+    except TimeoutError:
+        getLogger().warning(
+            "MCP tool call timed out.", extra={"tool_name": tool_call.tool_name, "timeout_seconds": timeout_seconds}
         )
-        return str(asyncio.run(server.direct_call_tool(name=tool_call.tool_name, args=tool_call.args or {})))
-    except Exception as _e:
+        msg = f"Remote tool {tool_call.tool_name} didn't respond within {timeout_seconds:g} seconds"
+        raise ToolCallError(msg) from None
+    except Exception as e:
         getLogger().exception("Failed to call mcp tool.", extra={"tool_name": tool_call.tool_name})
-        return f"Failed to call remote tool {tool_call.tool_name}"
+        msg = f"Failed to call remote tool {tool_call.tool_name}"
+        raise ToolCallError(msg) from e
+
+    return result
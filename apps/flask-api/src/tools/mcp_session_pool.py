@@ -0,0 +1,242 @@
+import asyncio
+import os
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from functools import cache
+from logging import getLogger
+from time import monotonic
+from typing import Any
+
+import anyio
+from anyio.abc import TaskGroup
+from opentelemetry import metrics, trace
+from pydantic_ai.exceptions import ModelRetry
+from pydantic_ai.mcp import MCPServerStreamableHTTP
+
+from src.config.Config import McpServer
+from src.config.get_config import get_config
+
+# What the MCP client reports when the server doesn't recognise the session ID. pydantic-ai turns it into a ModelRetry
+SESSION_TERMINATED_MESSAGE = "Session terminated"
+
+logger = getLogger(__name__)
+
+meter = metrics.get_meter(__name__)
+tool_call_duration = meter.create_histogram(
+    "mcp_tool_call.duration", unit="s", description="MCP tool call latency, by server, tool and result"
+)
+session_counter = meter.create_counter(
+    "mcp_session_pool.sessions", description="MCP sessions handed out for tool calls, by whether they were reused"
+)
+
+
+@dataclass
+class _PooledSession:
+    server: MCPServerStreamableHTTP
+    last_used: float
+    closed: asyncio.Event = field(default_factory=asyncio.Event)
+    holder: "asyncio.Task[None] | None" = None
+    calls: TaskGroup | None = None
+
+    @property
+    def is_open(self) -> bool:
+        return (
+            self.holder is not None and not self.holder.done() and self.calls is not None and not self.closed.is_set()
+        )
+
+
+class McpSessionPool:
+    """
+    Keeps one initialized session open per MCP server so tool calls don't each pay for a new connection and the MCP
+    initialize handshake.
+
+    Each session is held open by its own task on the background event loop, and calls run in a task group inside it.
+    The MCP client has to be closed by the task that opened it, and this way the holder is always the last to let go
+    of it. A session that has been idle for a while is pinged before it's used and replaced if it doesn't answer. One
+    whose call failed outside of the tool itself is closed so the next call reconnects.
+
+    All of this runs on the background event loop, so it doesn't need any locking between threads.
+    """
+
+    def __init__(
+        self,
+        max_concurrent_calls_per_server: int,
+        connect_timeout_seconds: float,
+        health_check_after_idle_seconds: float,
+        ping_timeout_seconds: float,
+        create_server: Callable[[McpServer, float], MCPServerStreamableHTTP] | None = None,
+        timer: Callable[[], float] = monotonic,
+    ):
+        self._max_concurrent_calls_per_server = max_concurrent_calls_per_server
+        self._connect_timeout_seconds = connect_timeout_seconds
+        self._health_check_after_idle_seconds = health_check_after_idle_seconds
+        self._ping_timeout_seconds = ping_timeout_seconds
+        self._create_server = create_server or create_mcp_server
+        self._timer = timer
+        self._sessions: dict[str, _PooledSession] = {}
+        self._connect_locks: dict[str, asyncio.Lock] = {}
+        self._call_limits: dict[str, asyncio.Semaphore] = {}
+
+        # Sessions belong to the parent's event loop, a forked worker needs to open its own
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self) -> None:
+        self._sessions = {}
+        self._connect_locks = {}
+        self._call_limits = {}
+
+    async def call_tool(self, mcp_server_config: McpServer, name: str, args: dict[str, Any]) -> Any:
+        call_limit = self._call_limits.setdefault(
+            mcp_server_config.id, asyncio.Semaphore(self._max_concurrent_calls_per_server)
+        )
+
+        async with call_limit:
+            try:
+                return await self._call_tool_in_session(mcp_server_config, name, args)
+            except ModelRetry as e:
+                if e.message != SESSION_TERMINATED_MESSAGE:
+                    raise
+
+                # The server forgot the session, usually because it restarted. It never saw the call, so it's safe to
+                # make it again on a new session
+                logger.info("MCP server %s terminated its session, reconnecting", mcp_server_config.id)
+                return await self._call_tool_in_session(mcp_server_config, name, args)
+
+    async def _call_tool_in_session(self, mcp_server_config: McpServer, name: str, args: dict[str, Any]) -> Any:
+        session = await self._get_session(mcp_server_config)
+        response: asyncio.Future[Any] = asyncio.get_running_loop().create_future()
+        cancel_scope = anyio.CancelScope()
+
+        async def call() -> None:
+            with cancel_scope:
+                try:
+                    response.set_result(await session.server.direct_call_tool(name=name, args=args))
+                except Exception as e:  # noqa: BLE001
+                    response.set_exception(e)
+                finally:
+                    if not response.done():
+                        response.set_exception(ConnectionError(f"Lost MCP session to {mcp_server_config.id}"))
+
+        # Nothing awaits between checking that the session is open and here, so its task group is still running
+        calls = session.calls
+        if calls is None:
+            msg = f"Lost MCP session to {mcp_server_config.id}"
+            raise ConnectionError(msg)
+
+        start = self._timer()
+        result = "error"
+        try:
+            calls.start_soon(call)
+            value = await response
+            result = "success"
+        except ModelRetry as e:
+            result = "tool_error"
+            if e.message == SESSION_TERMINATED_MESSAGE:
+                self._close_session(mcp_server_config.id, session)
+            raise
+        except asyncio.CancelledError:
+            cancel_scope.cancel()
+            raise
+        except Exception:
+            self._close_session(mcp_server_config.id, session)
+            raise
+        finally:
+            session.last_used = self._timer()
+            tool_call_duration.record(
+                session.last_used - start,
+                {"mcp_server_id": mcp_server_config.id, "tool_name": name, "result": result},
+            )
+
+        return value
+
+    async def _get_session(self, mcp_server_config: McpServer) -> _PooledSession:
+        connect_lock = self._connect_locks.setdefault(mcp_server_config.id, asyncio.Lock())
+
+        async with connect_lock:
+            session = self._sessions.get(mcp_server_config.id)
+
+            if (
+                session is not None
+                and session.is_open
+                and self._timer() - session.last_used >= self._health_check_after_idle_seconds
+                and not await self._ping(mcp_server_config, session)
+            ):
+                self._close_session(mcp_server_config.id, session)
+
+            reused = session is not None and session.is_open
+            if session is None or not session.is_open:
+                session = await self._open_session(mcp_server_config)
+                self._sessions[mcp_server_config.id] = session
+
+        session_counter.add(1, {"mcp_server_id": mcp_server_config.id, "reused": reused})
+        trace.get_current_span().set_attribute("mcp_session_pool.reused", reused)
+
+        return session
+
+    async def _open_session(self, mcp_server_config: McpServer) -> _PooledSession:
+        session = _PooledSession(
+            server=self._create_server(mcp_server_config, self._connect_timeout_seconds), last_used=self._timer()
+        )
+        opened: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+
+        async def hold_open() -> None:
+            try:
+                # Calls still running when the session is closed get to finish before the server is exited
+                async with session.server, anyio.create_task_group() as calls:
+                    session.calls = calls
+                    opened.set_result(None)
+                    await session.closed.wait()
+            except Exception as e:  # noqa: BLE001
+                if not opened.done():
+                    opened.set_exception(e)
+                elif not session.closed.is_set():
+                    logger.warning("Lost MCP session to %s", mcp_server_config.id, exc_info=True)
+            finally:
+                session.calls = None
+                if not opened.done():
+                    opened.cancel()
+
+        session.holder = asyncio.create_task(hold_open(), name=f"mcp-session-{mcp_server_config.id}")
+        try:
+            await opened
+        except BaseException:
+            session.closed.set()
+            raise
+
+        return session
+
+    async def _ping(self, mcp_server_config: McpServer, session: _PooledSession) -> bool:
+        try:
+            # pydantic-ai doesn't expose a health check, so go through the MCP client it holds
+            await asyncio.wait_for(session.server._client.send_ping(), timeout=self._ping_timeout_seconds)  # noqa: SLF001
+        except Exception:  # noqa: BLE001
+            logger.warning("MCP session to %s didn't answer a ping, reconnecting", mcp_server_config.id, exc_info=True)
+            return False
+
+        session.last_used = self._timer()
+        return True
+
+    def _close_session(self, server_id: str, session: _PooledSession) -> None:
+        session.closed.set()
+        if self._sessions.get(server_id) is session:
+            del self._sessions[server_id]
+
+
+def create_mcp_server(mcp_server_config: McpServer, connect_timeout_seconds: float) -> MCPServerStreamableHTTP:
+    return MCPServerStreamableHTTP(
+        url=mcp_server_config.url,
+        headers=mcp_server_config.headers,
+        timeout=connect_timeout_seconds,
+    )
+
+
+@cache
+def get_mcp_session_pool() -> McpSessionPool:
+    config = get_config().mcp.session_pool
+
+    return McpSessionPool(
+        max_concurrent_calls_per_server=config.max_concurrent_calls_per_server,
+        connect_timeout_seconds=config.connect_timeout_seconds,
+        health_check_after_idle_seconds=config.health_check_after_idle_seconds,
+        ping_timeout_seconds=config.ping_timeout_seconds,
+    )
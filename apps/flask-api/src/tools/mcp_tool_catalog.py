@@ -0,0 +1,151 @@
+import asyncio
+import os
+import threading
+from collections.abc import Callable, Coroutine, Sequence
+from concurrent.futures import Future, wait
+from dataclasses import dataclass
+from functools import cache
+from logging import getLogger
+from time import monotonic
+from typing import TYPE_CHECKING, Any
+
+from opentelemetry import trace
+from pydantic_ai.mcp import MCPServerStreamableHTTP
+
+from src.config.Config import McpServer
+from src.config.get_config import get_config
+from src.util.background_event_loop import BackgroundEventLoop, background_event_loop
+
+if TYPE_CHECKING:
+    from mcp import Tool as MCPTool
+
+logger = getLogger(__name__)
+
+
+async def fetch_mcp_server_tools(mcp_server_config: McpServer) -> list["MCPTool"]:
+    mcp_server = MCPServerStreamableHTTP(
+        url=mcp_server_config.url,
+        headers=mcp_server_config.headers,
+    )
+
+    return await mcp_server.list_tools()
+
+
+@dataclass
+class _ServerTools:
+    tools: list["MCPTool"]
+    expires_at: float
+
+
+class McpToolCatalog:
+    """
+    Caches the tools each MCP server offers so listing models and creating threads don't wait on MCP round trips.
+
+    Once a server's tools are older than ttl_seconds they're still served while a fresh list is fetched in the
+    background. If that fetch fails or times out, the last list that was fetched keeps being served. Only a server
+    that has never been fetched makes a request wait, and then for at most wait_seconds. Servers are fetched
+    concurrently on the background event loop, and only one fetch per server runs at a time.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float,
+        fetch_timeout_seconds: float,
+        wait_seconds: float,
+        retry_seconds: float,
+        fetch_tools: Callable[[McpServer], Coroutine[Any, Any, list["MCPTool"]]] = fetch_mcp_server_tools,
+        timer: Callable[[], float] = monotonic,
+        event_loop: BackgroundEventLoop = background_event_loop,
+    ):
+        self._ttl_seconds = ttl_seconds
+        self._fetch_timeout_seconds = fetch_timeout_seconds
+        self._wait_seconds = wait_seconds
+        self._retry_seconds = retry_seconds
+        self._fetch_tools = fetch_tools
+        self._timer = timer
+        self._event_loop = event_loop
+        self._entries: dict[str, _ServerTools] = {}
+        self._fetches: dict[str, Future[None]] = {}
+        self._lock = threading.Lock()
+
+        # Fetches in progress belong to the parent's event loop, a forked worker needs to start its own
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self) -> None:
+        self._lock = threading.Lock()
+        self._fetches = {}
+
+    def get_tools(self, servers: Sequence[McpServer]) -> dict[str, list["MCPTool"]]:
+        """Returns the tools for each server, keyed by server ID. Servers whose tools aren't known yet map to []."""
+        now = self._timer()
+        first_fetches: list[Future[None]] = []
+        stale_count = 0
+
+        with self._lock:
+            for server in servers:
+                entry = self._entries.get(server.id)
+                if entry is None:
+                    first_fetches.append(self._start_fetch(server))
+                elif entry.expires_at <= now:
+                    stale_count += 1
+                    self._start_fetch(server)
+
+        span = trace.get_current_span()
+        span.set_attribute("mcp_tool_catalog.stale", stale_count)
+        span.set_attribute("mcp_tool_catalog.missing", len(first_fetches))
+
+        if first_fetches:
+            # Fetches that don't finish in time keep going and fill in the catalog for later requests
+            wait(first_fetches, timeout=self._wait_seconds)
+
+        with self._lock:
+            return {
+                server.id: entry.tools if (entry := self._entries.get(server.id)) is not None else []
+                for server in servers
+            }
+
+    def refresh(self, servers: Sequence[McpServer]) -> None:
+        """Starts fetching tools for any of the servers that aren't already being fetched, without waiting for them."""
+        with self._lock:
+            for server in servers:
+                self._start_fetch(server)
+
+    def _start_fetch(self, server: McpServer) -> Future[None]:
+        # Must be called with the lock held. The fetch removes itself from _fetches under the same lock, so it can't
+        # finish before it's been added
+        fetch = self._fetches.get(server.id)
+        if fetch is None:
+            fetch = self._event_loop.submit(self._fetch(server))
+            self._fetches[server.id] = fetch
+
+        return fetch
+
+    async def _fetch(self, server: McpServer) -> None:
+        try:
+            tools = await asyncio.wait_for(self._fetch_tools(server), timeout=self._fetch_timeout_seconds)
+        except Exception:  # noqa: BLE001
+            logger.warning("Failed to list tools from MCP server %s", server.id, exc_info=True)
+            with self._lock:
+                previous = self._entries.get(server.id)
+                self._entries[server.id] = _ServerTools(
+                    tools=previous.tools if previous is not None else [],
+                    expires_at=self._timer() + self._retry_seconds,
+                )
+        else:
+            with self._lock:
+                self._entries[server.id] = _ServerTools(tools=tools, expires_at=self._timer() + self._ttl_seconds)
+        finally:
+            with self._lock:
+                self._fetches.pop(server.id, None)
+
+
+@cache
+def get_mcp_tool_catalog() -> McpToolCatalog:
+    config = get_config().mcp.tool_catalog
+
+    return McpToolCatalog(
+        ttl_seconds=config.ttl_seconds,
+        fetch_timeout_seconds=config.fetch_timeout_seconds,
+        wait_seconds=config.wait_seconds,
+        retry_seconds=config.retry_seconds,
+    )
@@ -0,0 +1,163 @@
+import asyncio
+from typing import Any
+
+import pytest
+from pydantic_ai.exceptions import ModelRetry
+
+from src.config.Config import McpServer
+from src.tools.mcp_session_pool import SESSION_TERMINATED_MESSAGE, McpSessionPool
+from src.util.fake_timer import FakeTimer
+
+MCP_SERVER = McpServer(
+    url="https://mcp.example.com/mcp",
+    headers={},
+    name="Test MCP server",
+    id="test-mcp-server",
+    enabled=True,
+    available_for_all_models=True,
+    tool_result_cache_ttl_seconds={},
+)
+
+
+class FakeMcpClient:
+    def __init__(self, server: "FakeMcpServer") -> None:
+        self.server = server
+
+    async def send_ping(self) -> None:
+        self.server.ping_count += 1
+        if not self.server.backend.answers_pings:
+            msg = "MCP server didn't answer"
+            raise ConnectionError(msg)
+
+
+class FakeMcpBackend:
+    """Stands in for the remote MCP server and records the sessions opened to it."""
+
+    def __init__(self) -> None:
+        self.servers: list[FakeMcpServer] = []
+        self.answers_pings = True
+        self.errors: list[Exception] = []
+        self.call_seconds = 0.0
+        self.calls_in_flight = 0
+        self.max_calls_in_flight = 0
+
+    def create_server(self, _mcp_server_config: McpServer, _connect_timeout_seconds: float) -> Any:
+        server = FakeMcpServer(self)
+        self.servers.append(server)
+        return server
+
+
+class FakeMcpServer:
+    def __init__(self, backend: FakeMcpBackend) -> None:
+        self.backend = backend
+        self.running_count = 0
+        self.connect_count = 0
+        self.ping_count = 0
+        self._client = FakeMcpClient(self)
+
+    async def __aenter__(self) -> "FakeMcpServer":
+        if self.running_count == 0:
+            self.connect_count += 1
+        self.running_count += 1
+        return self
+
+    async def __aexit__(self, *_args: object) -> None:
+        self.running_count -= 1
+
+    async def direct_call_tool(self, name: str, args: dict[str, Any]) -> str:
+        async with self:
+            self.backend.calls_in_flight += 1
+            self.backend.max_calls_in_flight = max(self.backend.max_calls_in_flight, self.backend.calls_in_flight)
+            try:
+                await asyncio.sleep(self.backend.call_seconds)
+                if self.backend.errors:
+                    raise self.backend.errors.pop(0)
+
+                return f"{name}({args['value']})"
+            finally:
+                self.backend.calls_in_flight -= 1
+
+
+def create_pool(backend: FakeMcpBackend, timer: FakeTimer | None = None, max_concurrent_calls: int = 8):
+    return McpSessionPool(
+        max_concurrent_calls_per_server=max_concurrent_calls,
+        connect_timeout_seconds=5,
+        health_check_after_idle_seconds=60,
+        ping_timeout_seconds=1,
+        create_server=backend.create_server,
+        timer=timer or FakeTimer(),
+    )
+
+
+async def test_reuses_one_session_for_many_calls():
+    backend = FakeMcpBackend()
+    pool = create_pool(backend)
+
+    results = [await pool.call_tool(MCP_SERVER, "echo", {"value": index}) for index in range(3)]
+
+    assert results == ["echo(0)", "echo(1)", "echo(2)"]
+    assert len(backend.servers) == 1
+    assert backend.servers[0].connect_count == 1
+
+
+async def test_limits_concurrent_calls_to_a_server():
+    backend = FakeMcpBackend()
+    backend.call_seconds = 0.01
+    pool = create_pool(backend, max_concurrent_calls=2)
+
+    results = await asyncio.gather(*(pool.call_tool(MCP_SERVER, "echo", {"value": index}) for index in range(6)))
+
+    assert len(results) == 6
+    assert backend.max_calls_in_flight == 2
+
+
+async def test_keeps_the_session_when_a_tool_fails():
+    backend = FakeMcpBackend()
+    pool = create_pool(backend)
+    backend.errors.append(ModelRetry("Bad arguments"))
+
+    with pytest.raises(ModelRetry):
+        await pool.call_tool(MCP_SERVER, "echo", {"value": 1})
+
+    assert await pool.call_tool(MCP_SERVER, "echo", {"value": 2}) == "echo(2)"
+    assert len(backend.servers) == 1
+
+
+async def test_reconnects_after_the_connection_fails():
+    backend = FakeMcpBackend()
+    pool = create_pool(backend)
+    backend.errors.append(ConnectionError("Connection reset"))
+
+    with pytest.raises(ConnectionError):
+        await pool.call_tool(MCP_SERVER, "echo", {"value": 1})
+
+    assert await pool.call_tool(MCP_SERVER, "echo", {"value": 2}) == "echo(2)"
+    assert len(backend.servers) == 2
+    assert backend.servers[0].running_count == 0, "the failed session should be closed"
+
+
+async def test_retries_on_a_new_session_when_the_server_forgets_the_session():
+    backend = FakeMcpBackend()
+    pool = create_pool(backend)
+    await pool.call_tool(MCP_SERVER, "echo", {"value": 1})
+    backend.errors.append(ModelRetry(SESSION_TERMINATED_MESSAGE))
+
+    assert await pool.call_tool(MCP_SERVER, "echo", {"value": 2}) == "echo(2)"
+    assert len(backend.servers) == 2
+
+
+async def test_replaces_an_idle_session_that_does_not_answer_a_ping():
+    backend = FakeMcpBackend()
+    timer = FakeTimer()
+    pool = create_pool(backend, timer)
+    await pool.call_tool(MCP_SERVER, "echo", {"value": 1})
+
+    timer.now = 30
+    await pool.call_tool(MCP_SERVER, "echo", {"value": 2})
+    assert backend.servers[0].ping_count == 0, "a recently used session shouldn't be pinged"
+
+    timer.now = 120
+    backend.answers_pings = False
+    assert await pool.call_tool(MCP_SERVER, "echo", {"value": 3}) == "echo(3)"
+    assert backend.servers[0].ping_count == 1
+    assert len(backend.servers) == 2
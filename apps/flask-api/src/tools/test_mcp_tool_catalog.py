@@ -0,0 +1,136 @@
+import asyncio
+import threading
+import time
+
+from mcp import Tool as MCPTool
+
+from src.config.Config import McpServer
+from src.tools.mcp_tool_catalog import McpToolCatalog
+from src.util.background_event_loop import BackgroundEventLoop
+from src.util.fake_timer import FakeTimer
+
+
+class FakeMcpServers:
+    def __init__(self) -> None:
+        self.fetch_count = 0
+        self.version = 1
+        self.fail = False
+        self.delay_seconds = 0.0
+        self.release = threading.Event()
+        self.release.set()
+
+    async def fetch_tools(self, server: McpServer) -> list[MCPTool]:
+        self.fetch_count += 1
+        await asyncio.sleep(self.delay_seconds)
+        await asyncio.to_thread(self.release.wait)
+
+        if self.fail:
+            msg = "MCP server is down"
+            raise ConnectionError(msg)
+
+        return [MCPTool(name=f"{server.id}_tool_v{self.version}", inputSchema={"type": "object"})]
+
+
+def create_server(server_id: str) -> McpServer:
+    return McpServer(
+        url=f"https://{server_id}.example.com/mcp",
+        headers={},
+        name=server_id,
+        id=server_id,
+        enabled=True,
+        available_for_all_models=True,
+        tool_result_cache_ttl_seconds={},
+    )
+
+
+def create_catalog(servers: FakeMcpServers, timer: FakeTimer | None = None, wait_seconds: float = 5) -> McpToolCatalog:
+    return McpToolCatalog(
+        ttl_seconds=60,
+        fetch_timeout_seconds=5,
+        wait_seconds=wait_seconds,
+        retry_seconds=10,
+        fetch_tools=servers.fetch_tools,
+        timer=timer or FakeTimer(),
+        event_loop=BackgroundEventLoop(name="test-mcp-tool-catalog"),
+    )
+
+
+def tool_names(tools_by_server: dict[str, list[MCPTool]]) -> dict[str, list[str]]:
+    return {server_id: [tool.name for tool in tools] for server_id, tools in tools_by_server.items()}
+
+
+def wait_for_fetches(catalog: McpToolCatalog) -> None:
+    deadline = time.monotonic() + 5
+    while catalog._fetches and time.monotonic() < deadline:  # noqa: SLF001
+        time.sleep(0.01)
+
+
+def test_fetches_each_server_once_while_fresh():
+    servers = FakeMcpServers()
+    catalog = create_catalog(servers)
+    mcp_servers = [create_server("first"), create_server("second")]
+
+    assert tool_names(catalog.get_tools(mcp_servers)) == {"first": ["first_tool_v1"], "second": ["second_tool_v1"]}
+    assert tool_names(catalog.get_tools(mcp_servers)) == {"first": ["first_tool_v1"], "second": ["second_tool_v1"]}
+    assert servers.fetch_count == 2
+
+
+def test_serves_stale_tools_while_refreshing_in_the_background():
+    servers = FakeMcpServers()
+    timer = FakeTimer()
+    catalog = create_catalog(servers, timer)
+    mcp_servers = [create_server("server")]
+    catalog.get_tools(mcp_servers)
+
+    timer.now = 60
+    servers.version = 2
+    servers.release.clear()
+    assert tool_names(catalog.get_tools(mcp_servers)) == {"server": ["server_tool_v1"]}
+    assert tool_names(catalog.get_tools(mcp_servers)) == {"server": ["server_tool_v1"]}
+
+    servers.release.set()
+    wait_for_fetches(catalog)
+    assert tool_names(catalog.get_tools(mcp_servers)) == {"server": ["server_tool_v2"]}
+    assert servers.fetch_count == 2, "only one refresh should run at a time"
+
+
+def test_keeps_the_last_good_tools_when_a_refresh_fails():
+    servers = FakeMcpServers()
+    timer = FakeTimer()
+    catalog = create_catalog(servers, timer)
+    mcp_servers = [create_server("server")]
+    catalog.get_tools(mcp_servers)
+
+    timer.now = 60
+    servers.fail = True
+    catalog.get_tools(mcp_servers)
+    wait_for_fetches(catalog)
+
+    assert tool_names(catalog.get_tools(mcp_servers)) == {"server": ["server_tool_v1"]}
+    assert servers.fetch_count == 2, "a failed server shouldn't be retried until retry_seconds have passed"
+
+
+def test_goes_on_without_a_slow_server():
+    servers = FakeMcpServers()
+    catalog = create_catalog(servers, wait_seconds=0.05)
+    mcp_servers = [create_server("slow")]
+
+    servers.release.clear()
+    assert catalog.get_tools(mcp_servers) == {"slow": []}
+
+    servers.release.set()
+    wait_for_fetches(catalog)
+    assert tool_names(catalog.get_tools(mcp_servers)) == {"slow": ["slow_tool_v1"]}
+
+
+def test_fetches_servers_concurrently():
+    servers = FakeMcpServers()
+    servers.delay_seconds = 0.2
+    catalog = create_catalog(servers)
+    mcp_servers = [create_server(f"server_{index}") for index in range(5)]
+
+    start = time.monotonic()
+    tools_by_server = catalog.get_tools(mcp_servers)
+
+    assert time.monotonic() - start < 0.6
+    assert all(len(tools) == 1 for tools in tools_by_server.values())
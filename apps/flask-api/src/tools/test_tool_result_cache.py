@@ -0,0 +1,100 @@
+from collections.abc import Generator
+from typing import Any
+
+import pytest
+from pytest_mock import MockerFixture
+
+from db.models.tool_call import ToolCall
+from db.models.tool_definitions import ToolDefinition, ToolSource
+from src.tools.tool_result_cache import get_tool_result_cache, tool_result_cache_key
+from src.tools.tools_service import call_tool
+
+
+@pytest.fixture(autouse=True)
+def empty_tool_result_cache() -> Generator[None]:
+    get_tool_result_cache.cache_clear()
+    yield
+    get_tool_result_cache.cache_clear()
+
+
+def create_tool_call(
+    args: str | dict[str, Any] | None = None,
+    tool_name: str = "create_random_number",
+    tool_source: ToolSource = ToolSource.INTERNAL,
+) -> ToolCall:
+    return ToolCall(
+        tool_call_id="tool-call",
+        tool_name=tool_name,
+        tool_source=tool_source,
+        # Models sometimes send their arguments as a JSON string, which ends up stored as-is
+        args=args,  # type: ignore[arg-type]
+        message_id="message",
+    )
+
+
+def create_tool_definition(tool_name: str = "create_random_number") -> ToolDefinition:
+    return ToolDefinition(
+        name=tool_name,
+        description="A test tool",
+        tool_source=ToolSource.INTERNAL,
+        parameters=None,
+    )
+
+
+def test_identical_calls_share_a_key():
+    assert tool_result_cache_key(create_tool_call({"query": "olmo", "page": 1}), None) == tool_result_cache_key(
+        create_tool_call('{"page": 1, "query": "olmo"}'), None
+    )
+    assert tool_result_cache_key(create_tool_call({"query": "olmo"}), None) != tool_result_cache_key(
+        create_tool_call({"query": "tulu"}), None
+    )
+    assert tool_result_cache_key(
+        create_tool_call({"query": "olmo"}, tool_source=ToolSource.MCP), "first-server"
+    ) != tool_result_cache_key(create_tool_call({"query": "olmo"}, tool_source=ToolSource.MCP), "second-server")
+
+
+def test_reuses_results_of_cacheable_tools(mocker: MockerFixture):
+    config = mocker.patch("src.tools.tool_result_cache.get_config").return_value
+    config.tool_calls.internal_tool_result_cache_ttl_seconds = {"create_random_number": 60}
+    config.tool_calls.result_cache_max_entries = 10
+    tool_function = mocker.patch(
+        "src.tools.internal_tools.create_random_number.CreateRandomNumber.function", side_effect=["4", "7"]
+    )
+
+    first = call_tool(create_tool_call(), create_tool_definition())
+    second = call_tool(create_tool_call(), create_tool_definition())
+
+    assert first.content == second.content == "4"
+    assert first.metadata.cache_hit is False
+    assert second.metadata.cache_hit is True
+    assert tool_function.call_count == 1
+
+
+def test_does_not_cache_tools_that_have_not_opted_in(mocker: MockerFixture):
+    config = mocker.patch("src.tools.tool_result_cache.get_config").return_value
+    config.tool_calls.internal_tool_result_cache_ttl_seconds = {}
+    config.tool_calls.result_cache_max_entries = 10
+    mocker.patch("src.tools.internal_tools.create_random_number.CreateRandomNumber.function", side_effect=["4", "7"])
+
+    first = call_tool(create_tool_call(), create_tool_definition())
+    second = call_tool(create_tool_call(), create_tool_definition())
+
+    assert (first.content, second.content) == ("4", "7")
+    assert first.metadata.cache_hit is None
+    assert second.metadata.cache_hit is None
+
+
+def test_does_not_cache_failed_calls(mocker: MockerFixture):
+    config = mocker.patch("src.tools.tool_result_cache.get_config").return_value
+    config.tool_calls.internal_tool_result_cache_ttl_seconds = {"create_random_number": 60}
+    config.tool_calls.result_cache_max_entries = 10
+    mocker.patch(
+        "src.tools.internal_tools.create_random_number.CreateRandomNumber.function",
+        side_effect=[RuntimeError("Out of numbers"), "7"],
+    )
+
+    first = call_tool(create_tool_call(), create_tool_definition())
+    second = call_tool(create_tool_call(), create_tool_definition())
+
+    assert (first.content, second.content) == ("Out of numbers", "7")
+    assert second.metadata.cache_hit is False
@@ -0,0 +1,71 @@
+import threading
+import time
+
+from pytest_mock import MockerFixture
+
+from db.models.tool_call import ToolCall
+from db.models.tool_definitions import ToolDefinition, ToolSource
+from src.tools.tools_service import call_tools
+
+
+def create_tool_call(index: int) -> tuple[ToolCall, ToolDefinition]:
+    tool_call = ToolCall(
+        tool_call_id=f"tool-call-{index}",
+        tool_name=f"tool_{index}",
+        tool_source=ToolSource.INTERNAL,
+        args={"index": index},
+        message_id="message",
+    )
+    tool_definition = ToolDefinition(
+        name=f"tool_{index}",
+        description="A test tool",
+        tool_source=ToolSource.INTERNAL,
+        parameters=None,
+    )
+
+    return tool_call, tool_definition
+
+
+def test_returns_results_in_the_order_the_tools_were_called(mocker: MockerFixture):
+    # Later calls finish first
+    delays = {f"tool_{index}": 0.05 * (4 - index) for index in range(4)}
+
+    def call_internal_tool(tool_call: ToolCall) -> str:
+        time.sleep(delays[tool_call.tool_name])
+        return f"result {tool_call.tool_name}"
+
+    mocker.patch("src.tools.tools_service.call_internal_tool", side_effect=call_internal_tool)
+
+    results = call_tools([create_tool_call(index) for index in range(4)])
+
+    assert [result.tool_call_id for result in results] == [f"tool-call-{index}" for index in range(4)]
+    assert [result.content for result in results] == [f"result tool_{index}" for index in range(4)]
+
+
+def test_calls_tools_concurrently_up_to_the_limit(mocker: MockerFixture):
+    lock = threading.Lock()
+    calls_in_flight = 0
+    max_calls_in_flight = 0
+
+    def call_internal_tool(_tool_call: ToolCall) -> str:
+        nonlocal calls_in_flight, max_calls_in_flight
+        with lock:
+            calls_in_flight += 1
+            max_calls_in_flight = max(max_calls_in_flight, calls_in_flight)
+
+        time.sleep(0.05)
+
+        with lock:
+            calls_in_flight -= 1
+
+        return "result"
+
+    mocker.patch("src.tools.tools_service.call_internal_tool", side_effect=call_internal_tool)
+    tool_calls_config = mocker.patch("src.tools.tools_service.get_config").return_value.tool_calls
+    tool_calls_config.max_concurrent_calls_per_step = 3
+    tool_calls_config.max_workers = 8
+
+    results = call_tools([create_tool_call(index) for index in range(9)])
+
+    assert len(results) == 9
+    assert max_calls_in_flight == 3
@@ -0,0 +1,2 @@
+class ToolCallError(Exception):
+    """A tool call that failed. Its message is sent to the model in place of the tool's result."""
@@ -0,0 +1,90 @@
+import hashlib
+import json
+from functools import cache
+from typing import Any
+
+from opentelemetry import metrics, trace
+
+from db.models.tool_call import ToolCall
+from db.models.tool_definitions import ToolSource
+from src.config.get_config import get_config
+from src.util.ttl_cache import TTLCache
+
+meter = metrics.get_meter(__name__)
+lookup_counter = meter.create_counter("tool_result_cache.lookups", description="Tool result cache lookups, by result")
+
+
+def canonical_args(args: str | dict[str, Any] | None) -> Any:
+    # Models sometimes send their arguments as a JSON string. Parse those so they match the same arguments sent as an
+    # object
+    if isinstance(args, str):
+        try:
+            return json.loads(args)
+        except json.JSONDecodeError:
+            return args
+
+    return args
+
+
+def tool_result_cache_key(tool_call: ToolCall, mcp_server_id: str | None) -> str:
+    key = json.dumps(
+        [tool_call.tool_source, mcp_server_id, tool_call.tool_name, canonical_args(tool_call.args)],
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+        default=str,
+    )
+
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def get_result_cache_ttl_seconds(tool_call: ToolCall, mcp_server_id: str | None) -> float | None:
+    """How long the tool's results can be reused for, or None if they shouldn't be cached."""
+    config = get_config()
+
+    match tool_call.tool_source:
+        case ToolSource.INTERNAL:
+            return config.tool_calls.internal_tool_result_cache_ttl_seconds.get(tool_call.tool_name)
+        case ToolSource.MCP:
+            mcp_server = next((server for server in config.mcp.servers if server.id == mcp_server_id), None)
+            return mcp_server.tool_result_cache_ttl_seconds.get(tool_call.tool_name) if mcp_server is not None else None
+        case _:
+            return None
+
+
+class ToolResultCache:
+    """
+    Keeps the results of tools that are configured as cacheable, so identical calls (the same tool with the same
+    arguments) don't go back to the tool. Results are shared between users, so only opt in tools whose results don't
+    depend on who's calling them.
+
+    Only successful results should be set, so a failure is retried on the next call.
+    """
+
+    def __init__(self, max_entries: int):
+        # Every entry is set with its tool's TTL, so the cache's own TTL is never used
+        self._cache: TTLCache[str, str] = TTLCache(max_entries=max_entries, ttl_seconds=0)
+
+    def get(self, tool_call: ToolCall, mcp_server_id: str | None) -> str | None:
+        if get_result_cache_ttl_seconds(tool_call, mcp_server_id) is None:
+            return None
+
+        result = self._cache.get(tool_result_cache_key(tool_call, mcp_server_id))
+
+        lookup_result = "hit" if result is not None else "miss"
+        lookup_counter.add(1, {"result": lookup_result, "tool_name": tool_call.tool_name})
+        trace.get_current_span().set_attribute(f"tool_result_cache.{tool_call.tool_call_id}.result", lookup_result)
+
+        return result
+
+    def set(self, tool_call: ToolCall, mcp_server_id: str | None, result: str) -> None:
+        ttl_seconds = get_result_cache_ttl_seconds(tool_call, mcp_server_id)
+        if ttl_seconds is None:
+            return
+
+        self._cache.set(tool_result_cache_key(tool_call, mcp_server_id), result, ttl_seconds=ttl_seconds)
+
+
+@cache
+def get_tool_result_cache() -> ToolResultCache:
+    return ToolResultCache(max_entries=get_config().tool_calls.result_cache_max_entries)
@@ -1,4 +1,10 @@
-from typing import TYPE_CHECKING
+import threading
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from dataclasses import dataclass
+from functools import cache
+from typing import TYPE_CHECKING, cast
 
 from pydantic_ai.messages import ToolReturnPart
 from pydantic_ai.tools import ToolDefinition
@@ -11,6 +17,8 @@ from src.config.get_config import get_config
 
 from .internal_tools_service import call_internal_tool, get_internal_tools
 from .mcp_service import call_mcp_tool, get_general_mcp_tools
+from .tool_call_error import ToolCallError
+from .tool_result_cache import get_result_cache_ttl_seconds, get_tool_result_cache
 
 if TYPE_CHECKING:
     from db.models.model_config import ModelConfig
@@ -49,19 +57,83 @@ def get_available_tools(model: "ModelConfig | ModelBase") -> list[Ai2ToolDefinit
     return internal_tools + mcp_tools
 
 
+@dataclass
+class ToolReturnMetadata:
+    cache_hit: bool | None
+    """Whether the result came from the tool result cache. None if the tool's results aren't cached"""
+
+
 def call_tool(tool_call: ToolCall, tool_definition: Ai2ToolDefinition) -> ToolReturnPart:
+    tool_result_cache = get_tool_result_cache()
+    cached_response = tool_result_cache.get(tool_call, tool_definition.mcp_server_id)
+    if cached_response is not None:
+        return ToolReturnPart(
+            tool_name=tool_call.tool_name,
+            content=cached_response,
+            tool_call_id=tool_call.tool_call_id,
+            metadata=ToolReturnMetadata(cache_hit=True),
+        )
+
     tool_response: str
-    match tool_call.tool_source:
-        case ToolSource.INTERNAL:
-            tool_response = call_internal_tool(tool_call)
-        case ToolSource.MCP:
-            tool_response = call_mcp_tool(tool_call, tool_definition)
-        case _:
-            msg = f"Invalid tool source: {tool_call.tool_source}"
-            raise ValueError(msg)
+    try:
+        match tool_call.tool_source:
+            case ToolSource.INTERNAL:
+                tool_response = call_internal_tool(tool_call)
+            case ToolSource.MCP:
+                tool_response = call_mcp_tool(tool_call, tool_definition)
+            case _:
+                msg = f"Invalid tool source: {tool_call.tool_source}"
+                raise ValueError(msg)
+    except ToolCallError as e:
+        # Failures aren't cached so the next call tries the tool again
+        tool_response = str(e)
+    else:
+        tool_result_cache.set(tool_call, tool_definition.mcp_server_id, tool_response)
 
     return ToolReturnPart(
         tool_name=tool_call.tool_name,
         content=tool_response,
         tool_call_id=tool_call.tool_call_id,
+        metadata=ToolReturnMetadata(
+            cache_hit=False
+            if get_result_cache_ttl_seconds(tool_call, tool_definition.mcp_server_id) is not None
+            else None
+        ),
     )
+
+
+@cache
+def get_tool_call_executor() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=get_config().tool_calls.max_workers, thread_name_prefix="tool-call")
+
+
+def call_tools(tool_calls: Sequence[tuple[ToolCall, Ai2ToolDefinition]]) -> list[ToolReturnPart]:
+    """
+    Calls the tools concurrently, up to tool_calls.max_concurrent_calls_per_step at a time, and returns their results
+    in the same order as tool_calls once they've all finished.
+    """
+    if len(tool_calls) <= 1:
+        return [call_tool(tool_call, tool_definition) for tool_call, tool_definition in tool_calls]
+
+    results: list[ToolReturnPart | None] = [None] * len(tool_calls)
+    next_calls = iter(enumerate(tool_calls))
+    next_calls_lock = threading.Lock()
+
+    def call_next_tools() -> None:
+        # The step's calls are shared out between its lanes, which each make one call at a time
+        while True:
+            with next_calls_lock:
+                next_call = next(next_calls, None)
+            if next_call is None:
+                return
+
+            index, (tool_call, tool_definition) = next_call
+            results[index] = call_tool(tool_call, tool_definition)
+
+    lane_count = min(len(tool_calls), get_config().tool_calls.max_concurrent_calls_per_step)
+    # Each lane gets a copy of our context so the Flask app and the current span are available in its thread
+    lanes = [get_tool_call_executor().submit(copy_context().run, call_next_tools) for _ in range(lane_count)]
+    for lane in lanes:
+        lane.result()
+
+    return cast(list[ToolReturnPart], results)
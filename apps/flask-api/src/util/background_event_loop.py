@@ -0,0 +1,138 @@
+import asyncio
+import contextvars
+import os
+import queue
+import threading
+from collections.abc import AsyncIterable, Coroutine, Generator
+from concurrent.futures import Future
+from typing import Any, Generic, TypeVar
+
+T = TypeVar("T")
+
+_ITEM = "item"
+_ERROR = "error"
+_DONE = "done"
+
+
+async def _run_in_context(coro: Coroutine[Any, Any, T], context: contextvars.Context) -> T:
+    # Tasks created from another thread start with the loop thread's context. Copy the caller's context vars in so
+    # OTel spans parent correctly and code on the loop can see the same context the request thread did.
+    for var, value in context.items():
+        var.set(value)
+
+    return await coro
+
+
+class BackgroundEventLoop:
+    """
+    A long-lived event loop running on a daemon thread, one per worker process.
+
+    Sync Flask code hands coroutines and async iterators to it instead of creating a new event loop (and usually a
+    new thread) for every call. Because the loop outlives requests, async HTTP clients created on it can be reused.
+    """
+
+    def __init__(self, name: str = "background-event-loop"):
+        self._name = name
+        self._lock = threading.Lock()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread: threading.Thread | None = None
+
+        # Threads don't survive a fork, so a forked worker needs to start its own loop
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self) -> None:
+        self._lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        if self._loop is not None:
+            return self._loop
+
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name=self._name, daemon=True)
+                thread.start()
+                self._thread = thread
+                self._loop = loop
+
+            return self._loop
+
+    def submit(self, coro: Coroutine[Any, Any, T]) -> Future[T]:
+        """Schedules the coroutine on the loop and returns a future that can be waited on from any thread."""
+        if self._thread is not None and threading.current_thread() is self._thread:
+            coro.close()
+            msg = "Can't wait on the background event loop from inside it"
+            raise RuntimeError(msg)
+
+        return asyncio.run_coroutine_threadsafe(_run_in_context(coro, contextvars.copy_context()), self.loop)
+
+    def run(self, coro: Coroutine[Any, Any, T], timeout: float | None = None) -> T:
+        """Runs the coroutine on the loop and blocks until it finishes. A drop-in replacement for asyncio.run."""
+        future = self.submit(coro)
+        try:
+            return future.result(timeout=timeout)
+        except TimeoutError:
+            future.cancel()
+            raise
+
+    def iterate(self, async_iterable: AsyncIterable[T]) -> Generator[T]:
+        """
+        Consumes the async iterable in a single task on the loop and yields its items to the calling thread.
+
+        Closing the generator early (or an exception in the consumer) cancels the task without waiting for the
+        iterable to finish, so abandoned streams stop pulling from upstream.
+        """
+        background_iterator = self.start_iterating(async_iterable)
+        try:
+            yield from background_iterator
+        finally:
+            background_iterator.close()
+
+    def start_iterating(self, async_iterable: AsyncIterable[T]) -> "BackgroundIterator[T]":
+        """
+        Like iterate, but starts consuming the async iterable right away instead of on the first read. Items are
+        buffered until they're read. The caller must close() the returned iterator.
+        """
+        items: queue.SimpleQueue[tuple[str, Any]] = queue.SimpleQueue()
+
+        async def produce() -> None:
+            try:
+                async for item in async_iterable:
+                    items.put((_ITEM, item))
+            except Exception as e:  # noqa: BLE001
+                items.put((_ERROR, e))
+            finally:
+                items.put((_DONE, None))
+
+        return BackgroundIterator(self.submit(produce()), items)
+
+
+class BackgroundIterator(Generic[T]):
+    def __init__(self, future: Future[None], items: "queue.SimpleQueue[tuple[str, Any]]"):
+        self._future = future
+        self._items = items
+
+    def __iter__(self) -> Generator[T]:
+        while True:
+            kind, value = self._items.get()
+            if kind == _ITEM:
+                yield value
+            elif kind == _ERROR:
+                raise value
+            else:
+                return
+
+    def close(self) -> None:
+        """
+        Cancels the task consuming the async iterable if it hasn't finished. Can be called from any thread: a reader
+        that's waiting for the next item gets the items that were already buffered, then stops.
+        """
+        self._future.cancel()
+        # A task that's cancelled before it starts never gets to say it's done
+        self._items.put((_DONE, None))
+
+
+background_event_loop = BackgroundEventLoop()
@@ -0,0 +1,59 @@
+import os
+import threading
+from collections.abc import Callable, Hashable
+from typing import Any, TypeVar, cast
+
+from opentelemetry import trace
+
+from src.otel.default_tracer import get_default_tracer
+
+T = TypeVar("T")
+
+tracer = get_default_tracer()
+
+
+class ClientRegistry:
+    """
+    Holds the API clients a worker process shares between requests, creating each one the first time it's asked for.
+
+    gRPC channels and HTTP connection pools can't be shared across a fork, so clients created before one (e.g. under
+    gunicorn's --preload) are dropped in the child and created again there on first use.
+
+    Clients can be given a version, e.g. built from the config they were created with. Asking for a client with a
+    different version than the one held replaces it.
+
+    Each lookup records on the current span whether the client had to be created, and creation gets its own span, so
+    the cost of setting up a client shows up in traces when it happens.
+    """
+
+    def __init__(self) -> None:
+        # Reentrant so creating one client can get another it depends on
+        self._lock = threading.RLock()
+        self._clients: dict[str, tuple[Hashable, Any]] = {}
+
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self) -> None:
+        self._lock = threading.RLock()
+        self._clients = {}
+
+    def get(self, name: str, create_client: Callable[[], T], *, version: Hashable = None) -> T:
+        created = False
+        entry = self._clients.get(name)
+
+        if entry is None or entry[0] != version:
+            with self._lock:
+                entry = self._clients.get(name)
+                if entry is None or entry[0] != version:
+                    with tracer.start_as_current_span("ClientRegistry.create_client", attributes={"client.name": name}):
+                        entry = (version, create_client())
+
+                    self._clients[name] = entry
+                    created = True
+
+        trace.get_current_span().set_attribute(f"client_registry.{name}.created", created)
+
+        return cast(T, entry[1])
+
+
+client_registry = ClientRegistry()
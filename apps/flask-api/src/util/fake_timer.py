@@ -0,0 +1,8 @@
+class FakeTimer:
+    """A timer for tests that only moves when `now` is set."""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
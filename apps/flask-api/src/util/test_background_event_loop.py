@@ -0,0 +1,108 @@
+import asyncio
+import contextvars
+import threading
+
+import pytest
+
+from src.util.background_event_loop import BackgroundEventLoop
+
+request_id = contextvars.ContextVar("request_id", default="unset")
+
+
+def test_run_reuses_one_loop_thread():
+    background_loop = BackgroundEventLoop()
+
+    async def current_thread():
+        await asyncio.sleep(0)
+        return threading.current_thread()
+
+    first = background_loop.run(current_thread())
+    second = background_loop.run(current_thread())
+
+    assert first is second
+    assert first is not threading.current_thread()
+
+
+def test_run_propagates_context_vars():
+    background_loop = BackgroundEventLoop()
+
+    async def read_request_id():
+        await asyncio.sleep(0)
+        return request_id.get()
+
+    token = request_id.set("abc")
+    try:
+        assert background_loop.run(read_request_id()) == "abc"
+    finally:
+        request_id.reset(token)
+
+
+def test_iterate_yields_items_and_raises_errors():
+    background_loop = BackgroundEventLoop()
+
+    async def numbers():
+        yield 1
+        await asyncio.sleep(0)
+        yield 2
+        msg = "boom"
+        raise ValueError(msg)
+
+    events = background_loop.iterate(numbers())
+    assert next(events) == 1
+    assert next(events) == 2
+    with pytest.raises(ValueError, match="boom"):
+        next(events)
+
+
+def test_closing_iterate_cancels_the_producer():
+    background_loop = BackgroundEventLoop()
+    cancelled = threading.Event()
+
+    async def endless():
+        try:
+            while True:
+                yield "chunk"
+                await asyncio.sleep(0.01)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    events = background_loop.iterate(endless())
+    assert next(events) == "chunk"
+    events.close()
+
+    assert cancelled.wait(timeout=5)
+
+
+def test_start_iterating_reads_ahead_before_iteration():
+    background_loop = BackgroundEventLoop()
+    produced = threading.Event()
+
+    async def numbers():
+        yield 1
+        await asyncio.sleep(0)
+        yield 2
+        produced.set()
+
+    background_iterator = background_loop.start_iterating(numbers())
+    try:
+        assert produced.wait(timeout=5), "items should be read before anything is iterated"
+        assert list(background_iterator) == [1, 2]
+    finally:
+        background_iterator.close()
+
+
+def test_closing_start_iterating_from_another_thread_stops_a_waiting_reader():
+    background_loop = BackgroundEventLoop()
+
+    async def stalled():
+        yield "chunk"
+        await asyncio.Event().wait()
+
+    background_iterator = background_loop.start_iterating(stalled())
+    events = iter(background_iterator)
+    assert next(events) == "chunk"
+
+    threading.Timer(0.05, background_iterator.close).start()
+
+    assert list(events) == []
@@ -0,0 +1,86 @@
+import os
+import threading
+
+import pytest
+
+from src.util.client_registry import ClientRegistry
+
+
+def test_creates_each_client_once():
+    registry = ClientRegistry()
+    created: list[object] = []
+
+    def create_client() -> object:
+        client = object()
+        created.append(client)
+        return client
+
+    first = registry.get("client", create_client)
+    second = registry.get("client", create_client)
+
+    assert first is second
+    assert created == [first]
+
+
+def test_replaces_a_client_when_its_version_changes():
+    registry = ClientRegistry()
+
+    first = registry.get("client", object, version=1)
+    assert registry.get("client", object, version=1) is first
+
+    second = registry.get("client", object, version=2)
+    assert second is not first
+    assert registry.get("client", object, version=2) is second
+
+
+def test_clients_can_depend_on_other_clients():
+    registry = ClientRegistry()
+
+    function = registry.get("function", lambda: ("function", registry.get("connection", object)))
+
+    assert function[1] is registry.get("connection", object)
+
+
+def test_creates_a_client_once_when_requested_from_many_threads():
+    registry = ClientRegistry()
+    created: list[object] = []
+    start = threading.Barrier(8)
+
+    def create_client() -> object:
+        client = object()
+        created.append(client)
+        return client
+
+    def get_client() -> None:
+        start.wait()
+        registry.get("client", create_client)
+
+    threads = [threading.Thread(target=get_client) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(created) == 1
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="requires fork")
+def test_forked_children_create_their_own_clients():
+    registry = ClientRegistry()
+    parent_client = registry.get("client", object)
+
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        child_client = registry.get("client", object)
+        os.write(write_fd, b"1" if child_client is not parent_client else b"0")
+        os._exit(0)
+
+    os.close(write_fd)
+    result = os.read(read_fd, 1)
+    os.close(read_fd)
+    os.waitpid(pid, 0)
+
+    assert result == b"1"
+    assert registry.get("client", object) is parent_client
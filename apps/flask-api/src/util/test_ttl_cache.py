@@ -0,0 +1,41 @@
+from src.util.fake_timer import FakeTimer
+from src.util.ttl_cache import TTLCache
+
+
+def test_entries_expire_after_ttl():
+    timer = FakeTimer()
+    cache: TTLCache[str, bool] = TTLCache(max_entries=10, ttl_seconds=60, timer=timer)
+
+    cache.set("key", True)
+    timer.now = 59
+    assert cache.get("key") is True
+
+    timer.now = 60
+    assert cache.get("key") is None
+    assert len(cache) == 0
+
+
+def test_entries_can_have_their_own_ttl():
+    timer = FakeTimer()
+    cache: TTLCache[str, bool] = TTLCache(max_entries=10, ttl_seconds=60, timer=timer)
+
+    cache.set("short", True, ttl_seconds=10)
+    cache.set("default", True)
+
+    timer.now = 10
+    assert cache.get("short") is None
+    assert cache.get("default") is True
+
+
+def test_evicts_least_recently_used_entry_when_full():
+    cache: TTLCache[str, int] = TTLCache(max_entries=2, ttl_seconds=60)
+
+    cache.set("first", 1)
+    cache.set("second", 2)
+    assert cache.get("first") == 1
+
+    cache.set("third", 3)
+
+    assert cache.get("first") == 1
+    assert cache.get("second") is None
+    assert cache.get("third") == 3
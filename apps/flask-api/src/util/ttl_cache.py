@@ -0,0 +1,57 @@
+import threading
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from time import monotonic
+from typing import Generic, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class TTLCache(Generic[K, V]):
+    """
+    A thread-safe, size-bounded cache whose entries expire ttl_seconds after they're set.
+
+    When the cache is full the least recently used entry is evicted to make room.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float, timer: Callable[[], float] = monotonic):
+        self._max_entries = max_entries
+        self._ttl_seconds = ttl_seconds
+        self._timer = timer
+        self._entries: OrderedDict[K, tuple[float, V]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: K) -> V | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            expires_at, value = entry
+            if expires_at <= self._timer():
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: K, value: V, ttl_seconds: float | None = None) -> None:
+        """Sets the value, which expires after ttl_seconds if given and the cache's ttl_seconds otherwise."""
+        with self._lock:
+            self._entries[key] = (
+                self._timer() + (ttl_seconds if ttl_seconds is not None else self._ttl_seconds),
+                value,
+            )
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
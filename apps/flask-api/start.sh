@@ -1,10 +1,17 @@
 #!/bin/bash
+
+# Streaming responses hold their request open for the whole generation. The gthread worker class lets each worker
+# process serve many in-flight streams on its own threads instead of pinning the whole process to one stream.
+# Set GUNICORN_THREADS=1 to fall back to one request per process. Keep db.max_size in the config close to the thread
+# count so threads don't queue on the connection pool.
 exec \
     gunicorn \
-    --workers 9 \
+    --workers "${GUNICORN_WORKERS:-9}" \
+    --worker-class gthread \
+    --threads "${GUNICORN_THREADS:-32}" \
     --timeout 0 \
     --bind 0.0.0.0:8000 \
     --enable-stdio-inheritance \
     --access-logfile - \
     --access-logformat '{"timestamp": "%(t)s", "request_ip":"%(h)s", "x_forwarded_for":"%({X-Forwarded-For}i)s", "request_id":"%({X-Request-Id}i)s","response_code":"%(s)s","request_method":"%(m)s","request_path":"%(U)s","request_query":"%(q)s","response_time":"%(D)s","response_length":"%(B)s", "user_agent": "%(a)s"}' \
-    'app:create_app()'
\ No newline at end of file
+    'app:create_app()'
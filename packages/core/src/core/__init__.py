@@ -1,5 +1,6 @@
 from .api_interface import APIInterface
 from .empty_string_to_none import empty_string_to_none
 from .object_id import NewID, new_id_generator
+from .text_snippet import text_snippet
 
-__all__ = ("APIInterface", "NewID", "empty_string_to_none", "new_id_generator")
+__all__ = ("APIInterface", "NewID", "empty_string_to_none", "new_id_generator", "text_snippet")
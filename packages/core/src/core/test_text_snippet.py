@@ -0,0 +1,28 @@
+import bs4
+import pytest
+
+from .text_snippet import first_n_words, html_text, text_snippet
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "Write a short poem about a labrador named Murphy",
+        "<p>Hello <b>world</b></p> and &amp; more &lt;tag&gt;",
+        "if (a<b && c>d) { return; }",
+        "<script>var x = 1;</script>after the script",
+        "<style>p { color: red; }</style>before <!-- a comment --> after",
+        "<![CDATA[character data]]> and text",
+        "<!DOCTYPE html><html><body><h1>Title</h1>\n<p>Body</p></body></html>",
+        "unclosed <b",
+    ],
+)
+def test_matches_beautiful_soup(text: str):
+    assert html_text(text) == bs4.BeautifulSoup(text, features="html.parser").get_text()
+
+
+def test_snippet_of_long_html():
+    text = "<p>" + "word " * 10_000 + "</p>"
+
+    assert text_snippet(text) == first_n_words("word " * 10_000, 16)
+    assert len(html_text(text, max_length=100)) < len(text) / 2, "parsing should stop once there's enough text"
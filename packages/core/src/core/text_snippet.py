@@ -0,0 +1,70 @@
+import re
+from html.parser import HTMLParser
+
+SNIPPET_WORD_COUNT = 16
+# Snippets only look at this many characters of text. See first_n_words
+SNIPPET_TEXT_LENGTH = SNIPPET_WORD_COUNT * 32
+# How much markup is parsed at a time while looking for the snippet's text
+HTML_CHUNK_LENGTH = 4096
+
+
+def first_n_words(s: str, n: int) -> str:
+    # We take the first n * 32 characters as to avoid processing the entire text, which might be
+    # large. This is for obvious reasons imperfect but probably good enough for manifesting a short,
+    # representative snippet.
+    words = re.split(r"\s+", s[: n * 32])
+    return " ".join(words[:n]) + ("…" if len(words) > n else "")
+
+
+class _TextExtractor(HTMLParser):
+    """Collects the text of an HTML document the way BeautifulSoup's get_text does, leaving out scripts and styles."""
+
+    SKIPPED_TAGS = frozenset({"script", "style", "template"})
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.text: list[str] = []
+        self.text_length = 0
+        self._skipped_tag: str | None = None
+
+    def handle_starttag(self, tag: str, _attrs: list[tuple[str, str | None]]) -> None:
+        if self._skipped_tag is None and tag in self.SKIPPED_TAGS:
+            self._skipped_tag = tag
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag == self._skipped_tag:
+            self._skipped_tag = None
+
+    def handle_data(self, data: str) -> None:
+        if self._skipped_tag is None:
+            self.text.append(data)
+            self.text_length += len(data)
+
+    def unknown_decl(self, data: str) -> None:
+        if data.startswith("CDATA["):
+            self.handle_data(data.removeprefix("CDATA["))
+
+
+def html_text(s: str, max_length: int | None = None) -> str:
+    """
+    Gets the text of s with any HTML tags removed and entities decoded.
+
+    Pass max_length to stop parsing once that much text has been found. The result can be longer than max_length.
+    """
+    # Most messages are plain text, which doesn't need parsing
+    if "<" not in s and "&" not in s:
+        return s
+
+    extractor = _TextExtractor()
+    for start in range(0, len(s), HTML_CHUNK_LENGTH):
+        extractor.feed(s[start : start + HTML_CHUNK_LENGTH])
+        if max_length is not None and extractor.text_length >= max_length:
+            break
+    else:
+        extractor.close()
+
+    return "".join(extractor.text)
+
+
+def text_snippet(s: str) -> str:
+    return first_n_words(html_text(s, max_length=SNIPPET_TEXT_LENGTH), SNIPPET_WORD_COUNT)
@@ -51,6 +51,14 @@ class Message(Base, kw_only=True):
         Index("message_original_fkey_ix", "original"),
         Index("message_parent_fkey_ix", "parent"),
         Index("message_root_fkey_ix", "root"),
+        # Serves the thread list, which pages through a user's finished root messages by (created, id)
+        Index(
+            "message_thread_list_ix",
+            "creator",
+            "created",
+            "id",
+            postgresql_where=text("parent IS NULL AND final = true"),
+        ),
     )
 
     id: Mapped[str] = mapped_column(Text, primary_key=True, default_factory=new_id_generator("msg"))
@@ -106,6 +114,12 @@ class Message(Base, kw_only=True):
     error_description: Mapped[Optional[str]] = mapped_column(Text, nullable=True, default=None)
     error_severity: Mapped[Optional[str]] = mapped_column(Text, nullable=True, default=None)
 
+    # A short, plain text preview of content. Messages written before this was added may not have one
+    snippet: Mapped[Optional[str]] = mapped_column(Text, nullable=True, default=None)
+
+    # Only set on tool responses for tools whose results are cached
+    tool_result_cache_hit: Mapped[Optional[bool]] = mapped_column(Boolean, nullable=True, default=None)
+
     # NOTE: JSONB changes aren't tracked by SQLAlchemy automatically
     extra_parameters: Mapped[dict[str, Any] | None] = mapped_column(JSONB, nullable=True, default=None)
 
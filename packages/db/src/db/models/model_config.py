@@ -68,6 +68,7 @@ class ModelConfig(Base, kw_only=True):
 
     can_call_tools: Mapped[bool] = mapped_column(default=False)
     can_think: Mapped[bool] = mapped_column(default=False, server_default="false")
+    speculative_inference: Mapped[bool] = mapped_column(default=False, server_default="false")
 
     infini_gram_index: Mapped[AvailableInfiniGramIndexId | None] = mapped_column(default=None)
 
@@ -1155,5 +1155,47 @@ DROP TYPE "public"."modelhost_old";
 
 UPDATE alembic_version SET version_num='20c0085a0629' WHERE alembic_version.version_num = '4c886e3dd93c';
 
-COMMIT;
+-- Running upgrade 20c0085a0629 -> b7e3f1c9a2d4
+
+ALTER TABLE model_config ADD COLUMN speculative_inference BOOLEAN DEFAULT 'false' NOT NULL;
+
+UPDATE alembic_version SET version_num='b7e3f1c9a2d4' WHERE alembic_version.version_num = '20c0085a0629';
+
+-- Running upgrade b7e3f1c9a2d4 -> c4a8d2e6f1b3
+
+CREATE FUNCTION notify_model_config_changed() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('model_config_changed', TG_TABLE_NAME);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+
+CREATE TRIGGER model_config_changed
+        AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON model_config
+        FOR EACH STATEMENT EXECUTE FUNCTION notify_model_config_changed();
+
+CREATE TRIGGER multi_modal_model_config_changed
+        AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON multi_modal_model_config
+        FOR EACH STATEMENT EXECUTE FUNCTION notify_model_config_changed();
+
+UPDATE alembic_version SET version_num='c4a8d2e6f1b3' WHERE alembic_version.version_num = 'b7e3f1c9a2d4';
+
+-- Running upgrade c4a8d2e6f1b3 -> d1f5b8e2a7c4
 
+ALTER TABLE message ADD COLUMN tool_result_cache_hit BOOLEAN;
+
+UPDATE alembic_version SET version_num='d1f5b8e2a7c4' WHERE alembic_version.version_num = 'c4a8d2e6f1b3';
+
+-- Running upgrade d1f5b8e2a7c4 -> e3a9c7f2b5d1
+
+CREATE INDEX message_thread_list_ix ON message (creator, created, id) WHERE parent IS NULL AND final = true;
+
+UPDATE alembic_version SET version_num='e3a9c7f2b5d1' WHERE alembic_version.version_num = 'd1f5b8e2a7c4';
+
+-- Running upgrade e3a9c7f2b5d1 -> f7c2a9d4e8b6
+
+ALTER TABLE message ADD COLUMN snippet TEXT;
+
+UPDATE alembic_version SET version_num='f7c2a9d4e8b6' WHERE alembic_version.version_num = 'e3a9c7f2b5d1';
+
+COMMIT;